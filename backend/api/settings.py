@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'drf_yasg',
 
     # MY APPS
+    'core',
     'driver',
     'vehicle',
     'control',
@@ -51,7 +53,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'corsheaders.middleware.CorsMiddleware'
+    'corsheaders.middleware.CorsMiddleware',
+    'core.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'api.urls'
@@ -96,9 +99,87 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Keep connections open between requests.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Same file opened read-only; GET traffic reads through it (see
+    # READ_DATABASES) while writers use "default".
+    'read': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': (BASE_DIR / 'db.sqlite3').as_uri() + '?mode=ro',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+    # A replica in a file of its own, refreshed with
+    # "python manage.py sync_replicas"; add it to READ_DATABASES to use it.
+    # 'replica': {
+    #     'ENGINE': 'django.db.backends.sqlite3',
+    #     'NAME': (BASE_DIR / 'db.replica.sqlite3').as_uri() + '?mode=ro',
+    #     'CONN_MAX_AGE': 600,
+    #     'CONN_HEALTH_CHECKS': True,
+    #     'TEST': {'MIRROR': 'default'},
+    # },
 }
 
+DATABASE_ROUTERS = ['core.routers.ReadWriteRouter']
+
+# Read aliases of GET requests and their weights, e.g. {'read': 1,
+# 'replica': 3}; empty reads everything from "default".
+READ_DATABASES = {'read': 1}
+
+# How long a client reads from "default" after writing, and how long a read
+# alias that failed to connect is skipped.
+REPLICA_PIN_SECONDS = 5
+REPLICA_RETRY_SECONDS = 30
+
+# Applied to every new SQLite connection by core.sqlite. WAL lets readers
+# run alongside a writer; busy_timeout is how long a writer waits for the
+# lock before failing with "database is locked" (the 5 s Python's sqlite3
+# module already uses, spelled out so it can be tuned here).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -64000,  # KiB
+    'mmap_size': 268435456,
+    'temp_store': 'memory',
+}
+
+# The changes endpoints (core.sync) leave out the writes of the last
+# SYNC_SETTLE_SECONDS, since their timestamps are taken before commit; keep
+# it above busy_timeout, the longest a write can wait to commit. Deletions
+# are kept SYNC_TOMBSTONE_DAYS (prune_tombstones); older tokens are refused.
+SYNC_SETTLE_SECONDS = 10
+SYNC_TOMBSTONE_DAYS = 30
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # List responses (core.cache). Entries are keyed on the table versions,
+    # so writes invalidate them and the timeout only bounds memory. Use the
+    # file backend to share entries between worker processes on one host,
+    # or a shared cache such as Redis for several hosts.
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 300,
+    },
+    # 'responses': {
+    #     'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    #     'LOCATION': BASE_DIR / 'cache' / 'responses',
+    #     'TIMEOUT': 300,
+    # },
+}
+
+# Cache alias used by core.cache; None disables the response cache.
+RESPONSE_CACHE_ALIAS = 'responses'
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -139,3 +220,16 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_ALL_ORIGINS = True
+
+REST_FRAMEWORK = {
+    # Endpoints use ?format= for their own output modes (e.g. the control
+    # export), so DRF must not treat it as a renderer override.
+    'URL_FORMAT_OVERRIDE': None,
+    # orjson is used for JSON when installed; MessagePack (Accept:
+    # application/msgpack) is only offered when msgpack is installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        *(['core.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+    ],
+}
@@ -16,26 +16,26 @@ Including another URLconf
 """
 # from django.contrib import admin
 from django.urls import path, include
-from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title='API',
-        default_version='v1',
-        description='API for the project',
-        contact=openapi.Contact(
-            name='Matheus',
-            email='gsmatheus.contato@gmail.com'
-        ),
+from core.schema import swagger_view
+
+# Generated on the first request to /swagger/ and memoized afterwards.
+schema_view = swagger_view(lambda: openapi.Info(
+    title='API',
+    default_version='v1',
+    description='API for the project',
+    contact=openapi.Contact(
+        name='Matheus',
+        email='gsmatheus.contato@gmail.com'
     ),
-    public=True,
-)
+))
 
 urlpatterns = [
     # path('admin/', admin.site.urls),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    path('swagger/', schema_view, name='schema-swagger-ui'),
     path('api/', include('driver.urls')),
     path('api/', include('vehicle.urls')),
     path('api/', include('control.urls')),
+    path('api/', include('core.urls')),
 ]
@@ -0,0 +1,91 @@
+"""
+Throughput of the sync read endpoints against their ``/api/async/``
+variants under ASGI, with 50, 200 and 1000 concurrent clients driving the
+Django ASGI application in-process (no server or sockets involved).
+"""
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import parser, report, seed, setup
+
+CLIENTS = (50, 200, 1000)
+
+
+def main():
+    arguments = parser(__doc__)
+    arguments.add_argument('--requests', type=int, default=2000, help='Requests per run')
+    args = arguments.parse_args()
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers, trips_per_day=args.trips_per_day)
+
+    from django.conf import settings
+    from django.core.asgi import get_asgi_application
+
+    from control.models import Control
+
+    # Measure the views, not the response cache.
+    settings.RESPONSE_CACHE_ALIAS = None
+    application = get_asgi_application()
+
+    control = Control.objects.values('id', 'vehicle_id').first()
+    cases = [
+        ('control list, one vehicle', 'control', f'vehicle={control["vehicle_id"]}&page_size=20'),
+        ('control detail', f'control/{control["id"]}', ''),
+        ('total_km', f'control/{control["vehicle_id"]}/total_km', ''),
+        ('driver list', 'driver', 'pagination=cursor&page_size=20'),
+    ]
+
+    async def get(path, query):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+        status = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await application(scope, receive, send)
+        assert status == [200], (path, query, status)
+
+    async def run(path, query, clients):
+        latencies = []
+
+        async def client(count):
+            for _ in range(count):
+                started = time.perf_counter()
+                await get(path, query)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        per_client = max(1, args.requests // clients)
+        started = time.perf_counter()
+        await asyncio.gather(*[client(per_client) for _ in range(clients)])
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return len(latencies) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.95)]
+
+    rows = [('case', 'clients', 'sync req/s', 'async req/s', 'sync p50/p95 ms', 'async p50/p95 ms', 'speedup')]
+    for label, path, query in cases:
+        # Warm up connections, URL resolution and compiled plans.
+        asyncio.run(run(f'/api/{path}', query, 10))
+        asyncio.run(run(f'/api/async/{path}', query, 10))
+
+        for clients in CLIENTS:
+            sync = asyncio.run(run(f'/api/{path}', query, clients))
+            async_ = asyncio.run(run(f'/api/async/{path}', query, clients))
+            rows.append((label, clients, f'{sync[0]:.0f}', f'{async_[0]:.0f}', f'{sync[1]:.1f}/{sync[2]:.1f}',
+                         f'{async_[1]:.1f}/{async_[2]:.1f}', f'{async_[0] / sync[0]:.2f}x'))
+
+    report(f'ASGI throughput, {args.requests} requests per run ({Control.objects.count()} trips)', rows)
+
+
+if __name__ == '__main__':
+    main()
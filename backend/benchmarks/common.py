@@ -0,0 +1,138 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Each script runs against a scratch SQLite database, never ``db.sqlite3``:
+
+    cd backend/
+    python -m benchmarks.control_search --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, time as dt_time, timedelta
+from pathlib import Path
+
+import django
+
+
+def setup(database=None):
+    """Point Django at a scratch database, migrate it and return its path."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+
+    from django.conf import settings
+
+    if database is None:
+        database = os.path.join(tempfile.mkdtemp(prefix='fleet-bench-'), 'bench.sqlite3')
+
+    settings.DATABASES['default']['NAME'] = database
+    settings.DATABASES['read']['NAME'] = Path(database).resolve().as_uri() + '?mode=ro'
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+    return database
+
+
+def parser(description, rows=200_000):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--rows', type=int, default=rows, help='Number of seeded trips')
+    parser.add_argument('--vehicles', type=int, default=500)
+    parser.add_argument('--drivers', type=int, default=1000)
+    parser.add_argument('--trips-per-day', type=int, default=1, help='Trips per vehicle per day')
+    parser.add_argument('--database', default=None, help='Reuse an existing scratch database')
+    return parser
+
+
+def seed(rows, vehicles=500, drivers=1000, batch_size=5000, trips_per_day=1):
+    """
+    Fill the tables with back-to-back trips spread over the last few years.
+    Each vehicle's odometer only moves forward and its trips never overlap.
+    """
+    from control import mileage, rollups
+    from control.models import Control
+    from driver.models import Driver
+    from vehicle.models import Vehicle
+
+    if Control.objects.exists():
+        return
+
+    rng = random.Random(42)
+
+    Driver.objects.bulk_create([
+        Driver(name=f'Driver {index}', phone=f'(11) 9{index:04d}-{index:04d}', license_number=f'{index:011d}')
+        for index in range(drivers)
+    ], batch_size=batch_size)
+    Vehicle.objects.bulk_create([
+        Vehicle(plate=f'ABC-{index:04d}', brand='Fiat', model=f'Uno {index % 7}', oil_change_km=10_000)
+        for index in range(vehicles)
+    ], batch_size=batch_size)
+
+    vehicle_ids = list(Vehicle.objects.values_list('id', flat=True))
+    driver_ids = list(Driver.objects.values_list('id', flat=True))
+    trips_per_vehicle = max(1, rows // len(vehicle_ids))
+    start = date.today() - timedelta(days=trips_per_vehicle // trips_per_day + 1)
+    hours = 10 // trips_per_day
+
+    batch = []
+    created = 0
+    for vehicle_id in vehicle_ids:
+        odometer = rng.randint(0, 50_000)
+
+        for trip in range(trips_per_vehicle):
+            if created >= rows:
+                break
+
+            day = start + timedelta(days=trip // trips_per_day)
+            slot = 8 + (trip % trips_per_day) * hours
+            distance = rng.randint(5, 400)
+            batch.append(Control(
+                vehicle_id=vehicle_id,
+                driver_id=rng.choice(driver_ids),
+                departure_date=day,
+                departure_time=dt_time(slot, 0),
+                departure_km=odometer,
+                destination=rng.choice(['São Paulo', 'Campinas', 'Bauru', 'Santos', 'Sorocaba']),
+                return_date=day,
+                return_time=dt_time(slot + hours, 0),
+                return_km=odometer + distance,
+                distance_traveled=distance,
+            ))
+            odometer += distance
+            created += 1
+
+            if len(batch) >= batch_size:
+                Control.objects.bulk_create(batch)
+                batch = []
+
+    Control.objects.bulk_create(batch)
+    mileage.rebuild()
+    rollups.rebuild()
+
+    from django.db import connection
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def measure(function, repeat=5):
+    """Run ``function`` ``repeat`` times and return the median wall time in ms."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return statistics.median(timings)
+
+
+def report(title, rows):
+    """Print ``rows`` of (label, value, ...) as an aligned table."""
+    print(f'\n{title}')
+    widths = [max(len(str(row[column])) for row in rows) for column in range(len(rows[0]))]
+    for row in rows:
+        print('  ' + '  '.join(str(value).ljust(width) for value, width in zip(row, widths)))
@@ -0,0 +1,75 @@
+"""
+Trips/sec through POST /api/control/create (one request per trip) versus
+POST /api/control/bulk (one request per batch).
+"""
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import parser, report, seed, setup
+
+
+def main():
+    arguments = parser(__doc__, rows=0)
+    arguments.add_argument('--trips', type=int, default=2000, help='Trips posted through each endpoint')
+    arguments.add_argument('--batch', type=int, default=1000, help='Trips per bulk request')
+    args = arguments.parse_args()
+
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers)
+
+    from rest_framework.test import APIClient
+
+    from django.db.models import Max
+
+    from control.models import Control
+    from driver.models import Driver
+    from vehicle.models import Vehicle
+
+    client = APIClient()
+    vehicle_ids = list(Vehicle.objects.values_list('id', flat=True))
+    driver_ids = list(Driver.objects.values_list('id', flat=True))
+
+    # Trips are checked for overlaps and odometer continuity, so each day
+    # takes at most one trip per vehicle and driver, after the seeded ones,
+    # and the odometers only move forward.
+    per_day = min(len(vehicle_ids), len(driver_ids))
+    first_day = date.today() + timedelta(days=1)
+    base_km = (Control.objects.aggregate(km=Max('return_km'))['km'] or 0) + 1000
+
+    def trips(start):
+        return [
+            {
+                "vehicle": vehicle_ids[index % len(vehicle_ids)],
+                "driver": driver_ids[index % len(driver_ids)],
+                "departure_date": (first_day + timedelta(days=index // per_day)).isoformat(),
+                "departure_time": "10:30:00",
+                "return_date": (first_day + timedelta(days=index // per_day)).isoformat(),
+                "return_time": "12:30:00",
+                "departure_km": base_km + index * 100,
+                "return_km": base_km + index * 100 + 50,
+                "destination": "São Paulo",
+            }
+            for index in range(start, start + args.trips)
+        ]
+
+    started = time.perf_counter()
+    for trip in trips(0):
+        assert client.post('/api/control/create', trip, format='json').status_code == 201
+    single = time.perf_counter() - started
+
+    rows = trips(args.trips)
+    started = time.perf_counter()
+    for offset in range(0, len(rows), args.batch):
+        response = client.post('/api/control/bulk', rows[offset:offset + args.batch], format='json')
+        assert response.status_code == 201 and not response.data['errors']
+    bulk = time.perf_counter() - started
+
+    report(f'{args.trips} trips, {Control.objects.count()} in the table afterwards', [
+        ('endpoint', 'seconds', 'trips/sec'),
+        ('/api/control/create', f'{single:.2f}', f'{args.trips / single:.0f}'),
+        (f'/api/control/bulk ({args.batch}/request)', f'{bulk:.2f}', f'{args.trips / bulk:.0f}'),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Compare payload size and latency of ``/api/control`` pages with embedded
+vehicles and drivers against ``?format=normalized``, where each related
+object is sent once. Use ``--vehicles``/``--drivers`` to change how often
+they repeat within a page.
+"""
+from benchmarks.common import measure, parser, report, seed, setup
+
+
+def main():
+    args = parser(__doc__).parse_args()
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers, trips_per_day=args.trips_per_day)
+
+    from django.test import RequestFactory, override_settings
+
+    from control.models import Control
+    from control.views import FetchData
+
+    view = FetchData.as_view()
+    factory = RequestFactory()
+    vehicle_id = Control.objects.values_list('vehicle_id', flat=True).first()
+
+    def get(params):
+        response = view(factory.get('/api/control', params))
+        response.render()
+        return response
+
+    cases = [(f'page of {size}{label}', {'page_size': size, **params})
+             for size in (100, 1000) for label, params in (('', {}), (', one vehicle', {'vehicle': vehicle_id}))]
+
+    rows = [('case', 'vehicles', 'drivers', 'embedded KB', 'normalized KB', 'size', 'embedded ms',
+             'normalized ms', 'speedup')]
+    # Measure the view itself, not the response cache.
+    with override_settings(RESPONSE_CACHE_ALIAS=None):
+        for label, params in cases:
+            normalized = {**params, 'format': 'normalized'}
+            embedded_size = len(get(params).content)
+            data = get(normalized)
+
+            embedded_ms = measure(lambda: get(params))
+            normalized_ms = measure(lambda: get(normalized))
+            rows.append((label, len(data.data['vehicles']), len(data.data['drivers']),
+                         f'{embedded_size / 1024:.1f}', f'{len(data.content) / 1024:.1f}',
+                         f'{len(data.content) / embedded_size:.0%}', f'{embedded_ms:.2f}', f'{normalized_ms:.2f}',
+                         f'{embedded_ms / normalized_ms:.1f}x'))
+
+    report(f'/api/control?format=normalized on {Control.objects.count()} trips, '
+           f'{args.vehicles} vehicles, {args.drivers} drivers', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Measure the write-time overlap check against a check that filters every
+earlier trip of the vehicle, and the throughput of the one-pass audit.
+"""
+import time
+
+from benchmarks.common import measure, parser, report, seed, setup
+
+
+def main():
+    args = parser(__doc__).parse_args()
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers, trips_per_day=args.trips_per_day)
+
+    from django.db import connection
+    from django.db.models import Q
+
+    from control.models import Control
+    from control.overlaps import find_overlaps, overlapping, returns_after, trip_window
+
+    vehicle_id = Control.objects.values_list('vehicle_id', flat=True).first()
+    history = Control.objects.filter(vehicle_id=vehicle_id).order_by('departure_date', 'departure_time')
+    length = history.count()
+
+    def naive(start, end):
+        return Control.objects.filter(
+            Q(vehicle_id=vehicle_id),
+            Q(departure_date__lt=end[0]) | Q(departure_date=end[0], departure_time__lt=end[1]),
+            returns_after(start),
+        ).order_by()
+
+    def indexed(start, end):
+        return overlapping('vehicle', vehicle_id, start, end)
+
+    def run(queryset):
+        # Compile once so only the database work is timed.
+        sql, params = queryset.values_list('id', flat=True)[:1].query.sql_with_params()
+
+        def execute():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                cursor.fetchall()
+
+        return execute
+
+    rows = [('position in vehicle history', 'filter earlier trips ms', 'indexed seeks ms')]
+    for position in (0, length // 2, length - 1):
+        start, end = trip_window(history.values(
+            'departure_date', 'departure_time', 'return_date', 'return_time'
+        )[position])
+        rows.append((
+            f'{position} of {length}',
+            f'{measure(run(naive(start, end)), repeat=20):.3f}',
+            f'{measure(run(indexed(start, end)), repeat=20):.3f}',
+        ))
+
+    total = Control.objects.count()
+    report(f'Overlap check SQL on {total} trips', rows)
+
+    rows = [('audit', 'pairs', 'seconds', 'trips/s')]
+    for key in ('vehicle', 'driver'):
+        started = time.perf_counter()
+        pairs = sum(1 for _ in find_overlaps(key))
+        seconds = time.perf_counter() - started
+        rows.append((f'by {key}', pairs, f'{seconds:.1f}', f'{total / seconds:.0f}'))
+
+    report(f'audit_overlaps on {total} trips', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Compare encode time and payload size of ``/api/control`` pages with DRF's
+JSONRenderer, ``core.renderers.FastJSONRenderer`` and, when msgpack is
+installed, ``core.renderers.MessagePackRenderer``.
+"""
+from benchmarks.common import measure, parser, report, seed, setup
+
+
+def main():
+    args = parser(__doc__).parse_args()
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers, trips_per_day=args.trips_per_day)
+
+    from django.test import RequestFactory, override_settings
+    from rest_framework.renderers import JSONRenderer
+
+    from control.models import Control
+    from control.views import FetchData
+    from core.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+
+    renderers = [('json', JSONRenderer()), ('fast json' if orjson else 'fast json (no orjson)', FastJSONRenderer())]
+    if msgpack:
+        renderers.append(('msgpack', MessagePackRenderer()))
+
+    view = FetchData.as_view()
+    factory = RequestFactory()
+
+    rows = [('page', *[f'{name} {unit}' for name, _ in renderers for unit in ('ms', 'KB')], 'fast json speedup')]
+    with override_settings(RESPONSE_CACHE_ALIAS=None):
+        for size in (100, 1000, 10000):
+            for label, params in ((f'{size}', {}), (f'{size} normalized', {'format': 'normalized'})):
+                data = view(factory.get('/api/control', {'page_size': size, **params})).data
+
+                timings = []
+                row = [label]
+                for _, renderer in renderers:
+                    timings.append(measure(lambda: renderer.render(data)))
+                    row += [f'{timings[-1]:.2f}', f'{len(renderer.render(data)) / 1024:.1f}']
+
+                rows.append((*row, f'{timings[0] / timings[1]:.1f}x'))
+
+    report(f'Rendering /api/control pages ({Control.objects.count()} trips)', rows)
+
+
+if __name__ == '__main__':
+    main()
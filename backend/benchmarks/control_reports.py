@@ -0,0 +1,54 @@
+"""
+Compare mileage reports aggregated from the raw control table with the
+same reports served from the daily rollups by ``control.reports``.
+"""
+from benchmarks.common import measure, parser, report, seed, setup
+
+
+def main():
+    args = parser(__doc__).parse_args()
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers, trips_per_day=args.trips_per_day)
+
+    from django.db.models import Count, F, Sum
+    from django.db.models.functions import TruncMonth, TruncWeek
+
+    from control.models import Control
+    from control.reports import mileage_report
+
+    last = Control.objects.order_by('-departure_date').values_list('departure_date', flat=True).first()
+    year = f'{last.year}-01-01', last.isoformat()
+    buckets = {'day': lambda: F('departure_date'), 'week': lambda: TruncWeek('departure_date'),
+               'month': lambda: TruncMonth('departure_date')}
+
+    def raw(group, bucket, date_from=None, date_to=None):
+        controls = Control.objects.order_by()
+        if date_from:
+            controls = controls.filter(departure_date__range=(date_from, date_to))
+        return controls.annotate(period=buckets[bucket]()).values(f'{group}_id', 'period').annotate(
+            trips=Count('id'), km=Sum('distance_traveled'),
+        ).order_by('period', f'{group}_id')
+
+    cases = [
+        ('vehicle by month', raw('vehicle', 'month'), {'group': 'vehicle', 'bucket': 'month'}),
+        ('driver by week', raw('driver', 'week'), {'group': 'driver', 'bucket': 'week'}),
+        ('vehicle by day, this year', raw('vehicle', 'day', *year),
+         {'group': 'vehicle', 'bucket': 'day', 'from': year[0], 'to': year[1]}),
+    ]
+
+    rows = [('case', 'buckets', 'raw count+page ms', 'rollup count+page ms', 'speedup')]
+    for label, old, params in cases:
+        new = mileage_report(params)
+
+        def page(queryset):
+            return lambda: (queryset.count(), list(queryset[:10]))
+
+        old_ms = measure(page(old), repeat=3)
+        new_ms = measure(page(new), repeat=3)
+        rows.append((label, new.count(), f'{old_ms:.2f}', f'{new_ms:.2f}', f'{old_ms / new_ms:.1f}x'))
+
+    report(f'/api/reports/mileage on {Control.objects.count()} trips', rows)
+
+
+if __name__ == '__main__':
+    main()
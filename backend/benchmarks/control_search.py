@@ -0,0 +1,56 @@
+"""
+Compare the legacy ``icontains`` date search on /api/control with the
+range predicates built by ``control.filters``.
+"""
+from benchmarks.common import measure, parser, report, seed, setup
+
+
+def main():
+    args = parser(__doc__).parse_args()
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers)
+
+    from django.db.models import Q
+
+    from control.filters import filter_controls
+    from control.models import Control
+
+    controls = Control.objects.select_related('vehicle', 'driver')
+    day = controls.order_by('-departure_date').values_list('departure_date', flat=True).first().isoformat()
+    month = day[:7]
+    vehicle_id = controls.values_list('vehicle_id', flat=True).first()
+
+    def legacy(search):
+        return controls.filter(
+            Q(departure_date__icontains=search) | Q(return_date__icontains=search)
+        )
+
+    cases = [
+        (f'search={day}', legacy(day), filter_controls(controls, {'search': day})),
+        (f'search={month}', legacy(month), filter_controls(controls, {'search': month})),
+        (
+            f'departure {month}',
+            legacy(month),
+            filter_controls(controls, {'departure_from': f'{month}-01', 'departure_to': f'{month}-28'}),
+        ),
+        (
+            f'vehicle + search={month}',
+            legacy(month).filter(vehicle_id=vehicle_id),
+            filter_controls(controls, {'vehicle': vehicle_id, 'search': month}),
+        ),
+    ]
+
+    rows = [('case', 'legacy count+page ms', 'range count+page ms', 'speedup')]
+    for label, old, new in cases:
+        def page(queryset):
+            return lambda: (queryset.count(), list(queryset[:10]))
+
+        old_ms = measure(page(old))
+        new_ms = measure(page(new))
+        rows.append((label, f'{old_ms:.2f}', f'{new_ms:.2f}', f'{old_ms / new_ms:.0f}x'))
+
+    report(f'/api/control search on {Control.objects.count()} trips', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Compare serializing control list pages with ``ControlSerializer`` over
+``select_related`` instances against the ``values()`` rows assembled by
+``core.serializers.ValuesSerializer``, the path used by the list endpoints,
+in full and with ``?fields=id,departure_date,destination&expand=``.
+"""
+from benchmarks.common import measure, parser, report, seed, setup
+
+
+def main():
+    args = parser(__doc__).parse_args()
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers, trips_per_day=args.trips_per_day)
+
+    from rest_framework.renderers import JSONRenderer
+
+    from control.models import Control
+    from control.serializers import ControlSerializer
+    from core.serializers import ValuesSerializer
+
+    values_serializer = ValuesSerializer(ControlSerializer)
+    sparse_serializer = values_serializer.select({'fields': 'id,departure_date,destination', 'expand': ''})
+    renderer = JSONRenderer()
+
+    def drf(size):
+        return lambda: renderer.render(
+            ControlSerializer(Control.objects.select_related('vehicle', 'driver')[:size], many=True).data
+        )
+
+    def values(serializer, size):
+        return lambda: renderer.render(
+            serializer.to_representation(serializer.values(Control.objects.all())[:size])
+        )
+
+    rows = [('page size', 'serializer ms', 'values ms', 'sparse ms', 'serializer rows/s', 'values rows/s',
+             'sparse rows/s', 'speedup')]
+    for size in (10, 100, 1000, 10000):
+        old_ms = measure(drf(size))
+        new_ms = measure(values(values_serializer, size))
+        sparse_ms = measure(values(sparse_serializer, size))
+        rows.append((size, f'{old_ms:.2f}', f'{new_ms:.2f}', f'{sparse_ms:.2f}', f'{size / old_ms * 1000:.0f}',
+                     f'{size / new_ms * 1000:.0f}', f'{size / sparse_ms * 1000:.0f}', f'{old_ms / new_ms:.1f}x'))
+
+    report(f'Control list serialization (query + render) on {Control.objects.count()} trips', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Concurrent writers and readers in separate processes, with the previous
+connection setup (rollback journal, no pragmas, reads on "default"), the
+current one (WAL, pragmas, reads on the read-only alias of the same file)
+and reads from a replica file refreshed by copying the database every
+--sync-interval seconds. Reports throughput, "database is locked" errors
+and p95 latency.
+"""
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import parser, report, seed, setup
+
+
+SETUPS = {
+    'before': 'rollback journal (before)',
+    'wal': 'wal + pragmas + read alias',
+    'replica': 'wal + replica file',
+}
+
+
+def configure(database, setup, replica):
+    """Settings of a worker process for one of the SETUPS."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = database
+    settings.DATABASES['read']['NAME'] = f'file:{replica or database}?mode=ro'
+    if setup == 'before':
+        for alias in settings.DATABASES.values():
+            alias['CONN_MAX_AGE'] = 0
+        settings.SQLITE_PRAGMAS = {}
+        settings.READ_DATABASES = {}
+    django.setup()
+
+    # What ReplicaMiddleware does for GET requests.
+    from core.routers import replica_reads
+    replica_reads.set(True)
+
+
+def writer(database, setup, replica, seconds, results):
+    configure(database, setup, replica)
+
+    from django.db import OperationalError, transaction
+
+    from control.models import Control
+
+    rng = random.Random(os.getpid())
+    ids = list(Control.objects.values_list('id', flat=True)[:50_000])
+    latencies, errors = [], 0
+
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                for pk in rng.sample(ids, 20):
+                    Control.objects.filter(pk=pk).update(destination=rng.choice(['Bauru', 'Santos']))
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    results.put(('write', latencies, errors))
+
+
+def reader(database, setup, replica, seconds, results):
+    configure(database, setup, replica)
+
+    from django.db import OperationalError
+
+    from control.models import Control
+    from vehicle.models import Vehicle
+
+    rng = random.Random(os.getpid())
+    vehicle_ids = list(Vehicle.objects.values_list('id', flat=True))
+    latencies, errors = [], 0
+
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            controls = Control.objects.filter(vehicle_id=rng.choice(vehicle_ids))
+            controls.count()
+            list(controls.select_related('vehicle', 'driver').order_by('-id')[:20])
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    results.put(('read', latencies, errors))
+
+
+def syncer(database, replica, seconds, interval, results):
+    """Refresh the replica from the database every ``interval`` seconds."""
+    from core.sqlite import copy_database
+
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        copy_database(database, replica)
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(interval)
+
+    results.put(('sync', latencies, 0))
+
+
+def run(source, setup, args):
+    """Copy ``source``, run the workers against the copy and return a report row."""
+    directory = tempfile.mkdtemp(prefix='fleet-bench-')
+    database = os.path.join(directory, 'contention.sqlite3')
+    shutil.copyfile(source, database)
+
+    with sqlite3.connect(database) as connection:
+        connection.execute(f'PRAGMA journal_mode = {"delete" if setup == "before" else "wal"}')
+
+    replica = None
+    if setup == 'replica':
+        from core.sqlite import copy_database
+
+        replica = os.path.join(directory, 'replica.sqlite3')
+        copy_database(database, replica)
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [
+        context.Process(target=writer, args=(database, setup, replica, args.seconds, results))
+        for _ in range(args.writers)
+    ] + [
+        context.Process(target=reader, args=(database, setup, replica, args.seconds, results))
+        for _ in range(args.readers)
+    ]
+    if replica:
+        workers.append(context.Process(
+            target=syncer, args=(database, replica, args.seconds, args.sync_interval, results),
+        ))
+    for worker in workers:
+        worker.start()
+
+    totals = {'write': ([], 0), 'read': ([], 0), 'sync': ([], 0)}
+    for _ in workers:
+        kind, latencies, errors = results.get()
+        totals[kind] = (totals[kind][0] + latencies, totals[kind][1] + errors)
+    for worker in workers:
+        worker.join()
+
+    shutil.rmtree(directory)
+
+    row = [SETUPS[setup]]
+    for kind in ('write', 'read'):
+        latencies, errors = totals[kind]
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else float('nan')
+        row += [f'{len(latencies) / args.seconds:.0f}/s', f'{errors} locked', f'p95 {p95:.1f} ms']
+
+    copies = totals['sync'][0]
+    row.append(f'{len(copies)} x {statistics.median(copies):.0f} ms' if copies else '-')
+    return row
+
+
+def main():
+    arguments = parser(__doc__)
+    arguments.add_argument('--writers', type=int, default=2)
+    arguments.add_argument('--readers', type=int, default=8)
+    arguments.add_argument('--seconds', type=float, default=10)
+    arguments.add_argument('--sync-interval', type=float, default=1, help='Seconds between replica copies')
+    args = arguments.parse_args()
+    database = setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers, trips_per_day=args.trips_per_day)
+
+    from django.db import connections
+    connections.close_all()
+
+    rows = [(
+        'setup', 'writes', 'write errors', 'write latency', 'reads', 'read errors', 'read latency',
+        'replica copies',
+    )]
+    for name in SETUPS:
+        rows.append(run(database, name, args))
+
+    report(f'{args.writers} writers (20-row transactions), {args.readers} readers (vehicle list page)', rows)
+
+
+if __name__ == '__main__':
+    main()
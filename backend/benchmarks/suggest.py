@@ -0,0 +1,59 @@
+"""
+Cost of filling the control form selectors: the whole /api/driver/all and
+/api/vehicle/all lists against /suggest requests for each prefix typed,
+without and with the response cache.
+"""
+from benchmarks.common import measure, parser, report, seed, setup
+
+
+def main():
+    arguments = parser(__doc__, rows=1_000_000)
+    arguments.set_defaults(vehicles=20_000, drivers=100_000)
+    args = arguments.parse_args()
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers)
+
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.test import Client
+
+    from driver.models import Driver
+    from vehicle.models import Vehicle
+
+    client = Client()
+    driver = Driver.objects.order_by('-id').values_list('name', flat=True).first()
+    vehicle = Vehicle.objects.order_by('-id').values_list('plate', flat=True).first()
+
+    def get(path):
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+        return response
+
+    def typing(path, text):
+        # One request per keystroke, as a debounced typeahead would send.
+        return [f'{path}?q={text[:length]}' for length in range(1, len(text) + 1)]
+
+    rows = [('request', 'bytes', 'no cache ms', 'cached ms')]
+    for label, paths in [
+        ('/api/driver/all', ['/api/driver/all']),
+        ('/api/vehicle/all', ['/api/vehicle/all']),
+        (f'/api/driver/suggest, typing "{driver}"', typing('/api/driver/suggest', driver)),
+        (f'/api/vehicle/suggest, typing "{vehicle}"', typing('/api/vehicle/suggest', vehicle)),
+    ]:
+        size = max(len(get(path).content) for path in paths)
+
+        settings.RESPONSE_CACHE_ALIAS = None
+        uncached = measure(lambda: [get(path) for path in paths], repeat=3)
+
+        settings.RESPONSE_CACHE_ALIAS = 'responses'
+        caches['responses'].clear()
+        [get(path) for path in paths]
+        cached = measure(lambda: [get(path) for path in paths], repeat=3)
+
+        rows.append((label, f'{size} max' if len(paths) > 1 else size, f'{uncached:.1f}', f'{cached:.1f}'))
+
+    report(f'Selectors with {Driver.objects.count()} drivers and {Vehicle.objects.count()} vehicles', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Cost of keeping a client copy of the trips in sync: downloading every
+trip through /api/control/changes against asking only for what changed
+since the previous token, after writes of different sizes.
+"""
+from benchmarks.common import measure, parser, report, seed, setup
+
+
+def main():
+    arguments = parser(__doc__)
+    arguments.add_argument('--limit', type=int, default=5000, help='Changes per request')
+    args = arguments.parse_args()
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers, trips_per_day=args.trips_per_day)
+
+    from django.conf import settings
+    from django.test import Client
+
+    from control.bulk import delete_controls, update_controls
+    from control.models import Control
+
+    settings.SYNC_SETTLE_SECONDS = 0
+    client = Client()
+
+    def sync(token):
+        """Follow next_token until has_more is false; returns (token, changes, requests, bytes)."""
+        changes = requests = size = 0
+        while True:
+            params = {'limit': args.limit, 'expand': ''}
+            if token:
+                params['since'] = token
+            response = client.get('/api/control/changes', params)
+            assert response.status_code == 200, response.content
+            data = response.json()
+            token = data['next_token']
+            changes += len(data['results']) + len(data['deleted'])
+            requests += 1
+            size += len(response.content)
+            if not data['has_more']:
+                return token, changes, requests, size
+
+    rows = [('sync', 'changes', 'requests', 'bytes', 'ms')]
+
+    token, changes, requests, size = sync(None)
+    rows.append(('full download', changes, requests, size, f'{measure(lambda: sync(None), repeat=1):.1f}'))
+
+    ids = list(Control.objects.order_by('?').values_list('id', flat=True)[:12_200])
+    for written in (0, 10, 1000, 10_000):
+        updated, deleted = ids[:written], ids[written:written + written // 10]
+        ids = ids[written + written // 10:]
+        if updated:
+            update_controls(Control.objects.filter(id__in=updated), {'destination': 'Bauru'})
+        if deleted:
+            delete_controls(Control.objects.filter(id__in=deleted))
+
+        _, changes, requests, size = sync(token)
+        elapsed = measure(lambda: sync(token), repeat=3)
+        rows.append((f'since token, {written} updated + {len(deleted)} deleted', changes, requests, size, f'{elapsed:.1f}'))
+        token = sync(token)[0]
+
+    report(f'Syncing {Control.objects.count()} trips, {args.limit} changes per request', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare the ``icontains`` text search of the driver, vehicle and control
+lists with the FTS5 index (count + first page, as the list endpoints run).
+"""
+from benchmarks.common import measure, parser, report, seed, setup
+
+
+def main():
+    arguments = parser(__doc__, rows=1_000_000)
+    arguments.set_defaults(vehicles=20_000, drivers=100_000)
+    args = arguments.parse_args()
+    setup(args.database)
+    seed(args.rows, args.vehicles, args.drivers)
+
+    from django.conf import settings
+    from django.db import connection
+
+    from control.filters import filter_controls
+    from control.models import Control
+    from driver.filters import filter_drivers
+    from driver.models import Driver
+    from vehicle.filters import filter_vehicles
+    from vehicle.models import Vehicle
+
+    driver = Driver.objects.order_by('-id').values('name', 'phone').first()
+    vehicle = Vehicle.objects.order_by('-id').values('plate', 'model').first()
+
+    cases = [
+        (f'driver "{driver["name"]}"', filter_drivers, Driver.objects.all(), driver['name']),
+        (f'driver phone "{driver["phone"][:9]}"', filter_drivers, Driver.objects.all(), driver['phone'][:9]),
+        (f'vehicle "{vehicle["plate"]}"', filter_vehicles, Vehicle.objects.all(), vehicle['plate']),
+        (f'vehicle "{vehicle["model"]}"', filter_vehicles, Vehicle.objects.all(), vehicle['model']),
+        (f'control "{driver["name"]}"', filter_controls, Control.objects.all(), driver['name']),
+        (f'control "{vehicle["plate"]}"', filter_controls, Control.objects.all(), vehicle['plate']),
+        ('control "Bauru"', filter_controls, Control.objects.all(), 'Bauru'),
+    ]
+
+    def page(function, queryset, search):
+        def run():
+            rows = function(queryset, {'search': search})
+            return rows.count(), list(rows[:10])
+        return run
+
+    rows = [('case', 'like count', 'like ms', 'fts5 count', 'fts5 ms', 'speedup')]
+    for label, function, queryset, search in cases:
+        settings.FULL_TEXT_SEARCH = False
+        like_count = page(function, queryset, search)()[0]
+        like_ms = measure(page(function, queryset, search))
+
+        settings.FULL_TEXT_SEARCH = True
+        fts_count = page(function, queryset, search)()[0]
+        fts_ms = measure(page(function, queryset, search))
+
+        rows.append((label, like_count, f'{like_ms:.2f}', fts_count, f'{fts_ms:.2f}', f'{like_ms / fts_ms:.1f}x'))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat WHERE name LIKE '%search%' GROUP BY name ORDER BY name"
+        )
+        sizes = [(name, f'{size / 2**20:.1f} MiB') for name, size in cursor.fetchall()]
+
+    report(
+        f'Text search on {Driver.objects.count()} drivers, {Vehicle.objects.count()} vehicles '
+        f'and {Control.objects.count()} trips',
+        rows,
+    )
+    if sizes:
+        report('Index size', sizes)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ControlConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'control'
+
+    def ready(self):
+        from core.sync import track_deletions
+        from core.versions import track
+        from . import signals  # noqa: F401
+        from .models import Control
+
+        track(Control)
+        track_deletions(Control)
@@ -0,0 +1,263 @@
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, ExpressionWrapper, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from core.bulk import BulkError, delete_rows
+from core.signals import bulk_changed
+from core.sync import record_deletions
+from driver.models import Driver
+from vehicle.models import Vehicle
+from .models import Control
+from .odometer import OdometerRegression, batch_regressions
+from .overlaps import TripOverlap, batch_overlaps, trip_window
+
+REQUIRED_FIELDS = ['vehicle', 'driver', 'departure_date', 'departure_time', 'departure_km', 'destination',
+                   'return_date', 'return_time', 'return_km']
+
+TRIP_FIELDS = ['departure_date', 'departure_time', 'departure_km', 'destination',
+               'return_date', 'return_time', 'return_km']
+
+MAX_BULK_ROWS = 10000
+
+# Fields an update must change for the trips to be checked again.
+CHECKED_FIELDS = {'vehicle_id', 'driver_id', 'departure_date', 'departure_time', 'departure_km',
+                  'return_date', 'return_time', 'return_km'}
+
+
+class RowError(BulkError):
+    pass
+
+
+def clean_trip(row):
+    """
+    Validate the trip fields of one control payload and return them as
+    python values, including the computed ``distance_traveled``.
+    """
+    values = {}
+
+    for name in TRIP_FIELDS:
+        field = Control._meta.get_field(name)
+        value = row.get(name)
+
+        if value in (None, ''):
+            if not field.null:
+                raise RowError(f"Missing {name}")
+            values[name] = None
+            continue
+
+        try:
+            values[name] = field.to_python(value)
+        except ValidationError:
+            raise RowError(f"Invalid {name}")
+
+    for name in ('departure_km', 'return_km'):
+        if values[name] is not None and values[name] < 0:
+            raise RowError(f"Invalid {name}")
+
+    if values['return_km'] is not None and values['return_km'] < values['departure_km']:
+        raise RowError("return_km must be greater than or equal to departure_km")
+
+    # Same rule as Control.save
+    values['distance_traveled'] = (
+        values['return_km'] - values['departure_km'] if values['return_km'] else None
+    )
+    return values
+
+
+def clean_reference(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"Invalid {name}")
+
+
+def check_trips(entries, exclude=None):
+    """
+    ``{index: error}`` for the trips in ``entries``, ``(index, values)``
+    pairs with ``vehicle_id`` and ``driver_id``, that overlap another trip
+    of the vehicle or driver or break the vehicle's odometer, against the
+    stored trips and each other: the checks of the single create and update
+    views, batched per vehicle and driver. ``exclude`` leaves out stored
+    trips, such as the rows being updated.
+    """
+    rejected = {}
+    for index, values in entries:
+        try:
+            trip_window(values)
+        except BulkError as error:
+            rejected[index] = error
+
+    checks = [partial(batch_overlaps, 'vehicle'), partial(batch_overlaps, 'driver'), batch_regressions]
+    for check in checks:
+        remaining = [(index, values) for index, values in entries if index not in rejected]
+        rejected.update(check(remaining, exclude=exclude))
+
+    return rejected
+
+
+def row_error(index, error):
+    entry = {"index": index, "error": str(error)}
+    if isinstance(error, (TripOverlap, OdometerRegression)) and error.control_id is not None:
+        entry["conflict"] = error.control_id
+    return entry
+
+
+def create_controls(rows, batch_size=1000):
+    """
+    Validate and insert many trips at once.
+
+    Vehicles and drivers are resolved with one query each and the valid rows
+    are inserted with batched ``bulk_create`` in a single transaction. Rows
+    overlapping another trip or breaking the odometer, stored or in the same
+    payload, are rejected like the invalid ones. Returns the created
+    controls and a list of ``{"index", "error"}`` for the rows that were
+    rejected, with the ``conflict`` id when the other trip is stored.
+    """
+    cleaned = []
+    errors = []
+
+    for index, row in enumerate(rows):
+        try:
+            if not isinstance(row, dict):
+                raise RowError("Expected an object")
+
+            missing = [field for field in REQUIRED_FIELDS if field not in row]
+            if missing:
+                raise RowError(f"Missing required fields: {', '.join(missing)}")
+
+            values = clean_trip(row)
+            values['vehicle_id'] = clean_reference(row['vehicle'], 'vehicle')
+            values['driver_id'] = clean_reference(row['driver'], 'driver')
+        except RowError as error:
+            errors.append({"index": index, "error": str(error)})
+            continue
+
+        cleaned.append((index, values))
+
+    vehicle_ids = set(Vehicle.objects.filter(
+        id__in={values['vehicle_id'] for _, values in cleaned}
+    ).values_list('id', flat=True))
+    driver_ids = set(Driver.objects.filter(
+        id__in={values['driver_id'] for _, values in cleaned}
+    ).values_list('id', flat=True))
+
+    valid = []
+    for index, values in cleaned:
+        if values['vehicle_id'] not in vehicle_ids:
+            errors.append({"index": index, "error": "Vehicle not found"})
+        elif values['driver_id'] not in driver_ids:
+            errors.append({"index": index, "error": "Driver not found"})
+        else:
+            valid.append((index, values))
+
+    rejected = check_trips(valid)
+    errors.extend(row_error(index, error) for index, error in rejected.items())
+    controls = [Control(**values) for index, values in valid if index not in rejected]
+
+    if controls:
+        with transaction.atomic():
+            controls = Control.objects.bulk_create(controls, batch_size=batch_size)
+            bulk_changed.send(
+                sender=Control,
+                vehicle_ids={control.vehicle_id for control in controls},
+                driver_ids={control.driver_id for control in controls},
+            )
+
+    errors.sort(key=lambda error: error["index"])
+    return controls, errors
+
+
+def affected_references(controls):
+    vehicle_ids = set()
+    driver_ids = set()
+
+    for vehicle_id, driver_id in controls.values_list('vehicle_id', 'driver_id').distinct().iterator():
+        vehicle_ids.add(vehicle_id)
+        driver_ids.add(driver_id)
+
+    return vehicle_ids, driver_ids
+
+
+def check_update(controls, values):
+    fields = ['id', 'vehicle_id', 'driver_id', *TRIP_FIELDS]
+    entries = [(row['id'], dict(row, **values)) for row in controls.values(*fields).iterator()]
+
+    rejected = check_trips(entries, exclude=controls.values('pk'))
+    if rejected:
+        control_id = min(rejected)
+        raise BulkError(f"Control {control_id}: {rejected[control_id]}")
+
+
+def update_controls(controls, values):
+    """
+    Apply ``values`` to every control in the queryset with a single UPDATE.
+
+    When a km field changes ``distance_traveled`` is recomputed by the
+    database with the same rule as ``Control.save``. When the vehicle,
+    driver, dates or km change, the updated trips are checked for overlaps
+    and odometer continuity first and BulkError names the first one
+    rejected.
+    """
+    values = dict(values, updated_at=timezone.now())
+    controls = controls.order_by()
+
+    if values.get('departure_km') is not None and values.get('return_km'):
+        if values['return_km'] < values['departure_km']:
+            raise BulkError("return_km must be greater than or equal to departure_km")
+
+    if 'departure_km' in values or 'return_km' in values:
+        departure_km = Value(values['departure_km']) if 'departure_km' in values else F('departure_km')
+        return_km = Value(values['return_km']) if 'return_km' in values else F('return_km')
+        distance = ExpressionWrapper(return_km - departure_km, output_field=PositiveIntegerField())
+
+        if 'return_km' in values:
+            values['distance_traveled'] = distance if values['return_km'] else F('distance_traveled')
+        else:
+            values['distance_traveled'] = Case(
+                When(return_km__gt=0, then=distance),
+                default=F('distance_traveled'),
+                output_field=PositiveIntegerField(),
+            )
+
+    try:
+        with transaction.atomic():
+            if CHECKED_FIELDS & values.keys():
+                check_update(controls, {name: values[name] for name in CHECKED_FIELDS & values.keys()})
+
+            vehicle_ids, driver_ids = affected_references(controls)
+            updated = controls.update(**values)
+
+            if 'vehicle_id' in values:
+                vehicle_ids.add(values['vehicle_id'])
+            if 'driver_id' in values:
+                driver_ids.add(values['driver_id'])
+
+            bulk_changed.send(sender=Control, vehicle_ids=vehicle_ids, driver_ids=driver_ids)
+    except IntegrityError:
+        raise BulkError("return_km must be greater than or equal to departure_km")
+
+    return updated
+
+
+def delete_controls(controls):
+    """
+    Delete every control in the queryset with a single DELETE, after
+    storing their tombstones with a single INSERT.
+    """
+    controls = controls.order_by()
+
+    with transaction.atomic():
+        vehicle_ids, driver_ids = affected_references(controls)
+        record_deletions(controls)
+
+        # No per-row signals; the derived data is refreshed once through
+        # bulk_changed instead.
+        deleted = delete_rows(controls)
+
+        if deleted:
+            bulk_changed.send(sender=Control, vehicle_ids=vehicle_ids, driver_ids=driver_ids)
+
+    return deleted
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (output column, lookup)
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('vehicle_id', 'vehicle_id'),
+    ('vehicle_plate', 'vehicle__plate'),
+    ('vehicle_brand', 'vehicle__brand'),
+    ('vehicle_model', 'vehicle__model'),
+    ('driver_id', 'driver_id'),
+    ('driver_name', 'driver__name'),
+    ('driver_license_number', 'driver__license_number'),
+    ('departure_date', 'departure_date'),
+    ('departure_time', 'departure_time'),
+    ('departure_km', 'departure_km'),
+    ('destination', 'destination'),
+    ('return_date', 'return_date'),
+    ('return_time', 'return_time'),
+    ('return_km', 'return_km'),
+    ('distance_traveled', 'distance_traveled'),
+]
+
+CHUNK_SIZE = 2000
+
+
+def export_rows(controls):
+    """
+    Stream the controls as tuples joined to their vehicle and driver,
+    fetched from the cursor in chunks instead of being loaded at once.
+    """
+    return controls.values_list(*[lookup for _, lookup in EXPORT_COLUMNS]).iterator(chunk_size=CHUNK_SIZE)
+
+
+def csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column for column, _ in EXPORT_COLUMNS])
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def ndjson_stream(rows):
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    lines = []
+
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False))
+
+        if len(lines) == CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_stream(controls, export_format):
+    rows = export_rows(controls)
+
+    if export_format == 'ndjson':
+        return ndjson_stream(rows)
+
+    return csv_stream(rows)
@@ -0,0 +1,162 @@
+import calendar
+import re
+from datetime import date
+
+from django.db.models import Q
+from drf_yasg import openapi
+
+from core.search import match_query, uses_index
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+DATE_FILTERS = {
+    'departure_from': 'departure_date__gte',
+    'departure_to': 'departure_date__lte',
+    'return_from': 'return_date__gte',
+    'return_to': 'return_date__lte',
+}
+
+SEARCH_FORMATS = [
+    re.compile(r'^(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})$'),
+    re.compile(r'^(?P<day>\d{1,2})/(?P<month>\d{1,2})/(?P<year>\d{4})$'),
+    re.compile(r'^(?P<year>\d{4})-(?P<month>\d{1,2})$'),
+    re.compile(r'^(?P<month>\d{1,2})/(?P<year>\d{4})$'),
+    re.compile(r'^(?P<year>\d{4})$'),
+]
+
+# Pieces of dates such as "-07-", matched as text against the date columns.
+DATE_FRAGMENT = re.compile(r'^[\d/.\- ]+$')
+
+filter_parameters = [
+    openapi.Parameter(
+        name=name,
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        format=openapi.FORMAT_DATE,
+        description=description,
+    )
+    for name, description in [
+        ('departure_from', 'Departure date on or after (YYYY-MM-DD)'),
+        ('departure_to', 'Departure date on or before (YYYY-MM-DD)'),
+        ('return_from', 'Return date on or after (YYYY-MM-DD)'),
+        ('return_to', 'Return date on or before (YYYY-MM-DD)'),
+    ]
+] + [
+    openapi.Parameter(name='vehicle', in_=openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Vehicle ID'),
+    openapi.Parameter(name='driver', in_=openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Driver ID'),
+    openapi.Parameter(
+        name='open',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_BOOLEAN,
+        description='Only trips without (true) or with (false) a return date'
+    ),
+]
+
+
+def parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidFilter(f"Invalid {name}, expected YYYY-MM-DD")
+
+
+def parse_id(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidFilter(f"Invalid {name}")
+
+
+def parse_bool(value, name):
+    if str(value).lower() in ('true', '1'):
+        return True
+    if str(value).lower() in ('false', '0'):
+        return False
+    raise InvalidFilter(f"Invalid {name}, expected true or false")
+
+
+def search_date_range(search):
+    """
+    Translate a search term into the inclusive date range it denotes:
+    a day (2023-08-11 or 11/08/2023), a month (2023-08 or 08/2023) or a
+    year (2023). Returns None when the term is not a date.
+    """
+    search = search.strip()
+
+    for pattern in SEARCH_FORMATS:
+        match = pattern.match(search)
+        if not match:
+            continue
+
+        parts = match.groupdict()
+        year = int(parts['year'])
+
+        try:
+            if parts.get('day'):
+                day = date(year, int(parts['month']), int(parts['day']))
+                return day, day
+
+            if parts.get('month'):
+                month = int(parts['month'])
+                return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+            return date(year, 1, 1), date(year, 12, 31)
+        except ValueError:
+            return None
+
+    return None
+
+
+def filter_controls(controls, params):
+    """
+    Apply the list filters to a control queryset.
+
+    All date filters compile to plain range predicates on the indexed date
+    columns. Raises InvalidFilter for malformed values.
+    """
+    for name, lookup in DATE_FILTERS.items():
+        if params.get(name):
+            controls = controls.filter(**{lookup: parse_date(params[name], name)})
+
+    if params.get('vehicle'):
+        controls = controls.filter(vehicle_id=parse_id(params['vehicle'], 'vehicle'))
+
+    if params.get('driver'):
+        controls = controls.filter(driver_id=parse_id(params['driver'], 'driver'))
+
+    if params.get('open'):
+        controls = controls.filter(return_date__isnull=parse_bool(params['open'], 'open'))
+
+    search = params.get('search')
+    if search:
+        date_range = search_date_range(search)
+
+        if date_range:
+            controls = controls.filter(
+                Q(departure_date__range=date_range) | Q(return_date__range=date_range)
+            )
+        elif DATE_FRAGMENT.match(search):
+            controls = controls.filter(
+                Q(departure_date__icontains=search) | Q(return_date__icontains=search)
+            )
+        else:
+            controls = search_text(controls, search)
+
+    return controls
+
+
+def search_text(controls, search):
+    """
+    Controls whose destination, vehicle plate or driver name have words
+    starting with the words of ``search``.
+    """
+    query = match_query(search)
+    if query and uses_index(controls):
+        return controls.filter(search__document__match=query)
+
+    return controls.filter(
+        Q(destination__icontains=search) | Q(vehicle__plate__icontains=search) | Q(driver__name__icontains=search)
+    )
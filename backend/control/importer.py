@@ -0,0 +1,160 @@
+import csv
+import time
+
+from django.db import transaction
+
+from core.bulk import BulkError, clean_update
+from core.signals import bulk_changed
+from driver.models import Driver
+from vehicle.models import Vehicle
+from .bulk import check_trips, clean_trip, TRIP_FIELDS
+from .models import Control
+
+IMPORT_COLUMNS = {
+    'driver': ['name', 'phone', 'license_number'],
+    'vehicle': ['plate', 'brand', 'model', 'oil_change_km'],
+    'control': ['plate', 'license_number'] + TRIP_FIELDS,
+}
+
+
+class InvalidImport(ValueError):
+    pass
+
+
+class FleetImporter:
+    """
+    Import drivers, vehicles or controls from a CSV stream.
+
+    The file is read row by row and valid rows are written with
+    ``bulk_create`` in batched transactions, so memory use does not depend
+    on the file size. Controls reference their vehicle by plate and their
+    driver by license number, resolved through maps loaded once up front,
+    and each batch is checked for overlapping trips and odometer continuity
+    before it is written.
+    Derived data (mileage ledger) is refreshed once at the end of the run
+    for every vehicle touched.
+    """
+
+    def __init__(self, entity, batch_size=1000, on_error=None):
+        if entity not in IMPORT_COLUMNS:
+            raise InvalidImport(f"Invalid entity, expected one of: {', '.join(IMPORT_COLUMNS)}")
+
+        self.entity = entity
+        self.batch_size = batch_size
+        self.on_error = on_error
+
+        self.changed = {'vehicle_ids': set(), 'driver_ids': set()}
+        self.rows = 0
+        self.created = 0
+        self.failed = 0
+        self.seconds = 0
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.seconds) if self.seconds else 0
+
+    def run(self, stream):
+        """
+        Import every row of ``stream``. Raises InvalidImport for a missing
+        column or a stream that cannot be decoded or parsed; the batches
+        written before the error stay, and ``rows`` and ``created`` tell how
+        far the import got.
+        """
+        started = time.perf_counter()
+
+        try:
+            self.read(csv.DictReader(stream))
+        except UnicodeDecodeError:
+            raise InvalidImport("File must be UTF-8 encoded")
+        except csv.Error as error:
+            raise InvalidImport(f"Invalid CSV after line {self.rows + 1}: {error}")
+        finally:
+            # Batches commit on their own, so the derived data must follow
+            # whatever was written, even when the stream fails halfway.
+            if self.created:
+                model = {'driver': Driver, 'vehicle': Vehicle, 'control': Control}[self.entity]
+                with transaction.atomic():
+                    bulk_changed.send(sender=model, **self.changed)
+
+            self.seconds = time.perf_counter() - started
+
+        return self
+
+    def read(self, reader):
+        missing = [column for column in IMPORT_COLUMNS[self.entity] if column not in (reader.fieldnames or [])]
+        if missing:
+            raise InvalidImport(f"Missing columns: {', '.join(missing)}")
+
+        if self.entity == 'control':
+            # Duplicate plates or license numbers resolve to the last row.
+            self.vehicles = dict(Vehicle.objects.values_list('plate', 'id').iterator())
+            self.drivers = dict(Driver.objects.values_list('license_number', 'id').iterator())
+
+        batch = []
+        for row in reader:
+            self.rows += 1
+
+            try:
+                batch.append((reader.line_num, row, self.build(row)))
+            except BulkError as error:
+                self.reject(reader.line_num, row, error)
+                continue
+
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+
+        if batch:
+            self.write(batch)
+
+    def reject(self, line, row, error):
+        self.failed += 1
+        if self.on_error:
+            self.on_error(line, row, str(error))
+
+    def build(self, row):
+        columns = IMPORT_COLUMNS[self.entity]
+        row = {column: (row.get(column) or '').strip() for column in columns}
+
+        if self.entity == 'driver':
+            return Driver(**clean_update(Driver, row, columns))
+
+        if self.entity == 'vehicle':
+            return Vehicle(**clean_update(Vehicle, row, columns))
+
+        vehicle_id = self.vehicles.get(row['plate'])
+        if vehicle_id is None:
+            raise BulkError("Vehicle not found")
+
+        driver_id = self.drivers.get(row['license_number'])
+        if driver_id is None:
+            raise BulkError("Driver not found")
+
+        return Control(vehicle_id=vehicle_id, driver_id=driver_id, **clean_trip(row))
+
+    def write(self, batch):
+        if self.entity == 'control':
+            fields = ['vehicle_id', 'driver_id', *TRIP_FIELDS]
+            rejected = check_trips([
+                (position, {name: getattr(control, name) for name in fields})
+                for position, (_, _, control) in enumerate(batch)
+            ])
+            for position in sorted(rejected):
+                line, row, _ = batch[position]
+                self.reject(line, row, rejected[position])
+            batch = [entry for position, entry in enumerate(batch) if position not in rejected]
+
+        batch = [instance for _, _, instance in batch]
+        if not batch:
+            return
+
+        model = type(batch[0])
+
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+
+        if model is Control:
+            self.changed['vehicle_ids'].update(control.vehicle_id for control in batch)
+            self.changed['driver_ids'].update(control.driver_id for control in batch)
+
+        self.created += len(batch)
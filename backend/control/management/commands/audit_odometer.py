@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from control.models import Control
+from control.odometer import find_regressions
+
+
+class Command(BaseCommand):
+    help = 'Find trips departing below the odometer reading of the previous trip of the same vehicle'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vehicle',
+            type=int,
+            action='append',
+            dest='vehicle_ids',
+            help='Restrict to the given vehicle id (can be repeated)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Maximum number of regressions listed (0 lists all)',
+        )
+
+    def handle(self, *args, **options):
+        controls = Control.objects.all()
+        if options['vehicle_ids']:
+            controls = controls.filter(vehicle_id__in=options['vehicle_ids'])
+
+        found = 0
+        for vehicle_id, previous_id, control_id, odometer, departure_km in find_regressions(controls):
+            found += 1
+            if not options['limit'] or found <= options['limit']:
+                self.stdout.write(
+                    f'vehicle {vehicle_id}: control {control_id} departs at {departure_km} km, '
+                    f'below {odometer} km reached by control {previous_id}'
+                )
+
+        if found:
+            self.stdout.write(self.style.WARNING(f'{found} odometer regression(s)'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No odometer regressions'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from control.overlaps import OVERLAP_KEYS, find_overlaps
+
+
+class Command(BaseCommand):
+    help = 'Find trips of the same vehicle or driver whose departure/return windows overlap'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--by',
+            choices=OVERLAP_KEYS,
+            action='append',
+            dest='keys',
+            help='Only check vehicles or drivers (default both)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Maximum number of pairs listed per key (0 lists all)',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+
+        for key in options['keys'] or OVERLAP_KEYS:
+            found = 0
+            for value, earlier_id, later_id in find_overlaps(key):
+                found += 1
+                if not options['limit'] or found <= options['limit']:
+                    self.stdout.write(f'{key} {value}: controls {earlier_id} and {later_id} overlap')
+
+            if found:
+                self.stdout.write(self.style.WARNING(f'{found} overlapping pair(s) by {key}'))
+            total += found
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS('No overlapping trips'))
@@ -0,0 +1,52 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from control.importer import FleetImporter, InvalidImport, IMPORT_COLUMNS
+
+
+class Command(BaseCommand):
+    help = 'Import drivers, vehicles or controls from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('entity', choices=list(IMPORT_COLUMNS))
+        parser.add_argument('path', help='CSV file with a header row')
+        parser.add_argument('--errors', help='Write rejected rows with their line number and error to this CSV file')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        entity = options['entity']
+        error_file = open(options['errors'], 'w', newline='', encoding='utf-8') if options['errors'] else None
+        error_writer = None
+
+        if error_file:
+            error_writer = csv.writer(error_file)
+            error_writer.writerow(['line', 'error'] + IMPORT_COLUMNS[entity])
+
+        def on_error(line, row, message):
+            if error_writer:
+                error_writer.writerow([line, message] + [row.get(column, '') for column in IMPORT_COLUMNS[entity]])
+
+        importer = FleetImporter(entity, batch_size=options['batch_size'], on_error=on_error)
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+                importer.run(stream)
+        except OSError as error:
+            raise CommandError(str(error))
+        except InvalidImport as error:
+            raise CommandError(
+                f'{error} ({importer.created} of {importer.rows} row(s) imported before the error are kept)'
+            )
+        finally:
+            if error_file:
+                error_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.created} of {importer.rows} {entity} row(s) '
+            f'in {importer.seconds:.2f}s ({importer.rows_per_second} rows/sec)'
+        ))
+
+        if importer.failed:
+            destination = f', see {options["errors"]}' if error_file else ''
+            self.stdout.write(self.style.WARNING(f'{importer.failed} row(s) rejected{destination}'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from control import mileage
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-vehicle mileage ledger from the control table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report vehicles whose ledger is out of date, without fixing them',
+        )
+        parser.add_argument(
+            '--vehicle',
+            type=int,
+            action='append',
+            dest='vehicle_ids',
+            help='Restrict to the given vehicle id (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        stale = mileage.rebuild(vehicle_ids=options['vehicle_ids'], commit=not options['verify'])
+
+        if not stale:
+            self.stdout.write(self.style.SUCCESS('Mileage ledger is consistent'))
+            return
+
+        ids = ', '.join(str(vehicle_id) for vehicle_id in stale)
+        if options['verify']:
+            self.stdout.write(self.style.WARNING(f'{len(stale)} vehicle(s) out of date: {ids}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt mileage for {len(stale)} vehicle(s): {ids}'))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from control import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily mileage rollups per vehicle and per driver from the control table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report rollups that are out of date, without fixing them',
+        )
+        parser.add_argument(
+            '--vehicle',
+            type=int,
+            action='append',
+            dest='vehicle_ids',
+            help='Restrict to the given vehicle id (can be repeated)',
+        )
+        parser.add_argument(
+            '--driver',
+            type=int,
+            action='append',
+            dest='driver_ids',
+            help='Restrict to the given driver id (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        vehicle_ids = options['vehicle_ids']
+        driver_ids = options['driver_ids']
+
+        # Restricting one side alone leaves the other untouched.
+        if vehicle_ids and driver_ids is None:
+            driver_ids = []
+        if driver_ids and vehicle_ids is None:
+            vehicle_ids = []
+
+        stale = rollups.rebuild(vehicle_ids=vehicle_ids, driver_ids=driver_ids, commit=not options['verify'])
+
+        if not any(stale.values()):
+            self.stdout.write(self.style.SUCCESS('Mileage rollups are consistent'))
+            return
+
+        for key, ids in stale.items():
+            if not ids:
+                continue
+
+            listed = ', '.join(str(value) for value in ids)
+            if options['verify']:
+                self.stdout.write(self.style.WARNING(f'{len(ids)} {key}(s) out of date: {listed}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {len(ids)} {key}(s): {listed}'))
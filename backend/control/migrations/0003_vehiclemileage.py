@@ -0,0 +1,50 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_mileage(apps, schema_editor):
+    Control = apps.get_model('control', 'Control')
+    VehicleMileage = apps.get_model('control', 'VehicleMileage')
+
+    totals = Control.objects.order_by().values('vehicle_id').annotate(
+        total=Coalesce(Sum('distance_traveled'), 0),
+        trips=Count('id'),
+        odometer=Max(Coalesce('return_km', 'departure_km')),
+    )
+    VehicleMileage.objects.bulk_create([
+        VehicleMileage(
+            vehicle_id=row['vehicle_id'],
+            total_km=row['total'],
+            trip_count=row['trips'],
+            last_odometer=row['odometer'] or 0,
+        )
+        for row in totals
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0002_alter_vehicle_table'),
+        ('control', '0002_alter_control_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleMileage',
+            fields=[
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='mileage', serialize=False, to='vehicle.vehicle')),
+                ('total_km', models.PositiveBigIntegerField(default=0)),
+                ('trip_count', models.PositiveIntegerField(default=0)),
+                ('last_odometer', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'vehicle_mileage',
+            },
+        ),
+        migrations.RunPython(populate_mileage, migrations.RunPython.noop),
+    ]
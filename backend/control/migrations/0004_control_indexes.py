@@ -0,0 +1,37 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control', '0003_vehiclemileage'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='control',
+            options={'ordering': ['-departure_date', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='control',
+            index=models.Index(fields=['vehicle', 'departure_date'], name='control_vehicle_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='control',
+            index=models.Index(fields=['driver', 'departure_date'], name='control_driver_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='control',
+            index=models.Index(fields=['departure_date', 'id'], name='control_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='control',
+            index=models.Index(fields=['return_date'], name='control_return_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='control',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['vehicle', 'departure_date'], name='control_open_trip_idx'),
+        ),
+    ]
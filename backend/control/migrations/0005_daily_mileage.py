@@ -0,0 +1,85 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_rollups(apps, schema_editor):
+    Control = apps.get_model('control', 'Control')
+
+    for key, model_name in [('vehicle', 'VehicleDailyMileage'), ('driver', 'DriverDailyMileage')]:
+        model = apps.get_model('control', model_name)
+        totals = Control.objects.order_by().values(f'{key}_id', 'departure_date').annotate(
+            trips=Count('id'),
+            total=Coalesce(Sum('distance_traveled'), 0),
+        )
+        model.objects.bulk_create([
+            model(**{
+                f'{key}_id': row[f'{key}_id'],
+                'day': row['departure_date'],
+                'week': row['departure_date'] - timedelta(days=row['departure_date'].weekday()),
+                'month': row['departure_date'].replace(day=1),
+                'trip_count': row['trips'],
+                'total_km': row['total'],
+            })
+            for row in totals.iterator()
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver', '0001_initial'),
+        ('vehicle', '0002_alter_vehicle_table'),
+        ('control', '0004_control_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverDailyMileage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('week', models.DateField()),
+                ('month', models.DateField()),
+                ('trip_count', models.PositiveIntegerField(default=0)),
+                ('total_km', models.PositiveBigIntegerField(default=0)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_mileage', to='driver.driver')),
+            ],
+            options={
+                'db_table': 'driver_daily_mileage',
+            },
+        ),
+        migrations.CreateModel(
+            name='VehicleDailyMileage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('week', models.DateField()),
+                ('month', models.DateField()),
+                ('trip_count', models.PositiveIntegerField(default=0)),
+                ('total_km', models.PositiveBigIntegerField(default=0)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_mileage', to='vehicle.vehicle')),
+            ],
+            options={
+                'db_table': 'vehicle_daily_mileage',
+                'indexes': [models.Index(fields=['day'], name='vehicle_daily_mileage_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vehicledailymileage',
+            constraint=models.UniqueConstraint(fields=('vehicle', 'day'), name='vehicle_daily_mileage_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='driverdailymileage',
+            index=models.Index(fields=['day'], name='driver_daily_mileage_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='driverdailymileage',
+            constraint=models.UniqueConstraint(fields=('driver', 'day'), name='driver_daily_mileage_unique'),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
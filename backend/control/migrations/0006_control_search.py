@@ -0,0 +1,66 @@
+# Generated by Django 4.2.4 on 2026-10-18 13:31
+
+import core.search
+from core.search import create_index_sql, drop_index_sql, run_if_fts5
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# The plate and driver name are copied into the index, so it also follows
+# changes to them.
+VALUES = (
+    "(SELECT plate FROM vehicle WHERE id = new.vehicle_id), "
+    "(SELECT name FROM driver WHERE id = new.driver_id)"
+)
+
+CREATE_INDEX = [
+    create_index_sql('control_search', ['destination', 'plate', 'driver_name']),
+    "CREATE TRIGGER control_search_insert AFTER INSERT ON control BEGIN "
+    "INSERT INTO control_search(rowid, destination, plate, driver_name) "
+    f"VALUES (new.id, new.destination, {VALUES}); END",
+    "CREATE TRIGGER control_search_delete AFTER DELETE ON control BEGIN "
+    "DELETE FROM control_search WHERE rowid = old.id; END",
+    "CREATE TRIGGER control_search_update AFTER UPDATE OF destination, vehicle_id, driver_id ON control BEGIN "
+    "DELETE FROM control_search WHERE rowid = old.id; "
+    "INSERT INTO control_search(rowid, destination, plate, driver_name) "
+    f"VALUES (new.id, new.destination, {VALUES}); END",
+    "CREATE TRIGGER control_search_plate AFTER UPDATE OF plate ON vehicle BEGIN "
+    "UPDATE control_search SET plate = new.plate "
+    "WHERE rowid IN (SELECT id FROM control WHERE vehicle_id = new.id); END",
+    "CREATE TRIGGER control_search_driver_name AFTER UPDATE OF name ON driver BEGIN "
+    "UPDATE control_search SET driver_name = new.name "
+    "WHERE rowid IN (SELECT id FROM control WHERE driver_id = new.id); END",
+    "INSERT INTO control_search(rowid, destination, plate, driver_name) "
+    "SELECT control.id, control.destination, vehicle.plate, driver.name FROM control "
+    "JOIN vehicle ON vehicle.id = control.vehicle_id JOIN driver ON driver.id = control.driver_id",
+]
+
+DROP_INDEX = drop_index_sql('control_search', [
+    'control_search_insert', 'control_search_delete', 'control_search_update',
+    'control_search_plate', 'control_search_driver_name',
+])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver', '0001_initial'),
+        ('vehicle', '0002_alter_vehicle_table'),
+        ('control', '0005_daily_mileage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ControlSearch',
+            fields=[
+                ('control', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='control.control')),
+                ('document', core.search.SearchField(db_column='control_search')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'control_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(run_if_fts5(CREATE_INDEX), run_if_fts5(DROP_INDEX)),
+    ]
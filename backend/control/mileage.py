@@ -0,0 +1,132 @@
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from vehicle.models import Vehicle
+from .models import Control, VehicleMileage
+
+
+def trip_distance(distance_traveled):
+    return int(distance_traveled) if distance_traveled else 0
+
+
+def trip_odometer(departure_km, return_km):
+    """Highest odometer reading recorded by a trip."""
+    if return_km not in (None, ''):
+        return int(return_km)
+    return int(departure_km)
+
+
+def add_trip(vehicle_id, distance, odometer):
+    VehicleMileage.objects.get_or_create(vehicle_id=vehicle_id)
+    VehicleMileage.objects.filter(vehicle_id=vehicle_id).update(
+        total_km=F('total_km') + distance,
+        trip_count=F('trip_count') + 1,
+        last_odometer=Greatest('last_odometer', Value(odometer)),
+    )
+
+
+def remove_trip(vehicle_id, distance, odometer):
+    # Never create a row here: when a vehicle is deleted its ledger row may
+    # already be gone by the time the cascaded controls are removed.
+    VehicleMileage.objects.filter(vehicle_id=vehicle_id).update(
+        total_km=F('total_km') - distance,
+        trip_count=F('trip_count') - 1,
+    )
+
+    if VehicleMileage.objects.filter(vehicle_id=vehicle_id, last_odometer__lte=odometer).exists():
+        refresh_odometer(vehicle_id)
+
+
+def refresh_odometer(vehicle_id):
+    odometer = Control.objects.filter(vehicle_id=vehicle_id).aggregate(
+        odometer=Max(Coalesce('return_km', 'departure_km'))
+    )['odometer']
+
+    VehicleMileage.objects.filter(vehicle_id=vehicle_id).update(last_odometer=odometer or 0)
+
+
+def trip_saved(control, previous=None):
+    with transaction.atomic():
+        if previous:
+            remove_trip(
+                previous['vehicle_id'],
+                trip_distance(previous['distance_traveled']),
+                trip_odometer(previous['departure_km'], previous['return_km']),
+            )
+
+        add_trip(
+            control.vehicle_id,
+            trip_distance(control.distance_traveled),
+            trip_odometer(control.departure_km, control.return_km),
+        )
+
+
+def trip_deleted(control):
+    remove_trip(
+        control.vehicle_id,
+        trip_distance(control.distance_traveled),
+        trip_odometer(control.departure_km, control.return_km),
+    )
+
+
+def rebuild(vehicle_ids=None, commit=True):
+    """
+    Recompute the ledger from the control table.
+
+    Returns the ids of the vehicles whose ledger row did not match the trips,
+    fixing them unless ``commit`` is False.
+    """
+    vehicles = Vehicle.objects.all()
+    controls = Control.objects.all()
+    ledger = VehicleMileage.objects.all()
+
+    if vehicle_ids is not None:
+        vehicles = vehicles.filter(id__in=vehicle_ids)
+        controls = controls.filter(vehicle_id__in=vehicle_ids)
+        ledger = ledger.filter(vehicle_id__in=vehicle_ids)
+
+    totals = controls.order_by().values('vehicle_id').annotate(
+        total=Coalesce(Sum('distance_traveled'), 0),
+        trips=Count('id'),
+        odometer=Max(Coalesce('return_km', 'departure_km')),
+    )
+    expected = {
+        row['vehicle_id']: (row['total'], row['trips'], row['odometer'] or 0)
+        for row in totals
+    }
+    current = {
+        row.vehicle_id: row
+        for row in ledger
+    }
+
+    missing = []
+    stale = []
+    for vehicle_id in vehicles.values_list('id', flat=True).iterator():
+        total_km, trip_count, last_odometer = expected.get(vehicle_id, (0, 0, 0))
+        row = current.get(vehicle_id)
+
+        if row is None:
+            if trip_count:
+                missing.append(VehicleMileage(
+                    vehicle_id=vehicle_id,
+                    total_km=total_km,
+                    trip_count=trip_count,
+                    last_odometer=last_odometer,
+                ))
+            continue
+
+        if (row.total_km, row.trip_count, row.last_odometer) != (total_km, trip_count, last_odometer):
+            row.total_km = total_km
+            row.trip_count = trip_count
+            row.last_odometer = last_odometer
+            stale.append(row)
+
+    if commit:
+        with transaction.atomic():
+            VehicleMileage.objects.bulk_create(missing, batch_size=500)
+            VehicleMileage.objects.bulk_update(
+                stale, ['total_km', 'trip_count', 'last_odometer'], batch_size=500
+            )
+
+    return sorted([row.vehicle_id for row in missing + stale])
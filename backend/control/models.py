@@ -1,4 +1,5 @@
 from django.db import models
+from core.search import SearchField
 from driver.models import Driver
 from vehicle.models import Vehicle
 
@@ -14,13 +15,92 @@ class Control(models.Model):
     return_time = models.TimeField(null=True, blank=True)
     return_km = models.PositiveIntegerField(null=True, blank=True)
     distance_traveled = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['-departure_date']
+        ordering = ['-departure_date', '-id']
         db_table = 'control'
+        indexes = [
+            models.Index(fields=['vehicle', 'departure_date'], name='control_vehicle_departure_idx'),
+            models.Index(fields=['driver', 'departure_date'], name='control_driver_departure_idx'),
+            models.Index(fields=['departure_date', 'id'], name='control_departure_idx'),
+            models.Index(fields=['return_date'], name='control_return_date_idx'),
+            models.Index(fields=['updated_at', 'id'], name='control_updated_idx'),
+            models.Index(
+                fields=['vehicle', 'departure_date'],
+                condition=models.Q(return_date__isnull=True),
+                name='control_open_trip_idx',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if self.return_km:
             self.distance_traveled = int(self.return_km) - int(self.departure_km)
 
         super(Control, self).save(*args, **kwargs)
+
+
+class VehicleMileage(models.Model):
+    vehicle = models.OneToOneField(Vehicle, on_delete=models.CASCADE, primary_key=True, related_name='mileage')
+    total_km = models.PositiveBigIntegerField(default=0)
+    trip_count = models.PositiveIntegerField(default=0)
+    last_odometer = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'vehicle_mileage'
+
+
+class DailyMileage(models.Model):
+    day = models.DateField()
+    week = models.DateField()
+    month = models.DateField()
+    trip_count = models.PositiveIntegerField(default=0)
+    total_km = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class VehicleDailyMileage(DailyMileage):
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='daily_mileage')
+
+    class Meta:
+        db_table = 'vehicle_daily_mileage'
+        constraints = [
+            models.UniqueConstraint(fields=['vehicle', 'day'], name='vehicle_daily_mileage_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='vehicle_daily_mileage_day_idx'),
+        ]
+
+
+class DriverDailyMileage(DailyMileage):
+    driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='daily_mileage')
+
+    class Meta:
+        db_table = 'driver_daily_mileage'
+        constraints = [
+            models.UniqueConstraint(fields=['driver', 'day'], name='driver_daily_mileage_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='driver_daily_mileage_day_idx'),
+        ]
+
+
+class ControlSearch(models.Model):
+    """
+    FTS5 index of the destination of each control with the plate of its
+    vehicle and the name of its driver, kept in sync by triggers on the
+    control, vehicle and driver tables. Created on SQLite only (migration
+    0006).
+    """
+    control = models.OneToOneField(
+        Control, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search',
+    )
+    document = SearchField(db_column='control_search')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'control_search'
@@ -0,0 +1,163 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from core.bulk import BulkError
+from .mileage import trip_odometer
+from .models import Control
+from .overlaps import check_batch, departs_after, departs_before, first_trips, trip_window, trips_in_order
+
+
+class OdometerRegression(BulkError):
+
+    def __init__(self, message, control_id):
+        super().__init__(message)
+        self.control_id = control_id
+
+
+def trip_readings(trip):
+    """
+    Odometer readings of a trip as integers, from python values or raw
+    request strings. Raises BulkError instead of letting a bad value reach
+    ``Control.save``.
+    """
+    values = {}
+    for name in ('departure_km', 'return_km'):
+        value = trip.get(name)
+        if value in (None, ''):
+            values[name] = None
+            continue
+
+        try:
+            values[name] = Control._meta.get_field(name).to_python(value)
+        except ValidationError:
+            raise BulkError(f"Invalid {name}")
+
+        if values[name] < 0:
+            raise BulkError(f"Invalid {name}")
+
+    if values['departure_km'] is None:
+        raise BulkError("Missing departure_km")
+
+    if values['return_km'] is not None and values['return_km'] < values['departure_km']:
+        raise BulkError("return_km must be greater than or equal to departure_km")
+
+    return values['departure_km'], values['return_km']
+
+
+def trips_before(controls, start):
+    return controls.filter(departs_before(start, inclusive=True)).order_by('-departure_date', '-departure_time', '-id')
+
+
+def trips_after(controls, start):
+    return controls.filter(departs_after(start)).order_by('departure_date', 'departure_time', 'id')
+
+
+def neighbours(vehicle_id, start, exclude_id=None):
+    """
+    The trips of the vehicle departing immediately before and after
+    ``start``, each fetched with a single seek on the
+    ``(vehicle, departure_date)`` index.
+    """
+    controls = Control.objects.filter(vehicle_id=vehicle_id)
+    if exclude_id is not None:
+        controls = controls.exclude(pk=exclude_id)
+
+    fields = ('id', 'departure_km', 'return_km')
+    previous = trips_before(controls, start).values(*fields).first()
+    following = trips_after(controls, start).values(*fields).first()
+
+    return previous, following
+
+
+def check_odometer(trip, exclude_id=None):
+    """
+    Raise OdometerRegression when the trip does not continue the odometer
+    of the previous trip of the vehicle, or when the next trip departs
+    below its readings.
+    """
+    departure_km, return_km = trip_readings(trip)
+    start, _ = trip_window(trip)
+    previous, following = neighbours(trip['vehicle_id'], start, exclude_id)
+
+    if previous:
+        odometer = trip_odometer(previous['departure_km'], previous['return_km'])
+        if departure_km < odometer:
+            raise OdometerRegression(
+                f"departure_km is lower than the previous trip's odometer ({odometer})", previous['id']
+            )
+
+    if following:
+        odometer = trip_odometer(departure_km, return_km)
+        if following['departure_km'] < odometer:
+            raise OdometerRegression(
+                f"Odometer is higher than the next trip's departure_km ({following['departure_km']})",
+                following['id']
+            )
+
+
+def batch_regressions(entries, exclude=None):
+    """
+    ``{index: OdometerRegression}`` for the new trips in ``entries`` that
+    do not continue the odometer of the trip departing before them, stored
+    or new, or that pass the departure_km of the next one. The stored trips
+    compared are those of each vehicle departing between the days of its
+    first and last new trip, plus the one before and the one after them.
+    """
+    def span(trips):
+        days = [trip['departure_date'] for trip in trips]
+        return min(days), max(days)
+
+    def around(controls, spans):
+        inside = Q()
+        for days, values in spans.items():
+            inside |= Q(vehicle_id__in=values, departure_date__range=days)
+
+        before = controls.order_by('-departure_date', '-departure_time', '-id')
+        after = controls.order_by('departure_date', 'departure_time', 'id')
+        firsts = {value: first for (first, _), values in spans.items() for value in values}
+        lasts = {value: last for (_, last), values in spans.items() for value in values}
+
+        return (
+            inside
+            | Q(pk__in=first_trips('vehicle', firsts, before, 'lt'))
+            | Q(pk__in=first_trips('vehicle', lasts, after, 'gt'))
+        )
+
+    def conflict(earlier, later):
+        odometer = trip_odometer(earlier['departure_km'], earlier['return_km'])
+        if later['departure_km'] >= odometer:
+            return None
+
+        return (
+            OdometerRegression(
+                f"departure_km is lower than the previous trip's odometer ({odometer})", earlier.get('id')
+            ),
+            OdometerRegression(
+                f"Odometer is higher than the next trip's departure_km ({later['departure_km']})", later.get('id')
+            ),
+        )
+
+    fields = ['id', 'departure_date', 'departure_time', 'departure_km', 'return_km']
+    return check_batch('vehicle', entries, span, around, fields, conflict, exclude)
+
+
+def find_regressions(controls=None, chunk_size=5000):
+    """
+    Yield ``(vehicle_id, previous_id, control_id, odometer, departure_km)``
+    for every trip departing below the odometer of the trip before it, in
+    one pass over the trips sorted by vehicle and departure.
+    """
+    current = None
+    previous = None
+
+    for vehicle_id, _, _, control_id, departure_km, return_km in trips_in_order(
+        'vehicle', ['departure_km', 'return_km'], controls, chunk_size
+    ):
+        if vehicle_id != current:
+            current = vehicle_id
+            previous = None
+
+        if previous is not None and departure_km < previous[1]:
+            yield vehicle_id, previous[0], control_id, previous[1], departure_km
+
+        previous = (control_id, trip_odometer(departure_km, return_km))
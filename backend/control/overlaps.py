@@ -0,0 +1,292 @@
+from collections import defaultdict
+from datetime import date, time
+
+from django.core.exceptions import ValidationError
+from django.db.models import Case, DateField, OuterRef, Q, Subquery, Value, When
+
+from core.bulk import BulkError
+from .models import Control
+
+OVERLAP_KEYS = ['vehicle', 'driver']
+
+# End of an open trip, later than any real moment.
+UNBOUNDED = (date.max, time.max)
+
+
+class TripOverlap(BulkError):
+
+    def __init__(self, key, control_id):
+        super().__init__(f"{key.capitalize()} already has an overlapping trip")
+        self.key = key
+        self.control_id = control_id
+
+
+def trip_window(trip):
+    """
+    Start and end of a trip as ``(date, time)`` moments, from python values
+    or raw request strings. Open trips end at UNBOUNDED and a return date
+    without a time counts as the end of that day.
+    """
+    values = {}
+    for name in ('departure_date', 'departure_time', 'return_date', 'return_time'):
+        value = trip.get(name)
+        try:
+            values[name] = Control._meta.get_field(name).to_python(value) if value not in (None, '') else None
+        except ValidationError:
+            raise BulkError(f"Invalid {name}")
+
+    if values['departure_date'] is None or values['departure_time'] is None:
+        raise BulkError("Missing departure date or time")
+
+    start = (values['departure_date'], values['departure_time'])
+    if values['return_date'] is None:
+        return start, UNBOUNDED
+
+    end = (values['return_date'], values['return_time'] or time.max)
+    if end < start:
+        raise BulkError("return must be after departure")
+
+    return start, end
+
+
+def departs_before(moment, inclusive=False):
+    day, at = moment
+    return Q(departure_date__lte=day) & (
+        Q(departure_date__lt=day) | Q(departure_date=day, **{f'departure_time__{"lte" if inclusive else "lt"}': at})
+    )
+
+
+def departs_after(moment):
+    day, at = moment
+    return Q(departure_date__gte=day) & (Q(departure_date__gt=day) | Q(departure_date=day, departure_time__gt=at))
+
+
+def returns_after(moment):
+    day, at = moment
+    return (
+        Q(return_date__isnull=True)
+        | Q(return_date__gt=day)
+        | Q(return_date=day) & (Q(return_time__isnull=True) | Q(return_time__gt=at))
+    )
+
+
+def overlapping(key, value, start, end, exclude_id=None):
+    """
+    Trips of one vehicle or driver intersecting ``[start, end)``.
+
+    Given that the existing trips do not overlap each other, the only ones
+    that can intersect the window are those departing inside it plus the
+    last one departing at or before ``start``. Both are range seeks on the
+    ``(vehicle|driver, departure_date)`` indexes, so the cost does not grow
+    with the length of the history.
+    """
+    same = Q(**{f'{key}_id': value})
+    if exclude_id is not None:
+        same &= ~Q(pk=exclude_id)
+
+    previous = Control.objects.filter(same, departs_before(start, inclusive=True)).order_by(
+        '-departure_date', '-departure_time', '-id'
+    ).values('id')[:1]
+
+    inside = same & departs_after(start)
+    if end != UNBOUNDED:
+        inside &= departs_before(end)
+
+    # Each branch carries its own index constraint so the database can
+    # serve the OR with two seeks instead of scanning every trip of the
+    # vehicle or driver.
+    return Control.objects.filter(inside | Q(id__in=previous) & returns_after(start)).order_by()
+
+
+def check_overlaps(trip, exclude_id=None):
+    """Raise TripOverlap when the vehicle or the driver is already out."""
+    start, end = trip_window(trip)
+
+    for key in OVERLAP_KEYS:
+        conflict = overlapping(key, trip[f'{key}_id'], start, end, exclude_id).values_list('id', flat=True).first()
+        if conflict is not None:
+            raise TripOverlap(key, conflict)
+
+
+def departure_order(entry):
+    index, trip = entry
+    # Stored trips first, so a new trip departing at the same moment is
+    # the one rejected.
+    return (trip['departure_date'], trip['departure_time']), index is not None, index or 0
+
+
+def sweep(entries, conflict):
+    """
+    Return ``{index: error}`` for the new trips to leave out so that the
+    others follow each other without conflict.
+
+    ``entries`` are the ``(index, trip)`` of one vehicle or driver in
+    departure order, with index None for the stored trips, which are taken
+    as they are (the audit commands report those). ``conflict(earlier,
+    later)`` compares two consecutive trips and returns None or the errors
+    to report for the later and for the earlier one. A new trip conflicting
+    with a stored trip after it is rejected, and the stored trip is then
+    compared with the trip before.
+    """
+    rejected = {}
+    accepted = []
+
+    for index, trip in entries:
+        while accepted:
+            earlier_index, earlier = accepted[-1]
+            errors = conflict(earlier, trip)
+            if errors is None:
+                break
+            if index is not None:
+                rejected[index] = errors[0]
+                break
+            if earlier_index is None:
+                break
+            rejected[earlier_index] = errors[1]
+            accepted.pop()
+
+        if index not in rejected:
+            accepted.append((index, trip))
+
+    return rejected
+
+
+def first_trips(key, days, trips, lookup):
+    """
+    Ids of the first of the ordered ``trips`` of each vehicle or driver in
+    ``days``, ``{value: day}``, with a departure_date ``lookup`` (such as
+    ``lt``) its own day. Each one is a correlated seek on the
+    ``(vehicle|driver, departure_date)`` index.
+    """
+    values = defaultdict(list)
+    for value, day in days.items():
+        values[day].append(value)
+
+    bound = Case(*[When(pk__in=group, then=Value(day)) for day, group in values.items()], output_field=DateField())
+    first = trips.filter(
+        **{f'{key}_id': OuterRef('pk'), f'departure_date__{lookup}': OuterRef('bound')}
+    ).values('pk')[:1]
+    parent = Control._meta.get_field(key).related_model
+    return parent.objects.filter(pk__in=days).annotate(bound=bound, trip=Subquery(first)).values('trip')
+
+
+def check_batch(key, entries, span, around, fields, conflict, exclude=None, chunk_size=100):
+    """
+    Sweep the new trips in ``entries`` of each vehicle or driver together
+    with the stored trips around them; see ``sweep``.
+
+    ``span(trips)`` is the range of days covered by the new trips of one
+    vehicle or driver. Vehicles or drivers are taken ``chunk_size`` at a
+    time, in the order of their first new trip, and ``around(controls,
+    spans)`` is the filter of the stored trips around the span of each one
+    of the chunk, ``{span: values}``. A batch then costs a few queries
+    whatever the number of vehicles and drivers it touches, and each one
+    reads only its own range, however far the trips of the others reach.
+    ``exclude`` leaves out stored trips, such as the rows being updated.
+    """
+    column = f'{key}_id'
+    groups = defaultdict(list)
+    for index, trip in entries:
+        groups[trip[column]].append((index, trip))
+
+    controls = Control.objects.all() if exclude is None else Control.objects.exclude(pk__in=exclude)
+    values = sorted(groups, key=lambda value: min(departure_order(entry) for entry in groups[value]))
+
+    stored = defaultdict(list)
+    for offset in range(0, len(values), chunk_size):
+        spans = defaultdict(list)
+        for value in values[offset:offset + chunk_size]:
+            spans[span([trip for _, trip in groups[value]])].append(value)
+
+        for row in controls.filter(around(controls, spans)).order_by().values(column, *fields):
+            stored[row.pop(column)].append((None, row))
+
+    rejected = {}
+    for value, group in groups.items():
+        rejected.update(sweep(sorted(stored[value] + group, key=departure_order), conflict))
+
+    return rejected
+
+
+def batch_overlaps(key, entries, exclude=None):
+    """
+    ``{index: TripOverlap}`` for the new trips in ``entries`` overlapping a
+    stored trip or another new trip of the same vehicle or driver. As in
+    ``overlapping``, the stored trips compared are those departing inside
+    the days spanned by the new trips of each vehicle or driver, plus the
+    last one departing before them.
+    """
+    def span(trips):
+        windows = [trip_window(trip) for trip in trips]
+        end = max(window[1] for window in windows)
+        return min(window[0] for window in windows)[0], None if end == UNBOUNDED else end[0]
+
+    def around(controls, spans):
+        inside = Q()
+        for (first, last), values in spans.items():
+            days = Q(departure_date__gte=first) if last is None else Q(departure_date__range=(first, last))
+            inside |= Q(**{f'{key}_id__in': values}) & days
+
+        previous = controls.order_by('-departure_date', '-departure_time', '-id')
+        firsts = {value: first for (first, _), values in spans.items() for value in values}
+        return inside | Q(id__in=first_trips(key, firsts, previous, 'lt'))
+
+    def conflict(earlier, later):
+        if trip_window(later)[0] < trip_window(earlier)[1]:
+            return TripOverlap(key, earlier.get('id')), TripOverlap(key, later.get('id'))
+        return None
+
+    fields = ['id', 'departure_date', 'departure_time', 'return_date', 'return_time']
+    return check_batch(key, entries, span, around, fields, conflict, exclude)
+
+
+def trips_in_order(key, columns, controls=None, chunk_size=5000):
+    """
+    Yield ``(key_id, departure_date, departure_time, id, *columns)`` for
+    every trip, sorted by vehicle or driver and departure.
+
+    Rows are read in index order of ``(key, departure_date)`` and trips of
+    the same day are sorted by time in memory, so the database never sorts
+    the whole table.
+    """
+    column = f'{key}_id'
+    controls = (controls if controls is not None else Control.objects.all()).order_by(column, 'departure_date')
+    rows = controls.values_list(column, 'departure_date', 'departure_time', 'id', *columns).iterator(
+        chunk_size=chunk_size
+    )
+
+    day = []
+    for row in rows:
+        if day and row[:2] != day[0][:2]:
+            yield from sorted(day, key=lambda trip: (trip[2], trip[3]))
+            day = []
+        day.append(row)
+
+    yield from sorted(day, key=lambda trip: (trip[2], trip[3]))
+
+
+def find_overlaps(key, controls=None, chunk_size=5000):
+    """
+    Yield ``(value, earlier_id, later_id)`` for every overlapping pair found
+    in one pass over the trips sorted by ``key`` and departure. Each trip is
+    compared with the one reaching furthest among the previous trips of the
+    same vehicle or driver.
+    """
+    current = None
+    furthest = None
+
+    for value, departure_date, departure_time, control_id, return_date, return_time in trips_in_order(
+        key, ['return_date', 'return_time'], controls, chunk_size
+    ):
+        if value != current:
+            current = value
+            furthest = None
+
+        start = (departure_date, departure_time)
+        end = UNBOUNDED if return_date is None else (return_date, return_time or time.max)
+
+        if furthest is not None and start < furthest[0]:
+            yield value, furthest[1], control_id
+
+        if furthest is None or end > furthest[0]:
+            furthest = (end, control_id)
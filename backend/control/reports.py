@@ -0,0 +1,40 @@
+from django.db.models import F, Sum
+
+from .filters import InvalidFilter, parse_date
+from .rollups import ROLLUPS
+
+# Each rollup row stores the start of its week and month, so grouping is
+# done on plain columns instead of truncating dates row by row.
+REPORT_BUCKETS = ['day', 'week', 'month']
+
+
+def mileage_report(params):
+    """
+    Trip count and km per vehicle or driver and per day, week or month.
+
+    Served from the daily rollup tables, so the cost grows with the number
+    of buckets in the range rather than with the number of trips.
+    """
+    group = params.get('group', 'vehicle')
+    if group not in ROLLUPS:
+        raise InvalidFilter(f"Invalid group, expected one of: {', '.join(ROLLUPS)}")
+
+    bucket = params.get('bucket', 'day')
+    if bucket not in REPORT_BUCKETS:
+        raise InvalidFilter(f"Invalid bucket, expected one of: {', '.join(REPORT_BUCKETS)}")
+
+    rows = ROLLUPS[group].objects.all()
+
+    if params.get('from'):
+        rows = rows.filter(day__gte=parse_date(params['from'], 'from'))
+    if params.get('to'):
+        rows = rows.filter(day__lte=parse_date(params['to'], 'to'))
+
+    return rows.values(f'{group}_id', bucket).annotate(
+        trips=Sum('trip_count'),
+        km=Sum('total_km'),
+    ).values(
+        trips=F('trips'),
+        km=F('km'),
+        **{group: F(f'{group}_id'), 'period': F(bucket)},
+    ).order_by(bucket, group)
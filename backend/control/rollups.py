@@ -0,0 +1,137 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+
+from .mileage import trip_distance
+from .models import Control, DriverDailyMileage, VehicleDailyMileage
+
+ROLLUPS = {
+    'vehicle': VehicleDailyMileage,
+    'driver': DriverDailyMileage,
+}
+
+
+def periods(day):
+    """Week (starting on Monday) and month a day falls in, stored on each row."""
+    day = Control._meta.get_field('departure_date').to_python(day)
+    return {
+        'week': day - timedelta(days=day.weekday()),
+        'month': day.replace(day=1),
+    }
+
+
+def bucket(key, trip):
+    return {f'{key}_id': trip[f'{key}_id'], 'day': trip['departure_date']}
+
+
+def add_trip(trip):
+    distance = trip_distance(trip['distance_traveled'])
+
+    for key, model in ROLLUPS.items():
+        model.objects.get_or_create(**bucket(key, trip), defaults=periods(trip['departure_date']))
+        model.objects.filter(**bucket(key, trip)).update(
+            trip_count=F('trip_count') + 1,
+            total_km=F('total_km') + distance,
+        )
+
+
+def remove_trip(trip):
+    distance = trip_distance(trip['distance_traveled'])
+
+    # As with the mileage ledger, never create rows when removing: the
+    # parent may already be gone during a cascaded delete.
+    for key, model in ROLLUPS.items():
+        model.objects.filter(**bucket(key, trip)).update(
+            trip_count=F('trip_count') - 1,
+            total_km=F('total_km') - distance,
+        )
+        model.objects.filter(trip_count=0, **bucket(key, trip)).delete()
+
+
+def trip_values(control):
+    return {
+        'vehicle_id': control.vehicle_id,
+        'driver_id': control.driver_id,
+        'departure_date': control.departure_date,
+        'distance_traveled': control.distance_traveled,
+    }
+
+
+def trip_saved(control, previous=None):
+    with transaction.atomic():
+        if previous:
+            remove_trip(previous)
+
+        add_trip(trip_values(control))
+
+
+def trip_deleted(control):
+    with transaction.atomic():
+        remove_trip(trip_values(control))
+
+
+def rebuild_rollup(key, ids=None, commit=True):
+    """
+    Recompute one rollup table from the control table, restricted to the
+    given vehicle or driver ids. Returns the sorted ids that were stale.
+    """
+    model = ROLLUPS[key]
+    column = f'{key}_id'
+
+    controls = Control.objects.all()
+    rollup = model.objects.all()
+
+    if ids is not None:
+        controls = controls.filter(**{f'{column}__in': ids})
+        rollup = rollup.filter(**{f'{column}__in': ids})
+
+    expected = {
+        (row[column], row['departure_date']): (row['trips'], row['total'])
+        for row in controls.order_by().values(column, 'departure_date').annotate(
+            trips=Count('id'),
+            total=Coalesce(Sum('distance_traveled'), 0),
+        ).iterator()
+    }
+
+    stale_ids = set()
+    stale = []
+    obsolete = []
+    for row in rollup.iterator():
+        bucket = (getattr(row, column), row.day)
+        totals = expected.pop(bucket, None)
+
+        if totals is None:
+            obsolete.append(row.id)
+            stale_ids.add(bucket[0])
+        elif (row.trip_count, row.total_km) != totals:
+            row.trip_count, row.total_km = totals
+            stale.append(row)
+            stale_ids.add(bucket[0])
+
+    missing = [
+        model(**{column: bucket[0], 'day': bucket[1], 'trip_count': trips, 'total_km': total, **periods(bucket[1])})
+        for bucket, (trips, total) in expected.items()
+    ]
+    stale_ids.update(bucket[0] for bucket in expected)
+
+    if commit:
+        with transaction.atomic():
+            for start in range(0, len(obsolete), 500):
+                model.objects.filter(id__in=obsolete[start:start + 500]).delete()
+            model.objects.bulk_update(stale, ['trip_count', 'total_km'], batch_size=500)
+            model.objects.bulk_create(missing, batch_size=500)
+
+    return sorted(stale_ids)
+
+
+def rebuild(vehicle_ids=None, driver_ids=None, commit=True):
+    """
+    Recompute the daily rollups. ``None`` rebuilds every vehicle or driver,
+    an empty collection skips that rollup. Returns ``{key: stale ids}``.
+    """
+    return {
+        'vehicle': rebuild_rollup('vehicle', vehicle_ids, commit) if vehicle_ids is None or vehicle_ids else [],
+        'driver': rebuild_rollup('driver', driver_ids, commit) if driver_ids is None or driver_ids else [],
+    }
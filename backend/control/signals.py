@@ -0,0 +1,41 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from core.signals import bulk_changed
+
+from . import mileage, rollups
+from .models import Control
+
+
+@receiver(pre_save, sender=Control)
+def remember_previous_trip(sender, instance, raw=False, **kwargs):
+    instance._previous_trip = None
+
+    if instance.pk and not raw:
+        instance._previous_trip = Control.objects.filter(pk=instance.pk).values(
+            'vehicle_id', 'driver_id', 'departure_date', 'distance_traveled', 'departure_km', 'return_km'
+        ).first()
+
+
+@receiver(post_save, sender=Control)
+def update_mileage_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    mileage.trip_saved(instance, getattr(instance, '_previous_trip', None))
+    rollups.trip_saved(instance, getattr(instance, '_previous_trip', None))
+
+
+@receiver(post_delete, sender=Control)
+def update_mileage_on_delete(sender, instance, **kwargs):
+    mileage.trip_deleted(instance)
+    rollups.trip_deleted(instance)
+
+
+@receiver(bulk_changed, sender=Control)
+def rebuild_mileage_on_bulk_change(sender, vehicle_ids=(), driver_ids=(), **kwargs):
+    if vehicle_ids:
+        mileage.rebuild(vehicle_ids=vehicle_ids)
+
+    if vehicle_ids or driver_ids:
+        rollups.rebuild(vehicle_ids=vehicle_ids, driver_ids=driver_ids)
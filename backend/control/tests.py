@@ -1,6 +1,63 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta, timezone
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
-from .models import Control
+from core.bulk import delete_rows
+from core.serializers import ValuesSerializer
+from core.sync import decode_token
+from core.versions import versions
+from .models import Control, VehicleMileage, VehicleDailyMileage, DriverDailyMileage
+from . import mileage, rollups
+from .odometer import find_regressions, neighbours
+from .overlaps import check_overlaps, find_overlaps, overlapping, trip_window, TripOverlap
+from .serializers import ControlSerializer
+from driver.models import Driver
+from vehicle.models import Vehicle
+
+
+class FleetFixtureMixin:
+    """A driver and a vehicle, with trips between them made by ``create_control``."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.driver = Driver.objects.create(name='Matheus', phone='14 99655-5555', license_number='ABC123')
+        self.vehicle = Vehicle.objects.create(plate='ABC-1234', model='Fusca', brand='Volkswagen', oil_change_km=1000)
+
+    def create_control(self, **overrides):
+        """
+        A trip of ``self.vehicle`` and ``self.driver`` returning on the day
+        it departs, or an open one with ``return_date=None``.
+        """
+        values = {
+            'vehicle': self.vehicle,
+            'driver': self.driver,
+            'departure_date': '2023-08-11',
+            'departure_time': '10:30:00',
+            'departure_km': 150,
+            'destination': 'São Paulo',
+            'return_time': '12:30:00',
+            'return_km': 250,
+            **overrides,
+        }
+        values.setdefault('return_date', values['departure_date'])
+        if values['return_date'] is None:
+            values.update(return_time=None, return_km=None)
+        return Control.objects.create(**values)
 
 
 class ControlTestCase(TestCase):
@@ -150,3 +207,1546 @@ class ControlTestCase(TestCase):
 
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.data["error"], "Vehicle not found")
+
+
+class VehicleMileageTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_vehicle = Vehicle.objects.create(plate='XYZ-9876', model='Uno', brand='Fiat', oil_change_km=500)
+
+    def assertLedger(self, vehicle, total_km, trip_count, last_odometer):
+        ledger = VehicleMileage.objects.get(vehicle=vehicle)
+        self.assertEqual(
+            (ledger.total_km, ledger.trip_count, ledger.last_odometer),
+            (total_km, trip_count, last_odometer)
+        )
+        self.assertEqual(mileage.rebuild(commit=False), [])
+
+    def test_ledger_tracks_created_controls(self):
+        self.create_control(departure_km=150, return_km=250)
+        self.create_control(departure_km=250, return_km=400)
+
+        self.assertLedger(self.vehicle, 250, 2, 400)
+
+    def test_ledger_tracks_updated_controls(self):
+        control = self.create_control(departure_km=150, return_km=250)
+        self.create_control(departure_km=250, return_km=400)
+
+        control.return_km = 300
+        control.save()
+
+        self.assertLedger(self.vehicle, 300, 2, 400)
+
+    def test_ledger_follows_vehicle_change(self):
+        control = self.create_control(departure_km=150, return_km=250)
+        self.create_control(departure_km=250, return_km=400)
+
+        control.vehicle = self.other_vehicle
+        control.save()
+
+        self.assertLedger(self.vehicle, 150, 1, 400)
+        self.assertLedger(self.other_vehicle, 100, 1, 250)
+
+    def test_ledger_tracks_deleted_controls(self):
+        self.create_control(departure_km=150, return_km=250)
+        last = self.create_control(departure_km=250, return_km=400)
+
+        last.delete()
+
+        self.assertLedger(self.vehicle, 100, 1, 250)
+
+    def test_ledger_tracks_cascaded_deletes(self):
+        self.create_control(departure_km=150, return_km=250)
+        self.create_control(departure_km=100, return_km=200, vehicle=self.other_vehicle)
+
+        self.driver.delete()
+
+        self.assertLedger(self.vehicle, 0, 0, 0)
+        self.assertLedger(self.other_vehicle, 0, 0, 0)
+
+        self.vehicle.delete()
+        self.assertFalse(VehicleMileage.objects.filter(vehicle_id=self.vehicle.id).exists())
+
+    def test_total_km_reads_ledger(self):
+        self.create_control(departure_km=150, return_km=250)
+        self.create_control(departure_km=250, return_km=400)
+
+        # Table versions for the ETag, then the vehicle joined to its ledger
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/control/{self.vehicle.id}/total_km', format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_km"], 250)
+        self.assertEqual(response.data["km_left"], 750)
+
+    def test_rebuild_mileage_command(self):
+        self.create_control(departure_km=150, return_km=250)
+        VehicleMileage.objects.filter(vehicle=self.vehicle).update(total_km=0, trip_count=0)
+
+        out = StringIO()
+        call_command('rebuild_mileage', '--verify', stdout=out)
+        self.assertIn(f'1 vehicle(s) out of date: {self.vehicle.id}', out.getvalue())
+        self.assertEqual(VehicleMileage.objects.get(vehicle=self.vehicle).total_km, 0)
+
+        call_command('rebuild_mileage', stdout=StringIO())
+        self.assertLedger(self.vehicle, 100, 1, 250)
+
+
+class ControlCursorPaginationTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        # Several trips share a departure date so the id tie-breaker matters.
+        self.controls = [
+            self.create_control(departure_date=f'2023-08-{day:02d}', departure_km=index * 10, return_km=index * 10 + 10)
+            for index, day in enumerate([1, 1, 1, 2, 2, 3, 4, 4, 5])
+        ]
+        self.expected = [
+            control.id for control in
+            sorted(self.controls, key=lambda control: (control.departure_date, control.id), reverse=True)
+        ]
+
+    def test_walks_all_pages_forward_and_backward(self):
+        pages = []
+        response = self.client.get('/api/control?pagination=cursor&page_size=2')
+
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('total_items', response.data)
+            pages.append([control['id'] for control in response.data['results']])
+
+            if not response.data['next_cursor']:
+                break
+            response = self.client.get(f'/api/control?cursor={response.data["next_cursor"]}&page_size=2')
+
+        self.assertEqual([control_id for page in pages for control_id in page], self.expected)
+        self.assertEqual(len(pages), 5)
+
+        response = self.client.get(f'/api/control?cursor={response.data["previous_cursor"]}&page_size=2')
+        self.assertEqual([control['id'] for control in response.data['results']], pages[-2])
+
+    def test_page_number_envelope_is_default(self):
+        response = self.client.get('/api/control?page_size=2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_items'], len(self.controls))
+        self.assertNotIn('next_cursor', response.data)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/control?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid cursor')
+
+    def test_cursor_does_not_count_or_offset(self):
+        first = self.client.get('/api/control?pagination=cursor&page_size=2')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f'/api/control?cursor={first.data["next_cursor"]}&page_size=2')
+
+        # The table version lookup for the ETag, then the page itself
+        self.assertEqual(len(queries), 2)
+        self.assertIn('"table_version"', queries[0]['sql'])
+        self.assertNotIn('COUNT(', queries[1]['sql'])
+        self.assertNotIn('OFFSET', queries[1]['sql'])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class ControlQueryPlanTestCase(FleetFixtureMixin, TestCase):
+    """Every query the control views issue must be served by an index."""
+
+    def setUp(self):
+        super().setUp()
+        self.controls = [
+            self.create_control(departure_date=f'2023-08-{day:02d}', departure_km=day * 100, return_km=day * 100 + 50)
+            for day in range(1, 6)
+        ]
+
+    def query_plans(self, method, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, format='json')
+
+        self.assertLess(response.status_code, 300)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if '"control"' not in sql and '"vehicle_mileage"' not in sql:
+                    continue
+                if not sql.startswith('SELECT'):
+                    continue
+
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+
+        return response, plans
+
+    def assertIndexed(self, method, url, allow_sort=False):
+        response, plans = self.query_plans(method, url)
+        self.assertTrue(plans)
+
+        for sql, plan in plans:
+            for step in plan:
+                full_scan = step.startswith('SCAN') and 'INDEX' not in step
+
+                self.assertFalse(full_scan, f'Full table scan "{step}" for {sql}')
+                if not allow_sort:
+                    self.assertNotIn('TEMP B-TREE', step, f'Temporary sort "{step}" for {sql}')
+
+        return response
+
+    def test_list_queries_use_indexes(self):
+        self.assertIndexed('get', '/api/control?page_size=2')
+        self.assertIndexed('get', '/api/control?page=2&page_size=2')
+
+    def test_cursor_queries_use_indexes(self):
+        response = self.assertIndexed('get', '/api/control?pagination=cursor&page_size=2')
+        response = self.assertIndexed('get', f'/api/control?cursor={response.data["next_cursor"]}&page_size=2')
+        self.assertIndexed('get', f'/api/control?cursor={response.data["previous_cursor"]}&page_size=2')
+
+    def test_filter_queries_use_indexes(self):
+        self.assertIndexed('get', '/api/control?departure_from=2023-08-02&departure_to=2023-08-04')
+        self.assertIndexed('get', f'/api/control?vehicle={self.vehicle.id}')
+        self.assertIndexed('get', f'/api/control?vehicle={self.vehicle.id}&departure_from=2023-08-02')
+        self.assertIndexed('get', '/api/control?open=true')
+
+    def test_search_queries_use_indexes(self):
+        # Matches on either date column are merged, so only the (small)
+        # result set may need sorting.
+        self.assertIndexed('get', '/api/control?search=2023-08', allow_sort=True)
+        self.assertIndexed('get', '/api/control?search=2023-08-02', allow_sort=True)
+        self.assertIndexed('get', '/api/control?return_to=2023-08-03', allow_sort=True)
+
+    def test_detail_query_uses_index(self):
+        self.assertIndexed('get', f'/api/control/{self.controls[0].id}')
+
+    def test_total_km_query_uses_index(self):
+        self.assertIndexed('get', f'/api/control/{self.vehicle.id}/total_km')
+
+    def test_mileage_aggregate_uses_index(self):
+        self.assertIndexed('delete', f'/api/control/{self.controls[-1].id}/delete')
+
+    def test_overlap_check_uses_indexes(self):
+        start, end = trip_window({
+            'departure_date': '2023-08-03', 'departure_time': '11:00',
+            'return_date': '2023-08-04', 'return_time': '09:00',
+        })
+
+        for key in ('vehicle', 'driver'):
+            sql, params = overlapping(key, 1, start, end).values('id').query.sql_with_params()
+
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = [row[-1] for row in cursor.fetchall()]
+
+            # Both branches must seek on (key, departure_date); a search on
+            # the plain foreign key index would read the whole history.
+            searches = [step for step in plan if step.startswith(('SEARCH', 'SCAN'))]
+            self.assertTrue(searches)
+            for step in searches:
+                self.assertTrue(
+                    f'control_{key}_departure_idx' in step or 'PRIMARY KEY' in step,
+                    f'Unexpected access path "{step}"'
+                )
+
+    def test_odometer_neighbours_use_index(self):
+        start, _ = trip_window({'departure_date': '2023-08-03', 'departure_time': '11:00'})
+
+        with CaptureQueriesContext(connection) as queries:
+            previous, following = neighbours(self.vehicle.id, start, exclude_id=self.controls[2].id)
+
+        self.assertEqual((previous['id'], following['id']), (self.controls[1].id, self.controls[3].id))
+        self.assertEqual(len(queries), 2)
+
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                plan = [row[-1] for row in cursor.fetchall()]
+
+                self.assertTrue(any('control_vehicle_departure_idx' in step for step in plan), plan)
+                self.assertFalse(any(step.startswith('SCAN') for step in plan), plan)
+
+
+class ControlFilterTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_driver = Driver.objects.create(name='João', phone='14 99655-4444', license_number='DEF456')
+
+        self.july = self.create_control(departure_date='2023-07-30', return_date='2023-08-01')
+        self.august = self.create_control(departure_date='2023-08-11', driver=self.other_driver)
+        self.open = self.create_control(departure_date='2024-01-05', return_date=None)
+
+    def fetch_ids(self, query):
+        response = self.client.get(f'/api/control?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {control['id'] for control in response.data['results']}
+
+    def test_departure_range(self):
+        self.assertEqual(self.fetch_ids('departure_from=2023-08-01&departure_to=2023-12-31'), {self.august.id})
+        self.assertEqual(self.fetch_ids('departure_to=2023-07-30'), {self.july.id})
+
+    def test_return_range(self):
+        self.assertEqual(self.fetch_ids('return_from=2023-08-01&return_to=2023-08-01'), {self.july.id})
+
+    def test_vehicle_driver_and_open(self):
+        self.assertEqual(self.fetch_ids(f'driver={self.driver.id}'), {self.july.id, self.open.id})
+        self.assertEqual(self.fetch_ids(f'vehicle={self.vehicle.id}&open=true'), {self.open.id})
+        self.assertEqual(self.fetch_ids('open=false'), {self.july.id, self.august.id})
+
+    def test_search_as_date_range(self):
+        self.assertEqual(self.fetch_ids('search=2023-08'), {self.july.id, self.august.id})
+        self.assertEqual(self.fetch_ids('search=2023-08-11'), {self.august.id})
+        self.assertEqual(self.fetch_ids('search=11/08/2023'), {self.august.id})
+        self.assertEqual(self.fetch_ids('search=2024'), {self.open.id})
+
+    def test_search_falls_back_to_text_match(self):
+        self.assertEqual(self.fetch_ids('search=-07-'), {self.july.id})
+
+    # Set-based writes below skip the version bump the response cache keys on.
+    @override_settings(RESPONSE_CACHE_ALIAS=None)
+    def test_search_text(self):
+        everything = {self.july.id, self.august.id, self.open.id}
+        self.assertEqual(self.fetch_ids('search=sao paulo'), everything)
+        self.assertEqual(self.fetch_ids('search=abc-1234'), everything)
+        self.assertEqual(self.fetch_ids('search=joão'), {self.august.id})
+        self.assertEqual(self.fetch_ids('search=mat abc'), {self.july.id, self.open.id})
+        self.assertEqual(self.fetch_ids('search=campinas'), set())
+
+        # Changes to the trip, its vehicle or its driver reach the index.
+        Control.objects.filter(id=self.open.id).update(destination='Campinas')
+        self.assertEqual(self.fetch_ids('search=campinas'), {self.open.id})
+        Vehicle.objects.filter(id=self.vehicle.id).update(plate='XYZ-9999')
+        self.assertEqual(self.fetch_ids('search=xyz'), everything)
+        Driver.objects.filter(id=self.other_driver.id).update(name='Pedro')
+        self.assertEqual(self.fetch_ids('search=pedro'), {self.august.id})
+        Control.objects.filter(id=self.july.id).delete()
+        self.assertEqual(self.fetch_ids('search=mat'), {self.open.id})
+
+        with override_settings(FULL_TEXT_SEARCH=False):
+            self.assertEqual(self.fetch_ids('search=ampin'), {self.open.id})
+            self.assertEqual(self.fetch_ids('search=XYZ-99'), {self.august.id, self.open.id})
+
+    def test_invalid_filter(self):
+        response = self.client.get('/api/control?departure_from=yesterday')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid departure_from, expected YYYY-MM-DD')
+
+
+class BulkControlTestCase(FleetFixtureMixin, TestCase):
+
+    def trip(self, departure_km, return_km, **overrides):
+        return {
+            "vehicle": self.vehicle.id,
+            "driver": self.driver.id,
+            "departure_date": "2023-08-11",
+            "departure_time": "10:30:00",
+            "return_date": "2023-08-11",
+            "return_time": "12:30:00",
+            "departure_km": departure_km,
+            "return_km": return_km,
+            "destination": "São Paulo",
+            **overrides,
+        }
+
+    def day_trip(self, day, departure_km, return_km, **overrides):
+        departure = (date(2023, 1, 1) + timedelta(days=day)).isoformat()
+        return self.trip(departure_km, return_km, departure_date=departure, return_date=departure, **overrides)
+
+    def test_bulk_create(self):
+        rows = [self.day_trip(day, km, km + 10) for day, km in enumerate(range(0, 1000, 10))]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/control/bulk', rows, format='json')
+
+        # Lookups, the overlap and odometer checks per vehicle and driver,
+        # batched inserts, the ledger and rollup refresh and the table
+        # version bump; never one per row.
+        self.assertLess(len(queries), 36)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 100)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(Control.objects.count(), 100)
+        self.assertEqual(Control.objects.get(id=response.data['ids'][0]).distance_traveled, 10)
+
+    def test_bulk_create_reports_row_errors(self):
+        rows = [
+            self.trip(100, 200),
+            self.trip(100, 200, vehicle=999),
+            self.trip(100, 200, driver=999),
+            self.trip(300, 200),
+            self.trip(100, 200, departure_date='2023-13-45'),
+            {"vehicle": self.vehicle.id},
+        ]
+
+        response = self.client.post('/api/control/bulk', rows, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3, 4, 5])
+        self.assertEqual(response.data['errors'][0]['error'], 'Vehicle not found')
+        self.assertEqual(response.data['errors'][1]['error'], 'Driver not found')
+        self.assertEqual(response.data['errors'][2]['error'], 'return_km must be greater than or equal to departure_km')
+        self.assertEqual(response.data['errors'][3]['error'], 'Invalid departure_date')
+
+    def test_bulk_create_rejects_non_list(self):
+        response = self.client.post('/api/control/bulk', self.trip(100, 200), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Expected a list of controls')
+
+    def test_bulk_create_updates_mileage(self):
+        Control.objects.create(**{
+            **self.trip(0, 50),
+            'vehicle': self.vehicle,
+            'driver': self.driver,
+        })
+
+        self.client.post('/api/control/bulk', [
+            self.trip(50, 150, departure_time='13:00:00', return_time='14:00:00'),
+            self.trip(150, 175, departure_time='15:00:00', return_time='16:00:00'),
+        ], format='json')
+
+        response = self.client.get(f'/api/control/{self.vehicle.id}/total_km')
+        self.assertEqual(response.data['total_km'], 175)
+        self.assertEqual(mileage.rebuild(commit=False), [])
+
+    def test_bulk_create_rejects_overlaps(self):
+        stored = Control.objects.create(**{**self.trip(0, 50), 'vehicle': self.vehicle, 'driver': self.driver})
+
+        response = self.client.post('/api/control/bulk', [
+            self.trip(50, 60, departure_time='10:00:00', return_time='11:00:00'),
+            self.trip(50, 60, departure_time='13:00:00', return_time='14:00:00'),
+            self.trip(60, 70, departure_time='13:30:00', return_time='15:00:00'),
+            self.trip(60, 70, departure_time='14:00:00', return_time='15:00:00'),
+        ], format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'], [
+            {'index': 0, 'error': 'Vehicle already has an overlapping trip', 'conflict': stored.id},
+            {'index': 2, 'error': 'Vehicle already has an overlapping trip'},
+        ])
+        self.assertEqual(list(find_overlaps('vehicle')), [])
+
+    def test_bulk_checks_read_each_vehicle_range(self):
+        from unittest import mock
+        from control import overlaps
+
+        ids = self.create_trips()
+        vehicle = Vehicle.objects.create(plate='XYZ-9876', model='Uno', brand='Fiat', oil_change_km=500)
+        driver = Driver.objects.create(name='João', phone='14 99655-4444', license_number='DEF456')
+
+        # An open trip of another vehicle, long before, does not widen the
+        # range read for this one.
+        with mock.patch('control.overlaps.sweep', wraps=overlaps.sweep) as sweep:
+            response = self.client.post('/api/control/bulk', [
+                self.trip(
+                    0, None, vehicle=vehicle.id, driver=driver.id, departure_date='2023-07-01',
+                    return_date=None, return_time=None,
+                ),
+                self.trip(50, 60, departure_date='2023-08-10', return_date='2023-08-10'),
+            ], format='json')
+
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(
+            {trip['id'] for call in sweep.call_args_list for index, trip in call.args[0] if index is None}, {ids[4]}
+        )
+
+    def create_trips(self):
+        rows = [
+            self.trip(km, km + 10, departure_date=f'2023-08-{day:02d}', return_date=f'2023-08-{day:02d}')
+            for day, km in enumerate(range(0, 50, 10), 1)
+        ]
+        response = self.client.post('/api/control/bulk', rows, format='json')
+        return response.data['ids']
+
+    def test_bulk_update_by_ids(self):
+        ids = self.create_trips()
+        driver = Driver.objects.create(name='João', phone='14 99655-4444', license_number='DEF456')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                '/api/control/bulk',
+                {"ids": ids[:3], "data": {"driver": driver.id, "destination": "Bauru"}},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "control"')]), 1)
+        self.assertEqual(Control.objects.filter(driver=driver, destination='Bauru').count(), 3)
+
+    def test_bulk_update_recomputes_distance(self):
+        ids = self.create_trips()
+
+        response = self.client.patch(
+            '/api/control/bulk',
+            {"filters": {"departure_from": "2023-08-05"}, "data": {"departure_km": 44}},
+            format='json'
+        )
+
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(Control.objects.get(id=ids[3]).distance_traveled, 10)
+        self.assertEqual(Control.objects.get(id=ids[4]).distance_traveled, 6)
+        self.assertEqual(mileage.rebuild(commit=False), [])
+
+    def test_bulk_update_rejects_negative_distance(self):
+        ids = self.create_trips()
+
+        response = self.client.patch('/api/control/bulk', {"ids": ids, "data": {"departure_km": 45}}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'return_km must be greater than or equal to departure_km')
+        self.assertEqual(Control.objects.filter(departure_km=45).count(), 0)
+
+    def test_bulk_update_rejects_overlaps(self):
+        ids = self.create_trips()
+
+        # The updated rows are not compared with their own old versions.
+        response = self.client.patch(
+            '/api/control/bulk', {"ids": ids, "data": {"departure_time": "09:30"}}, format='json'
+        )
+        self.assertEqual(response.data['updated'], 5)
+
+        response = self.client.patch(
+            '/api/control/bulk', {"ids": ids[1:3], "data": {"departure_date": "2023-08-01"}}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], f'Control {ids[1]}: Vehicle already has an overlapping trip')
+        self.assertEqual(Control.objects.filter(departure_date='2023-08-01').count(), 1)
+
+    def test_bulk_odometer_continuity(self):
+        ids = self.create_trips()
+
+        response = self.client.post('/api/control/bulk', [
+            self.trip(45, 60, departure_date='2023-08-06', return_date='2023-08-06'),
+            self.trip(50, 70, departure_date='2023-08-07', return_date='2023-08-07'),
+            self.trip(65, 80, departure_date='2023-08-08', return_date='2023-08-08'),
+            self.trip(0, 5, departure_date='2023-07-31', return_date='2023-07-31'),
+        ], format='json')
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [
+            {'index': 0, 'error': "departure_km is lower than the previous trip's odometer (50)", 'conflict': ids[4]},
+            {'index': 2, 'error': "departure_km is lower than the previous trip's odometer (70)"},
+            {'index': 3, 'error': "Odometer is higher than the next trip's departure_km (0)", 'conflict': ids[0]},
+        ])
+
+        response = self.client.patch('/api/control/bulk', {"ids": ids[3:], "data": {"departure_km": 20}}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['error'], f"Control {ids[3]}: departure_km is lower than the previous trip's odometer (30)"
+        )
+        self.assertEqual(list(find_regressions()), [])
+
+    def test_bulk_update_validation(self):
+        ids = self.create_trips()
+
+        response = self.client.patch('/api/control/bulk', {"data": {"destination": "Bauru"}}, format='json')
+        self.assertEqual(response.data['error'], 'Provide "ids" or "filters"')
+
+        response = self.client.patch('/api/control/bulk', {"ids": ids, "data": {"distance_traveled": 1}}, format='json')
+        self.assertEqual(response.data['error'], 'Unknown fields: distance_traveled')
+
+        response = self.client.patch('/api/control/bulk', {"ids": ids, "data": {"vehicle": 999}}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['error'], 'Vehicle not found')
+
+    def test_bulk_delete(self):
+        ids = self.create_trips()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                '/api/control/bulk',
+                {"filters": {"departure_to": "2023-08-02"}},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('DELETE FROM "control"')]), 1)
+        self.assertEqual(sorted(Control.objects.values_list('id', flat=True)), ids[2:])
+        self.assertEqual(VehicleMileage.objects.get(vehicle=self.vehicle).total_km, 30)
+
+    def test_bulk_delete_needs_no_collector(self):
+        # Controls are deleted by a plain DELETE, which would skip the
+        # cascade of any relation that needs Django's collector.
+        self.assertEqual(delete_rows(Control.objects.filter(pk=0)), 0)
+
+        with self.assertRaisesMessage(ImproperlyConfigured, 'Vehicle rows cannot be deleted without the collector'):
+            delete_rows(Vehicle.objects.all())
+        self.assertTrue(Vehicle.objects.exists())
+
+
+class ExportControlsTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.controls = [
+            self.create_control(departure_date=f'2023-08-{day:02d}', departure_km=day * 100, return_km=day * 100 + 50)
+            for day in range(1, 4)
+        ]
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_csv(self):
+        response = self.client.get('/api/control/export')
+        lines = self.read(response).splitlines()
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(lines[0].split(',')[:4], ['id', 'vehicle_id', 'vehicle_plate', 'vehicle_brand'])
+        self.assertEqual(len(lines), 4)
+        self.assertIn(f'{self.controls[-1].id},{self.controls[-1].vehicle_id},ABC-1234,Volkswagen', lines[1])
+        self.assertIn('São Paulo', lines[1])
+
+    def test_export_ndjson_with_filters(self):
+        response = self.client.get('/api/control/export?format=ndjson&departure_to=2023-08-02')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([row['id'] for row in rows], [self.controls[1].id, self.controls[0].id])
+        self.assertEqual(rows[0]['driver_name'], 'Matheus')
+        self.assertEqual(rows[0]['departure_date'], '2023-08-02')
+        self.assertEqual(rows[0]['distance_traveled'], 50)
+
+    def test_export_issues_a_single_joined_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.read(self.client.get('/api/control/export'))
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('INNER JOIN "vehicle"', queries[0]['sql'])
+
+    def test_export_invalid_format(self):
+        response = self.client.get('/api/control/export?format=xml')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid format, expected one of: csv, ndjson')
+
+
+class ImportFleetTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def upload(self, entity, content):
+        return self.client.post(
+            f'/api/import/{entity}',
+            {'file': SimpleUploadedFile(f'{entity}.csv', content.encode(), content_type='text/csv')},
+            format='multipart'
+        )
+
+    def test_import_drivers_vehicles_and_controls(self):
+        response = self.upload('driver', (
+            'name,phone,license_number\n'
+            'Matheus,14 99655-5555,ABC123\n'
+            'João,14 99655-4444,DEF456\n'
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+
+        response = self.upload('vehicle', (
+            'plate,brand,model,oil_change_km\n'
+            'ABC-1234,Volkswagen,Fusca,1000\n'
+            'XYZ-9876,Fiat,Uno,lots\n'
+        ))
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [{'line': 3, 'error': 'Invalid oil_change_km'}])
+
+        response = self.upload('control', (
+            'plate,license_number,departure_date,departure_time,departure_km,destination,'
+            'return_date,return_time,return_km\n'
+            'ABC-1234,ABC123,2023-08-11,10:30,100,São Paulo,2023-08-11,12:30,250\n'
+            'ABC-1234,DEF456,2023-08-12,10:30,250,Bauru,,,\n'
+            'XYZ-9876,ABC123,2023-08-12,10:30,250,Bauru,,,\n'
+            'ABC-1234,ZZZ999,2023-08-12,10:30,250,Bauru,,,\n'
+        ))
+        self.assertEqual(response.data['rows'], 4)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'], [
+            {'line': 4, 'error': 'Vehicle not found'},
+            {'line': 5, 'error': 'Driver not found'},
+        ])
+
+        vehicle = Vehicle.objects.get(plate='ABC-1234')
+        self.assertEqual(vehicle.mileage.total_km, 150)
+        self.assertEqual(Control.objects.get(destination='Bauru').driver.license_number, 'DEF456')
+
+    def test_import_rejects_overlapping_trips(self):
+        driver = Driver.objects.create(name='Matheus', phone='14 99655-5555', license_number='ABC123')
+        vehicle = Vehicle.objects.create(plate='ABC-1234', model='Fusca', brand='Volkswagen', oil_change_km=1000)
+        Control.objects.create(
+            vehicle=vehicle, driver=driver, departure_date='2023-08-11', departure_time='10:30',
+            return_date='2023-08-11', return_time='12:30', departure_km=0, return_km=100, destination='Bauru',
+        )
+
+        response = self.upload('control', (
+            'plate,license_number,departure_date,departure_time,departure_km,destination,'
+            'return_date,return_time,return_km\n'
+            'ABC-1234,ABC123,2023-08-11,12:00,100,São Paulo,2023-08-11,13:00,150\n'
+            'ABC-1234,ABC123,2023-08-12,10:30,100,São Paulo,2023-08-12,12:30,150\n'
+            'ABC-1234,ABC123,2023-08-12,11:30,150,São Paulo,2023-08-12,13:30,200\n'
+        ))
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [
+            {'line': 2, 'error': 'Vehicle already has an overlapping trip'},
+            {'line': 4, 'error': 'Vehicle already has an overlapping trip'},
+        ])
+        self.assertEqual(vehicle.mileage.total_km, 150)
+
+    def test_import_rejects_odometer_regressions(self):
+        driver = Driver.objects.create(name='Matheus', phone='14 99655-5555', license_number='ABC123')
+        vehicle = Vehicle.objects.create(plate='ABC-1234', model='Fusca', brand='Volkswagen', oil_change_km=1000)
+        Control.objects.create(
+            vehicle=vehicle, driver=driver, departure_date='2023-08-11', departure_time='10:30',
+            return_date='2023-08-11', return_time='12:30', departure_km=100, return_km=200, destination='Bauru',
+        )
+
+        response = self.upload('control', (
+            'plate,license_number,departure_date,departure_time,departure_km,destination,'
+            'return_date,return_time,return_km\n'
+            'ABC-1234,ABC123,2023-08-10,10:30,50,São Paulo,2023-08-10,12:30,150\n'
+            'ABC-1234,ABC123,2023-08-12,10:30,150,São Paulo,2023-08-12,12:30,250\n'
+            'ABC-1234,ABC123,2023-08-13,10:30,250,São Paulo,2023-08-13,12:30,300\n'
+        ))
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [
+            {'line': 2, 'error': "Odometer is higher than the next trip's departure_km (100)"},
+            {'line': 3, 'error': "departure_km is lower than the previous trip's odometer (200)"},
+        ])
+        self.assertEqual(vehicle.mileage.total_km, 150)
+
+    def test_import_with_missing_columns(self):
+        response = self.upload('vehicle', 'plate,brand\nABC-1234,Fiat\n')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Missing columns: model, oil_change_km')
+
+    def test_import_invalid_entity(self):
+        response = self.upload('trip', 'a\n1\n')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid entity, expected one of: driver, vehicle, control')
+
+    def test_import_fleet_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'drivers.csv')
+            errors = os.path.join(directory, 'errors.csv')
+
+            with open(source, 'w', encoding='utf-8') as stream:
+                stream.write('name,phone,license_number\n')
+                for index in range(25):
+                    stream.write(f'Driver {index},14 99655-5555,{index:011d}\n')
+                stream.write(',14 99655-5555,00000000099\n')
+
+            out = StringIO()
+            call_command('import_fleet', 'driver', source, '--errors', errors, '--batch-size', '10', stdout=out)
+
+            with open(errors, encoding='utf-8') as stream:
+                self.assertEqual(stream.read().splitlines(), [
+                    'line,error,name,phone,license_number',
+                    '27,Invalid name,,14 99655-5555,00000000099',
+                ])
+
+        self.assertIn('Imported 25 of 26 driver row(s)', out.getvalue())
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertEqual(Driver.objects.count(), 25)
+
+    def test_import_fleet_command_failing_halfway(self):
+        Driver.objects.create(name='Matheus', phone='14 99655-5555', license_number='ABC123')
+        vehicle = Vehicle.objects.create(plate='ABC-1234', model='Fusca', brand='Volkswagen', oil_change_km=1000)
+
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'controls.csv')
+
+            with open(source, 'wb') as stream:
+                stream.write(
+                    b'plate,license_number,departure_date,departure_time,departure_km,destination,'
+                    b'return_date,return_time,return_km\n'
+                )
+                # Past the decoder's first chunk, so some batches are written before the bad byte.
+                for index in range(200):
+                    moment = datetime(2023, 1, 1, 10, 30) + timedelta(days=index)
+                    stream.write(
+                        f'ABC-1234,ABC123,{moment:%Y-%m-%d},10:30,{index * 100},Bauru,'
+                        f'{moment:%Y-%m-%d},12:30,{index * 100 + 50}\n'.encode()
+                    )
+                stream.write(b'ABC-1234,ABC123,2024-01-01,10:30,20000,Ja\xfa,2024-01-01,12:30,20050\n')
+
+            with self.assertRaisesRegex(CommandError, r'^File must be UTF-8 encoded \(\d+ of \d+ row') as raised:
+                call_command('import_fleet', 'control', source, '--batch-size', '10', stdout=StringIO())
+
+        # The committed batches still reach the ledger and the table version.
+        created = Control.objects.count()
+        self.assertGreater(created, 0)
+        self.assertIn(f'({created} of ', str(raised.exception))
+        self.assertEqual(VehicleMileage.objects.get(vehicle=vehicle).total_km, created * 50)
+        self.assertEqual(versions([Control._meta.db_table])[Control._meta.db_table][0], 1)
+
+    def test_import_with_invalid_csv(self):
+        response = self.upload('driver', 'name,phone,license_number\n' + 'a' * (csv.field_size_limit() + 1) + ',1,2\n')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data['error'].startswith('Invalid CSV after line 1: '))
+        self.assertEqual((response.data['rows'], response.data['created']), (0, 0))
+
+
+class MileageRollupTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_driver = Driver.objects.create(name='João', phone='14 99655-4444', license_number='XYZ987')
+        self.other_vehicle = Vehicle.objects.create(plate='XYZ-9876', model='Uno', brand='Fiat', oil_change_km=500)
+
+    def rollup(self, model, **lookup):
+        return list(model.objects.filter(**lookup).order_by('day').values_list('day', 'trip_count', 'total_km'))
+
+    def assertConsistent(self):
+        self.assertEqual(rollups.rebuild(commit=False), {'vehicle': [], 'driver': []})
+
+    def test_rollups_track_created_controls(self):
+        self.create_control(departure_date='2023-08-11', departure_km=0, return_km=100)
+        self.create_control(departure_date='2023-08-11', departure_km=100, return_km=150)
+        self.create_control(departure_date='2023-08-12', departure_km=150, return_km=200, driver=self.other_driver)
+
+        self.assertEqual(len(self.rollup(VehicleDailyMileage, vehicle=self.vehicle)), 2)
+        self.assertEqual(self.rollup(VehicleDailyMileage, vehicle=self.vehicle)[0][1:], (2, 150))
+        self.assertEqual([row[1:] for row in self.rollup(DriverDailyMileage, driver=self.driver)], [(2, 150)])
+        self.assertEqual([row[1:] for row in self.rollup(DriverDailyMileage, driver=self.other_driver)], [(1, 50)])
+        self.assertConsistent()
+
+    def test_rollups_follow_updates(self):
+        control = self.create_control(departure_date='2023-08-11', departure_km=0, return_km=100)
+
+        control.departure_date = '2023-08-20'
+        control.driver = self.other_driver
+        control.vehicle = self.other_vehicle
+        control.return_km = 300
+        control.save()
+
+        self.assertEqual(self.rollup(VehicleDailyMileage, vehicle=self.vehicle), [])
+        self.assertEqual(self.rollup(DriverDailyMileage, driver=self.driver), [])
+        self.assertEqual([row[1:] for row in self.rollup(VehicleDailyMileage, vehicle=self.other_vehicle)], [(1, 300)])
+        self.assertEqual([row[1:] for row in self.rollup(DriverDailyMileage, driver=self.other_driver)], [(1, 300)])
+        self.assertConsistent()
+
+    def test_rollups_follow_deletes(self):
+        self.create_control(departure_date='2023-08-11', departure_km=0, return_km=100)
+        last = self.create_control(departure_date='2023-08-11', departure_km=100, return_km=150)
+
+        last.delete()
+        self.assertEqual([row[1:] for row in self.rollup(VehicleDailyMileage)], [(1, 100)])
+
+        self.vehicle.delete()
+        self.assertEqual(VehicleDailyMileage.objects.count(), 0)
+        self.assertEqual(DriverDailyMileage.objects.count(), 0)
+
+    def test_rollups_follow_bulk_changes(self):
+        response = self.client.post('/api/control/bulk', [
+            {
+                'vehicle': self.vehicle.id, 'driver': self.driver.id, 'departure_date': '2023-08-11',
+                'departure_time': f'{hour}:30', 'departure_km': km, 'destination': 'São Paulo',
+                'return_date': '2023-08-11', 'return_time': f'{hour + 1}:00', 'return_km': km + 80,
+            }
+            for hour, km in ((8, 0), (10, 80), (12, 160))
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row[1:] for row in self.rollup(DriverDailyMileage)], [(3, 240)])
+
+        response = self.client.patch('/api/control/bulk', {
+            'filters': {'vehicle': self.vehicle.id}, 'data': {'driver': self.other_driver.id},
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row[1:] for row in self.rollup(DriverDailyMileage, driver=self.other_driver)], [(3, 240)])
+        self.assertConsistent()
+
+        response = self.client.delete('/api/control/bulk', {'filters': {'vehicle': self.vehicle.id}}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(VehicleDailyMileage.objects.count() + DriverDailyMileage.objects.count(), 0)
+
+    def test_rebuild_rollups_command(self):
+        self.create_control(departure_date='2023-08-11', departure_km=0, return_km=100)
+        VehicleDailyMileage.objects.update(total_km=1)
+        DriverDailyMileage.objects.all().delete()
+
+        output = StringIO()
+        call_command('rebuild_rollups', '--verify', stdout=output)
+        self.assertIn('1 vehicle(s) out of date', output.getvalue())
+        self.assertIn('1 driver(s) out of date', output.getvalue())
+
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertConsistent()
+
+    def test_mileage_report(self):
+        self.create_control(departure_date='2023-08-07', departure_km=0, return_km=100)
+        self.create_control(departure_date='2023-08-13', departure_km=100, return_km=150)
+        self.create_control(departure_date='2023-08-14', departure_km=150, return_km=200, driver=self.other_driver)
+        self.create_control(departure_date='2023-09-01', departure_km=0, return_km=30, vehicle=self.other_vehicle)
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/reports/mileage?bucket=week')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([
+            (row['vehicle'], str(row['period']), row['trip_count'], row['total_km'])
+            for row in response.data['results']
+        ], [
+            (self.vehicle.id, '2023-08-07', 2, 150),
+            (self.vehicle.id, '2023-08-14', 1, 50),
+            (self.other_vehicle.id, '2023-08-28', 1, 30),
+        ])
+
+        response = self.client.get('/api/reports/mileage?group=driver&bucket=month&from=2023-08-01&to=2023-08-31')
+        self.assertEqual([
+            (row['driver'], str(row['period']), row['trip_count'], row['total_km'])
+            for row in response.data['results']
+        ], [
+            (self.driver.id, '2023-08-01', 2, 150),
+            (self.other_driver.id, '2023-08-01', 1, 50),
+        ])
+
+    def test_mileage_report_invalid_parameters(self):
+        for query in ['group=destination', 'bucket=year', 'from=08/2023']:
+            response = self.client.get(f'/api/reports/mileage?{query}')
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.data)
+
+
+class ControlOverlapTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_driver = Driver.objects.create(name='João', phone='14 99655-4444', license_number='XYZ987')
+        self.other_vehicle = Vehicle.objects.create(plate='XYZ-9876', model='Uno', brand='Fiat', oil_change_km=500)
+        self.trip = self.create('2023-08-11', '10:00', '2023-08-11', '12:00')
+
+    def create(self, departure_date, departure_time, return_date, return_time, vehicle=None, driver=None,
+               km=(100, 200)):
+        response = self.client.post('/api/control/create', {
+            'vehicle': (vehicle or self.vehicle).id,
+            'driver': (driver or self.driver).id,
+            'departure_date': departure_date,
+            'departure_time': departure_time,
+            'departure_km': km[0],
+            'destination': 'São Paulo',
+            'return_date': return_date,
+            'return_time': return_time,
+            'return_km': km[1] if return_date else None,
+        }, format='json')
+
+        if response.status_code == 201:
+            return response.data['control']['id']
+        return response
+
+    def test_overlapping_trip_is_rejected(self):
+        response = self.create('2023-08-11', '11:00', '2023-08-11', '13:00', driver=self.other_driver)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Vehicle already has an overlapping trip')
+        self.assertEqual(response.data['conflict'], self.trip)
+
+    def test_driver_overlap_is_rejected(self):
+        response = self.create('2023-08-11', '09:00', '2023-08-11', '10:30', vehicle=self.other_vehicle)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Driver already has an overlapping trip')
+
+    def test_adjacent_and_unrelated_trips_are_accepted(self):
+        self.assertIsInstance(self.create('2023-08-11', '12:00', '2023-08-11', '14:00', km=(200, 300)), int)
+        self.assertIsInstance(self.create('2023-08-11', '08:00', '2023-08-11', '10:00', km=(0, 100)), int)
+        self.assertIsInstance(
+            self.create('2023-08-11', '10:00', '2023-08-11', '12:00', self.other_vehicle, self.other_driver), int
+        )
+
+    def test_open_trips_are_unbounded(self):
+        self.create('2023-08-20', '08:00', None, None)
+
+        response = self.create('2023-09-01', '08:00', '2023-09-01', '09:00')
+        self.assertEqual(response.status_code, 400)
+
+        # An open trip starting before an existing one overlaps it as well
+        response = self.create('2023-08-01', '08:00', None, None, driver=self.other_driver)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['conflict'], self.trip)
+
+    def test_update_checks_overlaps_excluding_itself(self):
+        other = self.create('2023-08-11', '14:00', '2023-08-11', '16:00', km=(200, 300))
+
+        response = self.client.put(f'/api/control/{other}/update', {'return_time': '17:00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.put(f'/api/control/{other}/update', {'departure_time': '11:30'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['conflict'], self.trip)
+
+    def test_open_trip_overlaps_a_later_trip(self):
+        with self.assertRaises(TripOverlap):
+            check_overlaps({
+                'vehicle_id': self.vehicle.id, 'driver_id': self.other_driver.id,
+                'departure_date': '2023-08-11', 'departure_time': '11:59',
+                'return_date': None, 'return_time': None,
+            })
+
+    def test_return_before_departure_is_rejected(self):
+        response = self.create('2023-08-12', '10:00', '2023-08-11', '09:00')
+        self.assertEqual(response.status_code, 400)
+
+    def test_audit_finds_existing_overlaps(self):
+        # bulk_create bypasses the write-time check
+        Control.objects.bulk_create([
+            Control(vehicle=self.vehicle, driver=self.other_driver, departure_date='2023-08-11',
+                    departure_time='11:00', departure_km=0, destination='Bauru'),
+            Control(vehicle=self.other_vehicle, driver=self.other_driver, departure_date='2023-08-12',
+                    departure_time='08:00', departure_km=0, destination='Bauru',
+                    return_date='2023-08-12', return_time='09:00', return_km=10),
+        ])
+        first, second = Control.objects.filter(destination='Bauru').order_by('id').values_list('id', flat=True)
+
+        self.assertEqual(list(find_overlaps('vehicle')), [(self.vehicle.id, self.trip, first)])
+        self.assertEqual(list(find_overlaps('driver')), [(self.other_driver.id, first, second)])
+
+        output = StringIO()
+        call_command('audit_overlaps', stdout=output)
+        self.assertIn(f'vehicle {self.vehicle.id}: controls {self.trip} and {first} overlap', output.getvalue())
+        self.assertIn('1 overlapping pair(s) by driver', output.getvalue())
+
+
+class ControlOdometerTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.first = self.create('2023-08-10', 100, 200).data['control']['id']
+        self.last = self.create('2023-08-20', 500, 600).data['control']['id']
+
+    def create(self, departure_date, departure_km, return_km):
+        return self.client.post('/api/control/create', {
+            'vehicle': self.vehicle.id,
+            'driver': self.driver.id,
+            'departure_date': departure_date,
+            'departure_time': '10:00',
+            'departure_km': departure_km,
+            'destination': 'São Paulo',
+            'return_date': departure_date,
+            'return_time': '12:00',
+            'return_km': return_km,
+        }, format='json')
+
+    def test_trip_continuing_the_odometer_is_accepted(self):
+        self.assertEqual(self.create('2023-08-15', 200, 500).status_code, 201)
+
+    def test_departure_below_previous_trip_is_rejected(self):
+        response = self.create('2023-08-15', 150, 300)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], "departure_km is lower than the previous trip's odometer (200)")
+        self.assertEqual(response.data['conflict'], self.first)
+
+    def test_return_above_next_trip_is_rejected(self):
+        response = self.create('2023-08-15', 250, 550)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['conflict'], self.last)
+
+    def test_invalid_readings_are_rejected_without_server_error(self):
+        for departure_km, return_km in [(300, 250), ('abc', 300), (-1, 300), (300, 'x')]:
+            response = self.create('2023-08-15', departure_km, return_km)
+
+            self.assertEqual(response.status_code, 400, (departure_km, return_km))
+            self.assertIn('error', response.data)
+
+        self.assertEqual(Control.objects.count(), 2)
+
+    def test_update_checks_the_odometer(self):
+        response = self.client.put(f'/api/control/{self.last}/update', {'departure_km': 150}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['conflict'], self.first)
+
+        response = self.client.put(f'/api/control/{self.first}/update', {'return_km': 90}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'return_km must be greater than or equal to departure_km')
+
+        response = self.client.put(f'/api/control/{self.first}/update', {'return_km': 450}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_audit_finds_regressions(self):
+        # bulk_create bypasses the write-time check
+        regression = Control.objects.bulk_create([
+            Control(vehicle=self.vehicle, driver=self.driver, departure_date='2023-08-30', departure_time='10:00',
+                    departure_km=550, destination='Bauru'),
+        ])[0]
+
+        self.assertEqual(list(find_regressions()), [(self.vehicle.id, self.last, regression.id, 600, 550)])
+
+        output = StringIO()
+        call_command('audit_odometer', stdout=output)
+        self.assertIn(f'control {regression.id} departs at 550 km, below 600 km', output.getvalue())
+        self.assertIn('1 odometer regression(s)', output.getvalue())
+
+
+class ConditionalGetTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.control = self.create_control()
+
+    def assertNotModified(self, url, etag):
+        # Only the table version lookup runs: no rows, no serializer.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_read_endpoints_answer_304_while_unchanged(self):
+        for url in ['/api/control', f'/api/control/{self.control.id}', f'/api/control/{self.vehicle.id}/total_km',
+                    '/api/reports/mileage']:
+            response = self.client.get(url)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['ETag'].startswith('"'))
+            self.assertIn('Last-Modified', response)
+            self.assertNotModified(url, response['ETag'])
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_etag_varies_with_query_parameters(self):
+        first = self.client.get('/api/control?page_size=1')
+        second = self.client.get('/api/control?page_size=2')
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get('/api/control')['ETag']
+
+        self.create_control(departure_date='2023-08-12', departure_km=250, return_km=300)
+        response = self.client.get('/api/control', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # Controls embed their vehicle, so vehicle writes count as well
+        self.client.put(f'/api/vehicle/{self.vehicle.id}/update', {'model': 'Gol'}, format='json')
+        response = self.client.get('/api/control', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['vehicle']['model'], 'Gol')
+        etag = response['ETag']
+
+        self.client.delete('/api/control/bulk', {'ids': [self.control.id]}, format='json')
+        response = self.client.get('/api/control', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_items'], 1)
+
+
+class ResponseCacheTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        caches['responses'].clear()
+        super().setUp()
+        self.control = self.create_control()
+
+    def stats(self):
+        return self.client.get('/api/cache/stats').data['views']['control.FetchData']
+
+    def test_identical_requests_are_served_from_cache(self):
+        first = self.client.get('/api/control')
+
+        # Same page once defaults are filled in and empty values dropped;
+        # only the table versions are read.
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/control?page_size=10&search=&page=1')
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_writes_invalidate_entries(self):
+        self.client.get('/api/control')
+
+        self.create_control(departure_date='2023-08-12', departure_km=250, return_km=300)
+        self.assertEqual(self.client.get('/api/control').data['total_items'], 2)
+
+        self.client.put(f'/api/driver/{self.driver.id}/update', {'name': 'João'}, format='json')
+        self.assertEqual(self.client.get('/api/control').data['results'][0]['driver']['name'], 'João')
+
+        self.control.delete()
+        self.assertEqual(self.client.get('/api/control').data['total_items'], 1)
+
+        self.assertEqual(self.stats()['hits'], 0)
+
+    def test_errors_are_not_cached(self):
+        self.client.get('/api/control?departure_from=yesterday')
+        response = self.client.get('/api/control?departure_from=yesterday')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stats()['hits'], 0)
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'responses': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+            }):
+                first = self.client.get('/api/control')
+                with self.assertNumQueries(1):
+                    second = self.client.get('/api/control')
+
+                self.assertEqual(second.data, first.data)
+                self.assertEqual(self.stats()['hits'], 1)
+
+    @override_settings(RESPONSE_CACHE_ALIAS=None)
+    def test_cache_can_be_disabled(self):
+        self.client.get('/api/control')
+        with self.assertNumQueries(3):
+            self.client.get('/api/control')
+
+        self.assertFalse(self.client.get('/api/cache/stats').data['enabled'])
+
+    def test_stats_reset(self):
+        self.client.get('/api/control')
+        self.client.delete('/api/cache/stats')
+
+        self.assertEqual(self.stats(), {'hits': 0, 'misses': 0, 'hit_ratio': 0})
+
+
+class ValuesSerializerTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_control(departure_time='10:00:30', departure_km=100, return_date='2023-08-12', return_time='12:00')
+        # Open trip: every return column is NULL
+        self.create_control(
+            departure_date='2023-08-13', departure_time='08:00', departure_km=250, destination='Bauru',
+            return_date=None,
+        )
+
+    def test_output_matches_model_serializer(self):
+        controls = Control.objects.select_related('vehicle', 'driver')
+        serializer = ValuesSerializer(ControlSerializer)
+
+        expected = JSONRenderer().render(ControlSerializer(controls, many=True).data)
+        rendered = JSONRenderer().render(serializer.to_representation(serializer.values(Control.objects.all())))
+
+        self.assertEqual(rendered, expected)
+
+    def test_list_endpoint_output(self):
+        expected = ControlSerializer(Control.objects.all(), many=True).data
+
+        response = self.client.get('/api/control')
+        self.assertEqual(JSONRenderer().render(response.data['results']), JSONRenderer().render(expected))
+
+        response = self.client.get('/api/control?pagination=cursor&page_size=1')
+        self.assertEqual(JSONRenderer().render(response.data['results']), JSONRenderer().render(expected[:1]))
+
+    def test_count_does_not_join(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/control')
+
+        count = next(query['sql'] for query in queries if 'COUNT(' in query['sql'])
+        self.assertNotIn('JOIN', count)
+
+
+class ControlFieldsTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for day in range(1, 4):
+            self.control = self.create_control(
+                departure_date=f'2023-08-0{day}', departure_km=day * 100, return_km=day * 100 + 50
+            )
+
+    def page_query(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+
+        self.assertEqual(response.status_code, 200)
+        sql = [query['sql'] for query in queries if 'FROM "control"' in query['sql'] and 'COUNT(' not in query['sql']]
+        return response, sql[-1]
+
+    def test_sparse_fields(self):
+        response, sql = self.page_query('/api/control?fields=id,departure_date,destination')
+
+        self.assertEqual(response.data['results'][0], {
+            'id': self.control.id, 'departure_date': '2023-08-03', 'destination': 'São Paulo',
+        })
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"return_km"', sql)
+
+    def test_relations_as_ids(self):
+        response, sql = self.page_query('/api/control?expand=')
+
+        result = response.data['results'][0]
+        self.assertEqual((result['vehicle'], result['driver']), (self.vehicle.id, self.driver.id))
+        self.assertEqual(result['destination'], 'São Paulo')
+        self.assertNotIn('JOIN', sql)
+
+    def test_expand_one_relation(self):
+        response, sql = self.page_query('/api/control?expand=vehicle&fields=id,vehicle,driver')
+
+        self.assertEqual(response.data['results'][0]['vehicle']['plate'], 'ABC-1234')
+        self.assertEqual(response.data['results'][0]['driver'], self.driver.id)
+        self.assertEqual(sql.count('JOIN'), 1)
+
+    def test_default_embeds_everything(self):
+        expected = ControlSerializer(Control.objects.all(), many=True).data
+        self.assertEqual(self.client.get('/api/control?expand=vehicle,driver').data['results'], expected)
+        self.assertEqual(self.client.get('/api/control').data['results'], expected)
+
+    def test_invalid_fields(self):
+        response = self.client.get('/api/control?fields=id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid field: password')
+
+        response = self.client.get('/api/control?expand=destination')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid expand: destination')
+
+    def test_cursor_pages_with_sparse_fields(self):
+        response = self.client.get('/api/control?pagination=cursor&page_size=2&fields=destination')
+        self.assertEqual(response.data['results'], [{'destination': 'São Paulo'}] * 2)
+
+        response = self.client.get(f'/api/control?cursor={response.data["next_cursor"]}&page_size=2&fields=id')
+        self.assertEqual(response.data['results'], [{'id': Control.objects.order_by('id').first().id}])
+
+    def test_detail(self):
+        response = self.client.get(f'/api/control/{self.control.id}?fields=id,vehicle,return_km&expand=')
+        self.assertEqual(response.data['control'], {'id': self.control.id, 'vehicle': self.vehicle.id, 'return_km': 350})
+
+        response = self.client.get(f'/api/control/{self.control.id}')
+        self.assertEqual(response.data['control'], ControlSerializer(Control.objects.get(id=self.control.id)).data)
+
+        self.assertEqual(self.client.get(f'/api/control/{self.control.id}?fields=nope').status_code, 400)
+        self.assertEqual(self.client.get('/api/control/0?fields=id').status_code, 404)
+
+    def test_cache_keeps_empty_expand_apart(self):
+        embedded = self.client.get('/api/control').data['results'][0]['vehicle']
+        bare = self.client.get('/api/control?expand=').data['results'][0]['vehicle']
+
+        self.assertIsInstance(embedded, dict)
+        self.assertEqual(bare, self.vehicle.id)
+
+
+class ControlNormalizedTestCase(FleetFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.vehicles = [
+            self.vehicle, Vehicle.objects.create(plate='XYZ-9876', model='Uno', brand='Fiat', oil_change_km=500),
+        ]
+        for day in range(1, 7):
+            self.create_control(
+                vehicle=self.vehicles[day % 2], departure_date=f'2023-08-0{day}', departure_km=day * 100,
+                return_km=day * 100 + 50,
+            )
+
+    def denormalize(self, data):
+        return [
+            {**result, 'vehicle': data['vehicles'][str(result['vehicle'])],
+             'driver': data['drivers'][str(result['driver'])]}
+            for result in data['results']
+        ]
+
+    def test_related_objects_are_side_loaded(self):
+        embedded = json.loads(self.client.get('/api/control').content)
+        response = self.client.get('/api/control?format=normalized')
+        data = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['total_items'], 6)
+        self.assertEqual(sorted(data['vehicles']), sorted(str(vehicle.id) for vehicle in self.vehicles))
+        self.assertEqual(list(data['drivers']), [str(self.driver.id)])
+        self.assertEqual(self.denormalize(data), embedded['results'])
+        self.assertLess(len(response.content), len(json.dumps(embedded).encode()))
+
+    def test_cursor_pages(self):
+        data = json.loads(self.client.get('/api/control?format=normalized&pagination=cursor&page_size=2').content)
+
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(len(data['vehicles']), 2)
+        self.assertIsNotNone(data['next_cursor'])
+
+    def test_only_selected_relations_are_side_loaded(self):
+        data = json.loads(self.client.get('/api/control?format=normalized&fields=id,driver').content)
+        self.assertNotIn('vehicles', data)
+        self.assertEqual(data['results'][0], {'id': data['results'][0]['id'], 'driver': self.driver.id})
+
+        data = json.loads(self.client.get('/api/control?format=normalized&expand=vehicle').content)
+        self.assertNotIn('drivers', data)
+        self.assertEqual(data['results'][0]['driver'], self.driver.id)
+
+    def test_invalid_format(self):
+        response = self.client.get('/api/control?format=xml')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid format, expected: normalized')
+
+
+class AsyncViewsTestCase(TestCase):
+    paths = [
+        'control', 'control?page_size=2&page=2', 'control?format=normalized', 'control?fields=id,vehicle&expand=',
+        'control?pagination=cursor&page_size=2', 'control?departure_from=yesterday', 'control?page=9',
+        'control?pagination=cursor&cursor=nope', 'control?pagination=cursor&order_by=id', 'control?order_by=id',
+        'driver', 'driver?search=Mat&fields=name', 'driver?pagination=cursor&page_size=1', 'vehicle?page=last',
+        'vehicle?fields=nope',
+    ]
+
+    def setUp(self):
+        self.driver = Driver.objects.create(name='Matheus', phone='14 99655-5555', license_number='ABC123')
+        self.vehicle = Vehicle.objects.create(plate='ABC-1234', model='Fusca', brand='Volkswagen', oil_change_km=150)
+        Driver.objects.create(name='João', phone='14 99655-4444', license_number='XYZ987')
+        for day in range(1, 4):
+            self.control = Control.objects.create(
+                vehicle=self.vehicle, driver=self.driver, departure_date=f'2023-08-0{day}', departure_time='10:00',
+                departure_km=day * 100, destination='São Paulo', return_date=f'2023-08-0{day}',
+                return_time='12:00', return_km=day * 100 + 50,
+            )
+
+        self.paths = self.paths + [
+            f'control/{self.control.id}', f'control/{self.control.id}?fields=id,driver', 'control/0',
+            f'control/{self.vehicle.id}/total_km', 'control/0/total_km',
+        ]
+        self.expected = {path: self.client.get(f'/api/{path}') for path in self.paths}
+
+    async def test_responses_match_sync_views(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                response = await self.async_client.get(f'/api/async/{path}')
+                expected = self.expected[path]
+
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertEqual(response.content, expected.content)
+
+    async def test_views_are_async(self):
+        from django.urls import resolve
+
+        for path in ['control', 'control/1', 'control/1/total_km', 'driver', 'vehicle']:
+            self.assertTrue(resolve(f'/api/async/{path}').func.view_class.view_is_async)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class ChangesTestCase(FleetFixtureMixin, TestCase):
+
+    def changes(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/control/changes', {'expand': '', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_follow_writes(self):
+        first, second, third, fourth = [
+            self.create_control(destination=name) for name in ['Bauru', 'Santos', 'Marília', 'Jaú']
+        ]
+
+        data = self.changes()
+        self.assertEqual([row['id'] for row in data['results']], [first.id, second.id, third.id, fourth.id])
+        self.assertEqual(data['results'][0]['vehicle'], self.vehicle.id)
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['has_more'])
+        token = data['next_token']
+
+        # Nothing new: the token moves up to the horizon.
+        data = self.changes(token)
+        self.assertEqual((data['results'], data['deleted']), ([], []))
+        self.assertGreater(decode_token(data['next_token']), decode_token(token))
+
+        first.destination = 'Botucatu'
+        first.save()
+        self.client.patch('/api/control/bulk', {"ids": [second.id], "data": {"destination": "Bauru"}}, format='json')
+        self.client.delete(f'/api/control/{third.id}/delete')
+        self.client.delete('/api/control/bulk', {"ids": [fourth.id]}, format='json')
+
+        data = self.changes(token)
+        self.assertEqual([(row['id'], row['destination']) for row in data['results']], [
+            (first.id, 'Botucatu'), (second.id, 'Bauru'),
+        ])
+        self.assertEqual(data['deleted'], [third.id, fourth.id])
+
+        self.assertEqual(self.changes(data['next_token'])['results'], [])
+
+    def test_changes_in_batches(self):
+        controls = [self.create_control(destination=f'Trip {number}') for number in range(5)]
+        seen, token, calls = [], None, 0
+
+        while True:
+            with self.assertNumQueries(2):
+                data = self.changes(token, limit=2)
+            seen += [row['id'] for row in data['results']]
+            token, calls = data['next_token'], calls + 1
+            if not data['has_more']:
+                break
+
+        self.assertEqual(seen, [control.id for control in controls])
+        self.assertEqual(calls, 3)
+
+    def test_recent_writes_wait_for_the_next_call(self):
+        self.create_control(destination='Bauru')
+
+        with override_settings(SYNC_SETTLE_SECONDS=60):
+            data = self.changes()
+
+        self.assertEqual(data['results'], [])
+        self.assertEqual(len(self.changes(data['next_token'])['results']), 1)
+
+    def test_idle_token_does_not_expire(self):
+        from unittest import mock
+
+        self.create_control(destination='Bauru')
+        token = self.changes()['next_token']
+        started = datetime.now(timezone.utc)
+
+        # A client polling an idle table keeps a live token past the kept days.
+        for days in (20, 40, 60):
+            with mock.patch('django.utils.timezone.now', return_value=started + timedelta(days=days)):
+                data = self.changes(token)
+            self.assertEqual((data['results'], data['deleted']), ([], []))
+            token = data['next_token']
+
+        with mock.patch('django.utils.timezone.now', return_value=started + timedelta(days=61)):
+            trip = self.create_control(destination='Santos')
+        with mock.patch('django.utils.timezone.now', return_value=started + timedelta(days=62)):
+            self.assertEqual([row['id'] for row in self.changes(token)['results']], [trip.id])
+
+    def test_invalid_parameters(self):
+        from core.sync import encode_token
+
+        for params, error in [
+            ({'since': 'abc'}, 'Invalid since token'),
+            ({'since': encode_token((datetime(2023, 8, 11), 0, 1))}, 'Invalid since token'),
+            ({'limit': '0'}, 'Invalid limit, expected 1 to 5000'),
+            ({'fields': 'color'}, 'Invalid field: color'),
+        ]:
+            response = self.client.get('/api/control/changes', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['error'], error)
+
+        # Older than the kept tombstones.
+        response = self.client.get('/api/control/changes', {
+            'since': encode_token((datetime(2023, 8, 11, tzinfo=timezone.utc), 0, 1)),
+        })
+        self.assertEqual(response.status_code, 410)
+
+    def test_prune_tombstones(self):
+        from core.models import Tombstone
+
+        Tombstone.objects.create(table='control', object_id=1, deleted_at=datetime(2023, 8, 11, tzinfo=timezone.utc))
+        trip = self.create_control(destination='Bauru')
+        trip_id = trip.id
+        trip.delete()
+
+        call_command('prune_tombstones', stdout=StringIO())
+
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [trip_id])
@@ -1,12 +1,22 @@
 from django.urls import path
 
-from .views import FetchData, CreateControl, UpdateControl, DeleteControl, FindById, TotalKm
+from .views import FetchData, CreateControl, UpdateControl, DeleteControl, FindById, TotalKm, BulkControl, ExportControls, ImportFleet, MileageReport
+from .views import ControlChanges
+from .views import AsyncFetchData, AsyncFindById, AsyncTotalKm
 
 urlpatterns = [
     path('control', FetchData.as_view(), name='fetch_data'),
     path('control/create', CreateControl.as_view(), name='create_control'),
+    path('control/bulk', BulkControl.as_view(), name='bulk_control'),
+    path('control/export', ExportControls.as_view(), name='export_controls'),
+    path('control/changes', ControlChanges.as_view(), name='control_changes'),
     path('control/<int:control_id>/update', UpdateControl.as_view(), name='update_control'),
     path('control/<int:control_id>/delete', DeleteControl.as_view(), name='delete_control'),
     path('control/<int:control_id>', FindById.as_view(), name='find_control'),
     path('control/<int:vehicle_id>/total_km', TotalKm.as_view(), name='total_km'),
+    path('reports/mileage', MileageReport.as_view(), name='mileage_report'),
+    path('import/<str:entity>', ImportFleet.as_view(), name='import_fleet'),
+    path('async/control', AsyncFetchData.as_view(), name='async_fetch_data'),
+    path('async/control/<int:control_id>', AsyncFindById.as_view(), name='async_find_control'),
+    path('async/control/<int:vehicle_id>/total_km', AsyncTotalKm.as_view(), name='async_total_km'),
 ]
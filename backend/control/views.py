@@ -1,11 +1,34 @@
+import io
+
+from django.core.paginator import InvalidPage
+from django.http import StreamingHttpResponse
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from rest_framework import filters
-from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from .models import Control
+from core.async_views import AsyncReadView, error, invalid_page, page_data, paginate, render
+from core.cache import cached_response
+from core.conditional import conditional_on
+from core.serializers import (
+    ValuesSerializer, InvalidFields, expand_parameter, fields_parameter, format_parameter, wants_normalized
+)
+from core.schema import lazy_swagger_auto_schema
+from core.pagination import KeysetPagination, InvalidCursor, cursor_parameters, wants_cursor_pagination
+from core.bulk import BulkError, select_targets, clean_update, bulk_request_body, bulk_response
+from core.sync import ExpiredToken, InvalidToken, changes_parameters, changes_response, read_changes
+
+from .bulk import create_controls, update_controls, delete_controls, clean_reference, TRIP_FIELDS, MAX_BULK_ROWS
+from .export import export_stream, EXPORT_FORMATS
+from .filters import filter_controls, filter_parameters, InvalidFilter
+from .importer import FleetImporter, InvalidImport
+from .odometer import check_odometer, OdometerRegression
+from .overlaps import check_overlaps, TripOverlap
+from .reports import mileage_report, REPORT_BUCKETS
+from .rollups import ROLLUPS
+from .models import Control, VehicleMileage
 from vehicle.models import Vehicle
 from driver.models import Driver
 
@@ -13,10 +36,11 @@ from .serializers import ControlSerializer
 
 
 class FetchData(APIView):
+    list_serializer = ValuesSerializer(ControlSerializer)
     filter_backends = [filters.SearchFilter]
     search_fields = ['departure_date', 'return_date']
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Fetch all controls",
         manual_parameters=[
             openapi.Parameter(
@@ -29,14 +53,19 @@ class FetchData(APIView):
                 name='search',
                 in_=openapi.IN_QUERY,
                 type=openapi.TYPE_STRING,
-                description='Search query',
+                description='Search by departure or return date (YYYY-MM-DD, YYYY-MM or YYYY), or by destination, plate or driver name',
             ),
+            *filter_parameters,
             openapi.Parameter(
                 name='order_by',
                 in_=openapi.IN_QUERY,
                 type=openapi.TYPE_STRING,
                 description='Order by',
             ),
+            *cursor_parameters,
+            fields_parameter,
+            expand_parameter,
+            format_parameter,
         ],
         responses={
             200: openapi.Schema(
@@ -71,8 +100,10 @@ class FetchData(APIView):
                                         'brand': openapi.Schema(type=openapi.TYPE_STRING),
                                         'model': openapi.Schema(type=openapi.TYPE_STRING),
                                         'oil_change_km': openapi.Schema(type=openapi.TYPE_INTEGER),
-                                        'created_at': openapi.Schema(type=openapi.TYPE_STRING),
-                                        'updated_at': openapi.Schema(type=openapi.TYPE_STRING),
+                                        'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                     format=openapi.FORMAT_DATETIME),
+                                        'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                     format=openapi.FORMAT_DATETIME),
                                     }
                                 ),
                                 'driver': openapi.Schema(
@@ -84,53 +115,97 @@ class FetchData(APIView):
                                                                 description='Driver phone number'),
                                         'license_number': openapi.Schema(type=openapi.TYPE_STRING,
                                                                          description='Driver license number'),
+                                        'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                     format=openapi.FORMAT_DATETIME,
+                                                                     description='Creation time'),
+                                        'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                     format=openapi.FORMAT_DATETIME,
+                                                                     description='Last write time'),
                                     }
                                 ),
+                                'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                             format=openapi.FORMAT_DATETIME,
+                                                             description='Creation time'),
+                                'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                             format=openapi.FORMAT_DATETIME,
+                                                             description='Last write time'),
                             }
                         )
                     )
                 },
             )
         }
-    )
+    ))
+    @conditional_on(Control, Vehicle, Driver)
+    @cached_response(Control, Vehicle, Driver, defaults={'page': '1', 'page_size': '10'})
     def get(self, request):
         paginator = PageNumberPagination()
         # controls = Control.objects.all()
-        controls = Control.objects.select_related('vehicle', 'driver').all()
+        # Related vehicle and driver columns are joined by values()
+        controls = Control.objects.all()
 
         paginator.page_size = request.GET.get('page_size', 10)
 
-        search_query = request.GET.get('search', None)
-        if search_query:
-            controls = controls.filter(
-                departure_date__icontains=search_query
-            ) | controls.filter(
-                return_date__icontains=search_query
-            )
+        try:
+            controls = filter_controls(controls, request.GET)
+            serializer = self.list_serializer.select(request.GET)
+            normalized = wants_normalized(request.GET)
+        except (InvalidFilter, InvalidFields) as error:
+            return Response({"error": str(error)}, status=400)
 
         order_by = request.GET.get('order_by', None)
+
+        if wants_cursor_pagination(request):
+            if order_by:
+                return Response({"error": "order_by is not supported with cursor pagination"}, status=400)
+
+            paginator = KeysetPagination(ordering=['-departure_date', '-id'])
+            try:
+                result_page = paginator.paginate_queryset(serializer.values(controls, *paginator.columns), request)
+            except InvalidCursor:
+                return Response({"error": "Invalid cursor"}, status=400)
+
+            if normalized:
+                return self.normalized_response(paginator.get_paginated_response, serializer, result_page)
+
+            return paginator.get_paginated_response(serializer.to_representation(result_page))
+
         if order_by:
-            controls = controls.order_by(order_by)
+            controls = controls.order_by(order_by, 'id')
 
-        result_page = paginator.paginate_queryset(controls, request)
-        serializer = ControlSerializer(result_page, many=True)
+        result_page = paginator.paginate_queryset(serializer.paged(controls), request)
         # return paginator.get_paginated_response(serializer.data)
 
-        """Return a paginated list of controls."""
-        return Response({
-            "success": True,
-            "total_items": paginator.page.paginator.count,
-            "total_pages": paginator.page.paginator.num_pages,
-            "current_page": paginator.page.number,
-            # "next_page": paginator.get_next_link(),
-            # "previous_page": paginator.get_previous_link(),
-            "results": serializer.data,
-        }, status=200)
+        def page_response(results):
+            """Return a paginated list of controls."""
+            return Response({
+                "success": True,
+                "total_items": paginator.page.paginator.count,
+                "total_pages": paginator.page.paginator.num_pages,
+                "current_page": paginator.page.number,
+                # "next_page": paginator.get_next_link(),
+                # "previous_page": paginator.get_previous_link(),
+                "results": results,
+            }, status=200)
+
+        if normalized:
+            return self.normalized_response(page_response, serializer, result_page)
+
+        return page_response(serializer.to_representation(result_page))
+
+    def normalized_response(self, page_response, serializer, rows):
+        """Side-load the expanded vehicles and drivers next to the results."""
+        results, related = serializer.to_normalized(rows)
+
+        response = page_response(results)
+        for name, objects in related.items():
+            response.data[f'{name}s'] = objects
+        return response
 
 
 class CreateControl(APIView):
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Create control",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -171,8 +246,10 @@ class CreateControl(APIView):
                                     'brand': openapi.Schema(type=openapi.TYPE_STRING),
                                     'model': openapi.Schema(type=openapi.TYPE_STRING),
                                     'oil_change_km': openapi.Schema(type=openapi.TYPE_INTEGER),
-                                    'created_at': openapi.Schema(type=openapi.TYPE_STRING),
-                                    'updated_at': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME),
+                                    'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME),
                                 }
                             ),
                             'driver': openapi.Schema(
@@ -184,8 +261,18 @@ class CreateControl(APIView):
                                                             description='Driver phone number'),
                                     'license_number': openapi.Schema(type=openapi.TYPE_STRING,
                                                                      description='Driver license number'),
+                                    'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME,
+                                                                 description='Creation time'),
+                                    'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME,
+                                                                 description='Last write time'),
                                 }
                             ),
+                            'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                         format=openapi.FORMAT_DATETIME, description='Creation time'),
+                            'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                         format=openapi.FORMAT_DATETIME, description='Last write time'),
                         }
                     )
                 },
@@ -194,10 +281,12 @@ class CreateControl(APIView):
                 type=openapi.TYPE_OBJECT,
                 properties={
                     'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message'),
+                    'conflict': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                               description='Id of the conflicting control, if any'),
                 },
             ),
         }
-    )
+    ))
     def post(self, request):
         required_fields = ['vehicle', 'driver', 'departure_date', 'departure_time', 'departure_km', 'destination',
                            'return_date', 'return_time', 'return_km']
@@ -215,6 +304,15 @@ class CreateControl(APIView):
         if not driver:
             return Response({"error": "Driver not found"}, status=404)
 
+        try:
+            trip = {**request.data, "vehicle_id": vehicle.id, "driver_id": driver.id}
+            check_overlaps(trip)
+            check_odometer(trip)
+        except (TripOverlap, OdometerRegression) as error:
+            return Response({"error": str(error), "conflict": error.control_id}, status=400)
+        except BulkError as error:
+            return Response({"error": str(error)}, status=400)
+
         control = Control.objects.create(
             vehicle=vehicle,
             driver=driver,
@@ -233,7 +331,7 @@ class CreateControl(APIView):
 
 class UpdateControl(APIView):
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Update control",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -261,10 +359,12 @@ class UpdateControl(APIView):
                 type=openapi.TYPE_OBJECT,
                 properties={
                     'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message'),
+                    'conflict': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                               description='Id of the conflicting control, if any'),
                 },
             ),
         }
-    )
+    ))
     def put(self, request, control_id):
         control = Control.objects.filter(id=control_id).first()
 
@@ -294,6 +394,25 @@ class UpdateControl(APIView):
         control.return_date = request.data.get("return_date", control.return_date)
         control.return_time = request.data.get("return_time", control.return_time)
         control.return_km = request.data.get("return_km", control.return_km)
+
+        try:
+            trip = {
+                "vehicle_id": control.vehicle_id,
+                "driver_id": control.driver_id,
+                "departure_date": control.departure_date,
+                "departure_time": control.departure_time,
+                "departure_km": control.departure_km,
+                "return_date": control.return_date,
+                "return_time": control.return_time,
+                "return_km": control.return_km,
+            }
+            check_overlaps(trip, exclude_id=control.id)
+            check_odometer(trip, exclude_id=control.id)
+        except (TripOverlap, OdometerRegression) as error:
+            return Response({"error": str(error), "conflict": error.control_id}, status=400)
+        except BulkError as error:
+            return Response({"error": str(error)}, status=400)
+
         control.save()
 
         return Response({
@@ -304,7 +423,7 @@ class UpdateControl(APIView):
 
 class DeleteControl(APIView):
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Delete control",
         responses={
             200: openapi.Schema(
@@ -321,7 +440,7 @@ class DeleteControl(APIView):
                 },
             ),
         }
-    )
+    ))
     def delete(self, request, control_id):
         control = Control.objects.filter(id=control_id).first()
 
@@ -337,9 +456,11 @@ class DeleteControl(APIView):
 
 
 class FindById(APIView):
+    detail_serializer = ValuesSerializer(ControlSerializer)
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Find control by id",
+        manual_parameters=[fields_parameter, expand_parameter],
         responses={
             200: openapi.Schema(
                 type=openapi.TYPE_OBJECT,
@@ -366,8 +487,10 @@ class FindById(APIView):
                                     'brand': openapi.Schema(type=openapi.TYPE_STRING),
                                     'model': openapi.Schema(type=openapi.TYPE_STRING),
                                     'oil_change_km': openapi.Schema(type=openapi.TYPE_INTEGER),
-                                    'created_at': openapi.Schema(type=openapi.TYPE_STRING),
-                                    'updated_at': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME),
+                                    'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME),
                                 }
                             ),
                             'driver': openapi.Schema(
@@ -379,8 +502,18 @@ class FindById(APIView):
                                                             description='Driver phone number'),
                                     'license_number': openapi.Schema(type=openapi.TYPE_STRING,
                                                                      description='Driver license number'),
+                                    'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME,
+                                                                 description='Creation time'),
+                                    'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME,
+                                                                 description='Last write time'),
                                 }
                             ),
+                            'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                         format=openapi.FORMAT_DATETIME, description='Creation time'),
+                            'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                         format=openapi.FORMAT_DATETIME, description='Last write time'),
                         }
                     ),
                 },
@@ -392,24 +525,28 @@ class FindById(APIView):
                 },
             ),
         }
-    )
+    ))
+    @conditional_on(Control, Vehicle, Driver)
     def get(self, request, control_id):
-        control = Control.objects.filter(id=control_id).first()
+        try:
+            serializer = self.detail_serializer.select(request.GET)
+        except InvalidFields as error:
+            return Response({"error": str(error)}, status=400)
+
+        control = serializer.values(Control.objects.filter(id=control_id)).first()
 
         if not control:
             return Response({"error": "Control not found"}, status=404)
 
-        serializer = ControlSerializer(control)
-
         return Response({
             "success": True,
-            "control": serializer.data,
+            "control": serializer.to_data(control),
         }, status=200)
 
 
 class TotalKm(APIView):
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Get total km",
         responses={
             200: openapi.Schema(
@@ -429,18 +566,18 @@ class TotalKm(APIView):
                 },
             ),
         }
-    )
+    ))
+    @conditional_on(Vehicle, Control)
     def get(self, request, vehicle_id):
-        vehicle = Vehicle.objects.filter(id=vehicle_id).first()
+        vehicle = Vehicle.objects.select_related('mileage').filter(id=vehicle_id).first()
 
         if not vehicle:
             return Response({"error": "Vehicle not found"}, status=404)
 
-        controls = Control.objects.filter(vehicle=vehicle_id)
-
-        km_total = 0
-        for control in controls:
-            km_total += control.distance_traveled
+        try:
+            km_total = vehicle.mileage.total_km
+        except VehicleMileage.DoesNotExist:
+            km_total = 0
 
         km_left = vehicle.oil_change_km - km_total
 
@@ -459,3 +596,539 @@ class TotalKm(APIView):
             "km_left": km_left,
             "total_km": km_total
         }, status=200)
+
+
+class BulkControl(APIView):
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description="Create many controls at once",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'vehicle': openapi.Schema(type=openapi.TYPE_INTEGER, description='Vehicle id'),
+                    'driver': openapi.Schema(type=openapi.TYPE_INTEGER, description='Driver id'),
+                    'departure_date': openapi.Schema(type=openapi.TYPE_STRING, description='Departure date'),
+                    'departure_time': openapi.Schema(type=openapi.TYPE_STRING, description='Departure time'),
+                    'departure_km': openapi.Schema(type=openapi.TYPE_INTEGER, description='Departure km'),
+                    'destination': openapi.Schema(type=openapi.TYPE_STRING, description='Destination'),
+                    'return_date': openapi.Schema(type=openapi.TYPE_STRING, description='Return date'),
+                    'return_time': openapi.Schema(type=openapi.TYPE_STRING, description='Return time'),
+                    'return_km': openapi.Schema(type=openapi.TYPE_INTEGER, description='Return km'),
+                }
+            )
+        ),
+        responses={
+            201: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'success': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Success'),
+                    'created': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of controls created'),
+                    'ids': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                        description='Ids of the created controls'
+                    ),
+                    'errors': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'index': openapi.Schema(type=openapi.TYPE_INTEGER, description='Row index'),
+                                'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message'),
+                            }
+                        ),
+                        description='Rejected rows'
+                    ),
+                },
+            ),
+            400: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message'),
+                },
+            ),
+        }
+    ))
+    def post(self, request):
+        if not isinstance(request.data, list):
+            return Response({"error": "Expected a list of controls"}, status=400)
+
+        if len(request.data) > MAX_BULK_ROWS:
+            return Response({"error": f"At most {MAX_BULK_ROWS} controls per request"}, status=400)
+
+        controls, errors = create_controls(request.data)
+
+        return Response({
+            "success": bool(controls),
+            "created": len(controls),
+            "ids": [control.id for control in controls],
+            "errors": errors,
+        }, status=201 if controls else 400)
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description="Update every control selected by ids or filters in a single statement",
+        request_body=bulk_request_body({
+            'vehicle': openapi.Schema(type=openapi.TYPE_INTEGER, description='Vehicle id'),
+            'driver': openapi.Schema(type=openapi.TYPE_INTEGER, description='Driver id'),
+            'departure_date': openapi.Schema(type=openapi.TYPE_STRING, description='Departure date'),
+            'departure_time': openapi.Schema(type=openapi.TYPE_STRING, description='Departure time'),
+            'departure_km': openapi.Schema(type=openapi.TYPE_INTEGER, description='Departure km'),
+            'destination': openapi.Schema(type=openapi.TYPE_STRING, description='Destination'),
+            'return_date': openapi.Schema(type=openapi.TYPE_STRING, description='Return date'),
+            'return_time': openapi.Schema(type=openapi.TYPE_STRING, description='Return time'),
+            'return_km': openapi.Schema(type=openapi.TYPE_INTEGER, description='Return km'),
+        }),
+        responses=bulk_response('updated')
+    ))
+    def patch(self, request):
+        try:
+            controls = select_targets(Control.objects.all(), request.data, filter_controls)
+
+            data = request.data.get("data")
+            if not isinstance(data, dict) or not data:
+                raise BulkError('Provide the fields to update in "data"')
+
+            data = dict(data)
+            references = {
+                name: clean_reference(data.pop(name), name)
+                for name in ('vehicle', 'driver')
+                if name in data
+            }
+            values = clean_update(Control, data, TRIP_FIELDS) if data else {}
+        except BulkError as error:
+            return Response({"error": str(error)}, status=400)
+
+        if "vehicle" in references:
+            vehicle = Vehicle.objects.filter(id=references["vehicle"]).first()
+            if not vehicle:
+                return Response({"error": "Vehicle not found"}, status=404)
+            values["vehicle_id"] = vehicle.id
+
+        if "driver" in references:
+            driver = Driver.objects.filter(id=references["driver"]).first()
+            if not driver:
+                return Response({"error": "Driver not found"}, status=404)
+            values["driver_id"] = driver.id
+
+        try:
+            updated = update_controls(controls, values)
+        except BulkError as error:
+            return Response({"error": str(error)}, status=400)
+
+        return Response({
+            "success": True,
+            "updated": updated,
+        }, status=200)
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description=(
+            "Delete every control selected by ids or filters in a single statement. "
+            'Body: {"ids": [1, 2]} or {"filters": {"departure_to": "2023-08-31"}}'
+        ),
+        responses=bulk_response('deleted')
+    ))
+    def delete(self, request):
+        try:
+            controls = select_targets(Control.objects.all(), request.data, filter_controls)
+        except BulkError as error:
+            return Response({"error": str(error)}, status=400)
+
+        return Response({
+            "success": True,
+            "deleted": delete_controls(controls),
+        }, status=200)
+
+
+class ExportControls(APIView):
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description="Stream the control history as CSV or NDJSON",
+        manual_parameters=[
+            openapi.Parameter(
+                name='format',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=list(EXPORT_FORMATS),
+                description='Output format (default csv)',
+            ),
+            openapi.Parameter(
+                name='search',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description='Search by departure or return date (YYYY-MM-DD, YYYY-MM or YYYY), or by destination, plate or driver name',
+            ),
+            *filter_parameters,
+        ],
+        responses={
+            200: openapi.Response(description='CSV or NDJSON rows, one per control'),
+            400: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message'),
+                },
+            ),
+        }
+    ))
+    def get(self, request):
+        export_format = request.GET.get('format', 'csv')
+
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": f"Invalid format, expected one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+        try:
+            controls = filter_controls(Control.objects.all(), request.GET)
+        except InvalidFilter as error:
+            return Response({"error": str(error)}, status=400)
+
+        response = StreamingHttpResponse(
+            export_stream(controls, export_format),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="controls.{export_format}"'
+        return response
+
+
+class ImportFleet(APIView):
+    parser_classes = [MultiPartParser]
+    max_reported_errors = 1000
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description=(
+            "Import drivers, vehicles or controls from an uploaded CSV file. Columns: "
+            "driver: name, phone, license_number; vehicle: plate, brand, model, oil_change_km; "
+            "control: plate, license_number, departure_date, departure_time, departure_km, destination, "
+            "return_date, return_time, return_km"
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                name='file',
+                in_=openapi.IN_FORM,
+                type=openapi.TYPE_FILE,
+                description='CSV file with a header row',
+                required=True
+            ),
+        ],
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'success': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Success'),
+                    'rows': openapi.Schema(type=openapi.TYPE_INTEGER, description='Rows read'),
+                    'created': openapi.Schema(type=openapi.TYPE_INTEGER, description='Rows imported'),
+                    'failed': openapi.Schema(type=openapi.TYPE_INTEGER, description='Rows rejected'),
+                    'rows_per_second': openapi.Schema(type=openapi.TYPE_INTEGER, description='Throughput'),
+                    'errors': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'line': openapi.Schema(type=openapi.TYPE_INTEGER, description='CSV line'),
+                                'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message'),
+                            }
+                        ),
+                        description='Rejected rows (first 1000)'
+                    ),
+                },
+            ),
+            400: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message'),
+                    'rows': openapi.Schema(type=openapi.TYPE_INTEGER, description='Rows read before the error'),
+                    'created': openapi.Schema(
+                        type=openapi.TYPE_INTEGER, description='Rows imported before the error, kept in the database'
+                    ),
+                    'errors': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                        description='Rows rejected before the error'
+                    ),
+                },
+            ),
+        }
+    ))
+    def post(self, request, entity):
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"error": "Missing file"}, status=400)
+
+        errors = []
+
+        def on_error(line, row, message):
+            if len(errors) < self.max_reported_errors:
+                errors.append({"line": line, "error": message})
+
+        # Large uploads are spooled to disk by Django; the wrapper decodes
+        # them lazily so the CSV is parsed row by row.
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+
+        try:
+            importer = FleetImporter(entity, on_error=on_error)
+        except InvalidImport as error:
+            return Response({"error": str(error)}, status=400)
+
+        try:
+            importer.run(stream)
+        except InvalidImport as error:
+            # Batches before the error are kept; retrying the whole file
+            # would import them twice.
+            return Response({
+                "error": str(error),
+                "rows": importer.rows,
+                "created": importer.created,
+                "errors": errors,
+            }, status=400)
+
+        return Response({
+            "success": True,
+            "rows": importer.rows,
+            "created": importer.created,
+            "failed": importer.failed,
+            "rows_per_second": importer.rows_per_second,
+            "errors": errors,
+        }, status=200)
+
+
+class MileageReport(APIView):
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description="Trip count and km per vehicle or driver, bucketed by day, week or month",
+        manual_parameters=[
+            openapi.Parameter(
+                name='group',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=list(ROLLUPS),
+                description='Group by vehicle (default) or driver',
+            ),
+            openapi.Parameter(
+                name='bucket',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=REPORT_BUCKETS,
+                description='Period size (default day); weeks start on Monday',
+            ),
+            openapi.Parameter(
+                name='from',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                description='Departure date on or after (YYYY-MM-DD)',
+            ),
+            openapi.Parameter(
+                name='to',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                description='Departure date on or before (YYYY-MM-DD)',
+            ),
+            openapi.Parameter(
+                name='page_size',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description='Number of items per page',
+            ),
+        ],
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'success': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Success'),
+                    'total_items': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'total_pages': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'current_page': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'results': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'vehicle': openapi.Schema(type=openapi.TYPE_INTEGER, description='Vehicle or driver ID, named after group'),
+                                'period': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description='First day of the bucket'),
+                                'trip_count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'total_km': openapi.Schema(type=openapi.TYPE_INTEGER),
+                            }
+                        )
+                    ),
+                },
+            ),
+            400: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message'),
+                },
+            ),
+        }
+    ))
+    @conditional_on(Control)
+    def get(self, request):
+        try:
+            rows = mileage_report(request.GET)
+        except InvalidFilter as error:
+            return Response({"error": str(error)}, status=400)
+
+        group = request.GET.get('group', 'vehicle')
+
+        paginator = PageNumberPagination()
+        paginator.page_size = request.GET.get('page_size', 10)
+        result_page = paginator.paginate_queryset(rows, request)
+
+        return Response({
+            "success": True,
+            "total_items": paginator.page.paginator.count,
+            "total_pages": paginator.page.paginator.num_pages,
+            "current_page": paginator.page.number,
+            "results": [
+                {
+                    group: row[group],
+                    "period": row['period'],
+                    "trip_count": row['trips'],
+                    "total_km": row['km'],
+                }
+                for row in result_page
+            ],
+        }, status=200)
+
+
+class ControlChanges(APIView):
+    list_serializer = FetchData.list_serializer
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description=(
+            "Controls created, updated or deleted since the token, oldest first. "
+            "Start without since, then pass the next_token of each response."
+        ),
+        manual_parameters=[*changes_parameters, fields_parameter, expand_parameter],
+        responses=changes_response(openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'id': openapi.Schema(type=openapi.TYPE_INTEGER, description='Control ID'),
+                'vehicle': openapi.Schema(type=openapi.TYPE_OBJECT, description='Vehicle, or its id if not expanded'),
+                'driver': openapi.Schema(type=openapi.TYPE_OBJECT, description='Driver, or its id if not expanded'),
+                'departure_date': openapi.Schema(type=openapi.TYPE_STRING, description='Departure date'),
+                'departure_time': openapi.Schema(type=openapi.TYPE_STRING, description='Departure time'),
+                'departure_km': openapi.Schema(type=openapi.TYPE_INTEGER, description='Departure km'),
+                'destination': openapi.Schema(type=openapi.TYPE_STRING, description='Destination'),
+                'return_date': openapi.Schema(type=openapi.TYPE_STRING, description='Return date'),
+                'return_time': openapi.Schema(type=openapi.TYPE_STRING, description='Return time'),
+                'return_km': openapi.Schema(type=openapi.TYPE_INTEGER, description='Return km'),
+                'distance_traveled': openapi.Schema(type=openapi.TYPE_INTEGER, description='Distance traveled'),
+                'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                             format=openapi.FORMAT_DATETIME, description='Creation time'),
+                'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                             format=openapi.FORMAT_DATETIME, description='Last write time'),
+            }
+        ))
+    ))
+    def get(self, request):
+        try:
+            serializer = self.list_serializer.select(request.GET)
+            data = read_changes(Control.objects.all(), serializer, request.GET)
+        except ExpiredToken:
+            return Response({"error": "Token expired, download the full list again"}, status=410)
+        except InvalidToken:
+            return Response({"error": "Invalid since token"}, status=400)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=400)
+
+        return Response(data, status=200)
+
+
+class AsyncFetchData(AsyncReadView):
+    """Async variant of FetchData, without conditional GET and response cache."""
+    list_serializer = FetchData.list_serializer
+
+    async def get(self, request):
+        try:
+            controls = filter_controls(Control.objects.all(), request.GET)
+            serializer = self.list_serializer.select(request.GET)
+            normalized = wants_normalized(request.GET)
+        except (InvalidFilter, InvalidFields) as exception:
+            return error(str(exception))
+
+        order_by = request.GET.get('order_by', None)
+
+        if wants_cursor_pagination(request):
+            if order_by:
+                return error("order_by is not supported with cursor pagination")
+
+            paginator = KeysetPagination(ordering=['-departure_date', '-id'])
+            try:
+                rows = await paginator.apaginate_queryset(serializer.values(controls, *paginator.columns), request)
+            except InvalidCursor:
+                return error("Invalid cursor")
+
+            return render(self.page(serializer, rows, normalized, paginator.get_paginated_data))
+
+        if order_by:
+            controls = controls.order_by(order_by, 'id')
+
+        try:
+            page, rows = await paginate(serializer.paged(controls), request, request.GET.get('page_size', 10))
+        except InvalidPage:
+            return invalid_page()
+
+        return render(self.page(serializer, rows, normalized, lambda results: page_data(page, results)))
+
+    def page(self, serializer, rows, normalized, page_data):
+        if not normalized:
+            return page_data(serializer.to_representation(rows))
+
+        results, related = serializer.to_normalized(rows)
+        data = page_data(results)
+        for name, objects in related.items():
+            data[f'{name}s'] = objects
+        return data
+
+
+class AsyncFindById(AsyncReadView):
+    detail_serializer = FindById.detail_serializer
+
+    async def get(self, request, control_id):
+        try:
+            serializer = self.detail_serializer.select(request.GET)
+        except InvalidFields as exception:
+            return error(str(exception))
+
+        control = await serializer.values(Control.objects.filter(id=control_id)).afirst()
+
+        if not control:
+            return error("Control not found", status=404)
+
+        return render({
+            "success": True,
+            "control": serializer.to_data(control),
+        })
+
+
+class AsyncTotalKm(AsyncReadView):
+
+    async def get(self, request, vehicle_id):
+        vehicle = await Vehicle.objects.select_related('mileage').filter(id=vehicle_id).afirst()
+
+        if not vehicle:
+            return error("Vehicle not found", status=404)
+
+        try:
+            km_total = vehicle.mileage.total_km
+        except VehicleMileage.DoesNotExist:
+            km_total = 0
+
+        km_left = vehicle.oil_change_km - km_total
+
+        if km_total >= vehicle.oil_change_km:
+            return render({
+                "success": True,
+                "message": "Vehicle exceeded the km limit",
+                "oil_change_km": vehicle.oil_change_km,
+                "km_left": km_left,
+                "total_km": km_total
+            })
+
+        return render({
+            "success": True,
+            "message": "Vehicle is within the km limit",
+            "km_left": km_left,
+            "total_km": km_total
+        })
@@ -0,0 +1,58 @@
+from django.core.paginator import Paginator
+from django.http import HttpResponse
+from django.views import View
+
+from .renderers import FastJSONRenderer
+
+renderer = FastJSONRenderer()
+
+
+class AsyncReadView(View):
+    """
+    Base of the async read endpoints served under ``/api/async/``.
+
+    DRF's APIView only runs synchronous handlers, so these are plain Django
+    views with ``async def get``: under ASGI they await the async ORM on the
+    event loop instead of holding a worker thread per request. Responses
+    have the same bodies and status codes as their sync counterparts.
+    """
+    http_method_names = ['get', 'options']
+
+
+def render(data, status=200):
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+def error(message, status=400):
+    return render({"error": message}, status=status)
+
+
+async def paginate(rows, request, page_size):
+    """
+    Async counterpart of PageNumberPagination: returns the page and its rows,
+    or raises InvalidPage. ``rows`` is a queryset or JoinedRows.
+    """
+    paginator = Paginator(rows, page_size)
+    paginator.count = await rows.acount()
+
+    number = request.GET.get('page', 1)
+    if number == 'last':
+        number = paginator.num_pages
+
+    page = paginator.page(number)
+    return page, [row async for row in page.object_list]
+
+
+def page_data(page, results):
+    return {
+        "success": True,
+        "total_items": page.paginator.count,
+        "total_pages": page.paginator.num_pages,
+        "current_page": page.number,
+        "results": results,
+    }
+
+
+def invalid_page():
+    # Same body as DRF's NotFound raised by PageNumberPagination.
+    return render({"detail": "Invalid page."}, status=404)
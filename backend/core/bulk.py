@@ -0,0 +1,142 @@
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import connections, models
+from drf_yasg import openapi
+
+
+class BulkError(ValueError):
+    pass
+
+
+def select_targets(queryset, payload, filter_queryset):
+    """
+    Narrow ``queryset`` to the rows addressed by a bulk request body, given
+    either as ``{"ids": [...]}`` or as ``{"filters": {...}}`` using the same
+    parameters as the list endpoint (or both).
+    """
+    if not isinstance(payload, dict):
+        raise BulkError('Expected an object with "ids" or "filters"')
+
+    ids = payload.get('ids')
+    filters = payload.get('filters')
+
+    if ids is None and not filters:
+        raise BulkError('Provide "ids" or "filters"')
+
+    if ids is not None:
+        if not isinstance(ids, list):
+            raise BulkError("Invalid ids")
+
+        try:
+            ids = [int(value) for value in ids]
+        except (TypeError, ValueError):
+            raise BulkError("Invalid ids")
+
+        queryset = queryset.filter(id__in=ids)
+
+    if filters:
+        if not isinstance(filters, dict):
+            raise BulkError("Invalid filters")
+
+        try:
+            queryset = filter_queryset(queryset, filters)
+        except ValueError as error:
+            raise BulkError(str(error))
+
+    return queryset.order_by()
+
+
+def clean_update(model, data, fields):
+    """Validate the ``data`` of a bulk update against the model fields."""
+    if not isinstance(data, dict) or not data:
+        raise BulkError('Provide the fields to update in "data"')
+
+    unknown = sorted(set(data) - set(fields))
+    if unknown:
+        raise BulkError(f"Unknown fields: {', '.join(unknown)}")
+
+    values = {}
+    for name, value in data.items():
+        field = model._meta.get_field(name)
+
+        if value in (None, '') and field.null:
+            values[name] = None
+            continue
+
+        try:
+            values[name] = field.clean(value, None)
+        except ValidationError:
+            raise BulkError(f"Invalid {name}")
+
+    return values
+
+
+def bulk_request_body(data_properties):
+    return openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'ids': openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                description='Ids of the rows to change'
+            ),
+            'filters': openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                description='Same filters as the list endpoint, e.g. {"search": "..."}'
+            ),
+            'data': openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties=data_properties,
+                description='Fields to set on every selected row'
+            ),
+        }
+    )
+
+
+def bulk_response(count_name):
+    return {
+        200: openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'success': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Success'),
+                count_name: openapi.Schema(type=openapi.TYPE_INTEGER, description=f'Number of rows {count_name}'),
+            },
+        ),
+        400: openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message'),
+            },
+        ),
+    }
+
+
+def delete_rows(queryset):
+    """
+    Delete the rows of ``queryset`` with a single ``DELETE ... WHERE pk IN
+    (SELECT ...)`` and return how many were deleted. Rows are not loaded,
+    per-row signals are not sent and Django's deletion collector does not
+    run, so models with a relation that needs it (anything but DO_NOTHING)
+    are refused instead of leaving dangling or stale rows behind.
+    """
+    model = queryset.model
+    collected = [
+        relation.name for relation in model._meta.related_objects
+        if getattr(relation, 'on_delete', None) is not models.DO_NOTHING
+    ]
+    if collected:
+        raise ImproperlyConfigured(
+            f"{model.__name__} rows cannot be deleted without the collector: {', '.join(collected)}"
+        )
+
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    pk = quote(model._meta.pk.column)
+    sql, params = queryset.order_by().values('pk').query.get_compiler(queryset.db).as_sql()
+
+    with connection.cursor() as cursor:
+        # The derived table lets MySQL read from the table it deletes from.
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} WHERE {pk} IN (SELECT targets.{pk} FROM ({sql}) targets)',
+            params,
+        )
+        return cursor.rowcount
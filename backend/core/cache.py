@@ -0,0 +1,117 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .conditional import table_versions
+from .serializers import EXPAND_PARAM
+from .versions import version_token
+
+STATS_PREFIX = 'response-cache:stats'
+
+# Names of the views using the cache, listed by the stats endpoint.
+cached_views = []
+
+
+def response_cache():
+    """The cache configured by RESPONSE_CACHE_ALIAS, or None when disabled."""
+    alias = getattr(settings, 'RESPONSE_CACHE_ALIAS', None)
+    if not alias or alias not in settings.CACHES:
+        return None
+    return caches[alias]
+
+
+def normalize_params(params, defaults):
+    """
+    Sorted query parameters without empty values, with the view defaults
+    filled in, so that ``?page=1&page_size=10`` and no parameters share an
+    entry. An empty ``expand`` is kept: it means no relation is embedded.
+    """
+    normalized = {name: value for name, value in defaults.items()}
+    for name in params:
+        values = [value for value in params.getlist(name) if value != '' or name == EXPAND_PARAM]
+        if values:
+            normalized[name] = values if len(values) > 1 else values[0]
+    return sorted(normalized.items())
+
+
+def count(cache, name, event):
+    key = f'{STATS_PREFIX}:{name}:{event}'
+    # add() is a no-op when the counter exists, so incr() always has a key.
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def cache_stats():
+    cache = response_cache()
+    stats = {}
+
+    for name in cached_views:
+        hits = cache.get(f'{STATS_PREFIX}:{name}:hits', 0) if cache else 0
+        misses = cache.get(f'{STATS_PREFIX}:{name}:misses', 0) if cache else 0
+        stats[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0,
+        }
+
+    return stats
+
+
+def reset_cache_stats():
+    cache = response_cache()
+    if cache:
+        cache.delete_many([
+            f'{STATS_PREFIX}:{name}:{event}' for name in cached_views for event in ('hits', 'misses')
+        ])
+
+
+def cached_response(*models, defaults=None):
+    """
+    Cache the data of successful responses of a read view in the response
+    cache.
+
+    Entries are keyed on the view, the normalized query parameters and the
+    version counters of the tables of ``models``. Any write to those tables
+    bumps a counter, so stale entries are never read again and simply
+    expire. Hits and misses are counted per view.
+    """
+    tables = tuple(model._meta.db_table for model in models)
+    defaults = defaults or {}
+
+    def decorator(method):
+        # e.g. "control.FetchData"
+        name = f'{method.__module__.split(".")[0]}.{method.__qualname__.split(".")[0]}'
+        cached_views.append(name)
+
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            cache = response_cache()
+            if cache is None:
+                return method(self, request, *args, **kwargs)
+
+            key = hashlib.sha1(repr((
+                name, args, sorted(kwargs.items()),
+                normalize_params(request.GET, defaults),
+                version_token(table_versions(request, tables)),
+            )).encode()).hexdigest()
+
+            data = cache.get(f'response-cache:{key}')
+            if data is not None:
+                count(cache, name, 'hits')
+                return Response(data, status=200)
+
+            count(cache, name, 'misses')
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(f'response-cache:{key}', response.data)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    # The changes endpoints refuse tokens older than the same setting, so
+    # no client misses a pruned deletion.
+    help = 'Delete the tombstones of deleted rows older than SYNC_TOMBSTONE_DAYS'
+
+    def handle(self, *args, **options):
+        days = settings.SYNC_TOMBSTONE_DAYS
+
+        deleted = prune_tombstones(days)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones older than {days} days'))
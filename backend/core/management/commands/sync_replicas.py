@@ -0,0 +1,38 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from core.sqlite import copy_database, database_path
+
+
+class Command(BaseCommand):
+    help = 'Copy the default SQLite database into the files of the read replicas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--alias',
+            action='append',
+            dest='aliases',
+            help='Only sync the given read alias (can be repeated), instead of every alias in READ_DATABASES',
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or list(getattr(settings, 'READ_DATABASES', {}))
+        source = database_path(settings.DATABASES[DEFAULT_DB_ALIAS])
+
+        for alias in aliases:
+            if alias not in settings.DATABASES:
+                raise CommandError(f'Unknown database alias: {alias}')
+
+            target = database_path(settings.DATABASES[alias])
+            if os.path.abspath(target) == os.path.abspath(source):
+                self.stdout.write(f'{alias} reads the default database file, nothing to copy')
+                continue
+
+            started = time.perf_counter()
+            copy_database(source, target)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f'Copied {source} to {alias} ({target}) in {elapsed:.2f}s'))
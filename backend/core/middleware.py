@@ -0,0 +1,52 @@
+from django.conf import settings
+
+from .routers import replica_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Cookie that keeps a client reading from the default database for
+# REPLICA_PIN_SECONDS after a write, until the replicas have caught up.
+PIN_COOKIE = 'read_primary'
+
+
+class ReplicaMiddleware:
+    """
+    Let ReadWriteRouter send the reads of GET, HEAD and OPTIONS requests to
+    the read replicas, except for clients that wrote within the last
+    REPLICA_PIN_SECONDS (read-your-writes).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replicas = request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+
+        token = replica_reads.set(use_replicas)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+
+        if response.streaming:
+            # Streamed rows (the CSV export) are read after the view returns.
+            response.streaming_content = self.stream(response.streaming_content, use_replicas)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+            )
+
+        return response
+
+    def stream(self, content, use_replicas):
+        replica_reads.set(use_replicas)
+        try:
+            yield from content
+        finally:
+            # Not reset(): the server may close the iterator from another
+            # context than the one that started it.
+            replica_reads.set(False)
@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class TableVersion(models.Model):
+    table = models.CharField(max_length=64, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'table_version'
+
+
+class Tombstone(models.Model):
+    """A row deleted from a synced table, reported by the changes endpoints."""
+    table = models.CharField(max_length=64)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'tombstone'
+        indexes = [
+            models.Index(fields=['table', 'deleted_at', 'id'], name='tombstone_table_deleted_idx'),
+        ]
@@ -0,0 +1,170 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from drf_yasg import openapi
+from rest_framework.response import Response
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def wants_cursor_pagination(request):
+    return request.GET.get('pagination') == 'cursor' or 'cursor' in request.GET
+
+
+cursor_parameters = [
+    openapi.Parameter(
+        name='pagination',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        enum=['page', 'cursor'],
+        description='Use "cursor" for keyset pagination (no total count, constant cost on deep pages)',
+        required=False
+    ),
+    openapi.Parameter(
+        name='cursor',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        description='Opaque cursor returned as next_cursor/previous_cursor by a previous cursor page',
+        required=False
+    ),
+]
+
+
+class KeysetPagination:
+    """
+    Cursor pagination on a fixed, unique ordering.
+
+    Pages are fetched with a range predicate on the ordering columns, so no
+    COUNT(*) or OFFSET is issued no matter how deep the page is.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 10
+
+    def __init__(self, ordering):
+        self.ordering = [
+            (field[1:], True) if field.startswith('-') else (field, False)
+            for field in ordering
+        ]
+
+    @property
+    def columns(self):
+        """Columns the cursors are built from."""
+        return [name for name, _ in self.ordering]
+
+    def paginate_queryset(self, queryset, request):
+        return self.paginate_rows(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self.paginate_rows([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """The rows of the requested page plus one, to tell if there are more."""
+        self.page_size = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(queryset.model, request.GET.get(self.cursor_query_param))
+
+        ordering = [(name, descending != self.reverse) for name, descending in self.ordering]
+        queryset = queryset.order_by(*[('-' if descending else '') + name for name, descending in ordering])
+
+        if self.position is not None:
+            queryset = queryset.filter(self.after(ordering, self.position))
+
+        return queryset[:self.page_size + 1]
+
+    def paginate_rows(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = self.position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+
+        self.rows = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+
+        return page_size if page_size > 0 else self.page_size
+
+    def get_next_cursor(self):
+        if not self.has_next or not self.rows:
+            return None
+
+        return self.encode_cursor(self.rows[-1], reverse=False)
+
+    def get_previous_cursor(self):
+        if not self.has_previous or not self.rows:
+            return None
+
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+    def get_paginated_data(self, data):
+        return {
+            "success": True,
+            "next_cursor": self.get_next_cursor(),
+            "previous_cursor": self.get_previous_cursor(),
+            "results": data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data), status=200)
+
+    def after(self, ordering, position):
+        """
+        Rows strictly after ``position``, written as
+        ``a >= x AND (a > x OR (a = x AND ...))`` so the leading column stays
+        sargable.
+        """
+        (name, descending), value = ordering[0], position[0]
+        strict = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+
+        if len(ordering) == 1:
+            return strict
+
+        inclusive = Q(**{f'{name}__{"lte" if descending else "gte"}': value})
+        tie = Q(**{name: value}) & self.after(ordering[1:], position[1:])
+        return inclusive & (strict | tie)
+
+    def encode_cursor(self, row, reverse):
+        payload = {
+            'p': [row[name] if isinstance(row, dict) else getattr(row, name) for name in self.columns],
+            'r': reverse,
+        }
+        data = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, model, cursor):
+        if not cursor:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = payload['p']
+            reverse = bool(payload.get('r', False))
+
+            if len(values) != len(self.ordering):
+                raise InvalidCursor(cursor)
+
+            position = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise InvalidCursor(cursor)
+
+        if any(value is None for value in position):
+            raise InvalidCursor(cursor)
+
+        return position, reverse
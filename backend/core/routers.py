@@ -0,0 +1,87 @@
+import contextvars
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Whether reads may go to the replicas, set by ReplicaMiddleware for GET,
+# HEAD and OPTIONS requests of clients that have not written recently.
+replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+class ReadWriteRouter:
+    """
+    Send the reads of safe-method requests to the aliases in
+    settings.READ_DATABASES and every other query to the default database.
+
+    READ_DATABASES maps each read alias to its weight; the aliases take
+    turns, each one ``weight`` times per round. An alias that fails to
+    connect is skipped for REPLICA_RETRY_SECONDS, and the read falls back
+    to the default database when none is available.
+
+    Reads made while the default connection is inside a transaction stay
+    on it, so code that reads and then writes in ``transaction.atomic``
+    sees its own uncommitted rows.
+    """
+
+    def __init__(self):
+        self.weights = None
+        self.schedule = []
+        self.turns = itertools.count()
+        self.unavailable = {}
+        self.lock = threading.Lock()
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return self.replica()
+
+    def db_for_write(self, model, **hints):
+        # Explicit, or instances loaded from a read alias would be saved
+        # back to it.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+    def replica(self):
+        schedule = self.get_schedule()
+
+        for _ in range(len(schedule)):
+            alias = schedule[next(self.turns) % len(schedule)]
+            if self.is_available(alias):
+                return alias
+
+        return DEFAULT_DB_ALIAS
+
+    def get_schedule(self):
+        weights = getattr(settings, 'READ_DATABASES', {})
+
+        with self.lock:
+            if weights != self.weights:
+                self.weights = dict(weights)
+                self.schedule = [alias for alias, weight in weights.items() for _ in range(weight)]
+            return self.schedule
+
+    def is_available(self, alias):
+        if self.unavailable.get(alias, 0) > time.monotonic():
+            return False
+
+        try:
+            connections[alias].ensure_connection()
+        except SynchronousOnlyOperation:
+            # Routed from async code (queryset.db on the event loop); the
+            # query itself connects later, in a thread.
+            return True
+        except DatabaseError:
+            self.unavailable[alias] = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+            return False
+
+        self.unavailable.pop(alias, None)
+        return True
@@ -0,0 +1,90 @@
+import threading
+
+# View methods whose swagger_auto_schema overrides have not been built yet.
+pending_schemas = []
+pending_lock = threading.Lock()
+
+
+def lazy_swagger_auto_schema(overrides):
+    """
+    ``swagger_auto_schema`` with its keyword arguments returned by the
+    ``overrides`` callable. The nested ``openapi.Schema`` literals are only
+    built, and drf_yasg only imported, when the schema is first generated
+    instead of when the views module is imported.
+    """
+    def decorator(view_method):
+        with pending_lock:
+            pending_schemas.append((view_method, overrides))
+        return view_method
+
+    return decorator
+
+
+def apply_lazy_schemas():
+    from drf_yasg.utils import swagger_auto_schema
+
+    with pending_lock:
+        while pending_schemas:
+            view_method, overrides = pending_schemas.pop()
+            # Sets _swagger_auto_schema on the function in place, like the
+            # eager decorator would have done at import time.
+            swagger_auto_schema(**overrides())(view_method)
+
+
+def schema_generator_class():
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    class MemoizedSchemaGenerator(OpenAPISchemaGenerator):
+        """
+        Generates the schema once per version and serves the same document
+        afterwards; views cannot change without a restart.
+        """
+        schemas = {}
+        lock = threading.Lock()
+
+        def get_schema(self, request=None, public=False):
+            # The UI renderer asks for a schema without endpoints (patterns=[]).
+            key = (self.version, public, self._gen.patterns == [])
+
+            with self.lock:
+                if key not in self.schemas:
+                    apply_lazy_schemas()
+                    schema = super().get_schema(request, public)
+
+                    if self.url is None:
+                        # Taken from the first request's Host header; without
+                        # them clients use the host serving the document.
+                        schema.pop('host', None)
+                        schema.pop('schemes', None)
+
+                    self.schemas[key] = schema
+
+                return self.schemas[key]
+
+    return MemoizedSchemaGenerator
+
+
+def swagger_view(info):
+    """
+    The Swagger UI view, built on its first request so that drf_yasg's
+    view, renderer and inspector modules are not imported at startup.
+    ``info`` returns the ``openapi.Info`` of the API.
+    """
+    view = None
+
+    def swagger(request, *args, **kwargs):
+        nonlocal view
+
+        if view is None:
+            from drf_yasg.views import get_schema_view
+
+            view = get_schema_view(
+                info(),
+                public=True,
+                generator_class=schema_generator_class(),
+            ).with_ui('swagger', cache_timeout=0)
+
+        return view(request, *args, **kwargs)
+
+    swagger.csrf_exempt = True
+    return swagger
@@ -0,0 +1,150 @@
+import functools
+import re
+import sqlite3
+from contextlib import closing
+
+from django.conf import settings
+from django.db import connections, models
+from django.db.models import Lookup, Q
+
+# Case and accent insensitive words: "sao" matches "São".
+TOKENIZER = "unicode61 remove_diacritics 2"
+
+
+class SearchField(models.TextField):
+    """
+    The hidden column of an FTS5 table that has the table's own name, the
+    left-hand side of ``MATCH`` queries.
+    """
+
+
+@SearchField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+@functools.lru_cache(maxsize=None)
+def sqlite_has_fts5():
+    # Django's SQLite backend runs on the sqlite3 module's library.
+    with closing(sqlite3.connect(':memory:')) as database:
+        return bool(database.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+
+
+def has_fts5(connection):
+    """Whether ``connection`` is an SQLite database with the FTS5 extension."""
+    return connection.vendor == 'sqlite' and sqlite_has_fts5()
+
+
+def uses_index(queryset):
+    """Whether searches on ``queryset`` can go through the FTS5 indexes."""
+    return getattr(settings, 'FULL_TEXT_SEARCH', True) and has_fts5(connections[queryset.db])
+
+
+def match_query(text):
+    """
+    FTS5 query matching the rows where every word of ``text`` starts a word
+    of the indexed columns, in any order, or None if ``text`` has no words.
+    Quoting each word keeps FTS5 operators in the input literal.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def create_index_sql(table, columns, **options):
+    """SQL creating an FTS5 table over ``columns`` with prefix indexes."""
+    options = {'tokenize': TOKENIZER, 'prefix': '2 3', **options}
+    arguments = [*columns, *(f"{name}='{value}'" for name, value in options.items())]
+    return f"CREATE VIRTUAL TABLE {table} USING fts5({', '.join(arguments)})"
+
+
+def create_external_index_sql(table, source, columns):
+    """
+    SQL creating an FTS5 index over ``columns`` of ``source`` that stores no
+    copy of the text, with the triggers keeping it in sync, and filling it
+    from the existing rows.
+    """
+    listed = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+
+    return [
+        create_index_sql(table, columns, content=source, content_rowid='id'),
+        f"CREATE TRIGGER {table}_insert AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {table}(rowid, {listed}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {table}_delete AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {listed}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER {table}_update AFTER UPDATE OF {listed} ON {source} BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {listed}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {table}(rowid, {listed}) VALUES (new.id, {new}); END",
+        f"INSERT INTO {table}({table}) VALUES ('rebuild')",
+    ]
+
+
+def drop_index_sql(table, triggers):
+    return [f'DROP TRIGGER IF EXISTS {trigger}' for trigger in triggers] + [f'DROP TABLE IF EXISTS {table}']
+
+
+def run_if_fts5(statements):
+    """
+    RunPython operation executing ``statements`` on SQLite with FTS5 only;
+    other databases search with the ``icontains`` fallback.
+    """
+    def run(apps, schema_editor):
+        if has_fts5(schema_editor.connection):
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    return run
+
+
+SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 50
+# Matches ranked per suggestion request.
+SUGGEST_POOL = 200
+
+
+def suggest_limit(params):
+    """Number of suggestions asked with ``limit``; raises ValueError when invalid."""
+    try:
+        limit = int(params.get('limit') or SUGGEST_LIMIT)
+    except ValueError:
+        limit = 0
+
+    if not 1 <= limit <= MAX_SUGGEST_LIMIT:
+        raise ValueError(f'Invalid limit, expected 1 to {MAX_SUGGEST_LIMIT}')
+    return limit
+
+
+def suggest(rows, index, text, limit, fields):
+    """
+    The ``limit`` entries of the values() queryset ``rows`` best matching
+    the typed ``text``, as a list.
+
+    Only the first SUGGEST_POOL matches in the FTS5 ``index`` model, in id
+    order, are ranked: a one-letter prefix matches every row, and ranking
+    all of them would cost more than the rest of the request. Without the
+    index, ``fields`` are searched with ``icontains``.
+    """
+    query = match_query(text)
+    if query is None:
+        return list(rows.order_by('pk')[:limit])
+
+    if not uses_index(rows):
+        conditions = Q()
+        for field in fields:
+            conditions |= Q(**{f'{field}__icontains': text})
+        return list(rows.filter(conditions).order_by('pk')[:limit])
+
+    pool = index.objects.using(rows.db).filter(document__match=query).values_list('pk', 'rank')[:SUGGEST_POOL]
+    ids = [pk for pk, rank in sorted(pool, key=lambda match: match[1])[:limit]]
+
+    found = {row['id']: row for row in rows.filter(pk__in=ids)}
+    return [found[pk] for pk in ids if pk in found]
@@ -0,0 +1,235 @@
+from drf_yasg import openapi
+from rest_framework import serializers
+
+# DRF fields whose to_representation returns database values unchanged.
+PASSTHROUGH_FIELDS = (serializers.BooleanField, serializers.CharField, serializers.IntegerField)
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+FORMAT_PARAM = 'format'
+NORMALIZED_FORMAT = 'normalized'
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+fields_parameter = openapi.Parameter(
+    name=FIELDS_PARAM,
+    in_=openapi.IN_QUERY,
+    type=openapi.TYPE_STRING,
+    description='Comma separated fields to return, e.g. "id,departure_date,destination" (default: all)',
+    required=False
+)
+
+expand_parameter = openapi.Parameter(
+    name=EXPAND_PARAM,
+    in_=openapi.IN_QUERY,
+    type=openapi.TYPE_STRING,
+    description='Comma separated relations to embed (vehicle, driver); the others are returned as ids. '
+                'Empty for ids only (default: all)',
+    required=False
+)
+
+format_parameter = openapi.Parameter(
+    name=FORMAT_PARAM,
+    in_=openapi.IN_QUERY,
+    type=openapi.TYPE_STRING,
+    enum=[NORMALIZED_FORMAT],
+    description='"normalized" returns related objects once, in top-level dictionaries keyed by id, '
+                'and only their ids in the results',
+    required=False
+)
+
+
+def wants_normalized(params):
+    value = params.get(FORMAT_PARAM)
+    if value not in (None, '', NORMALIZED_FORMAT):
+        raise InvalidFields(f"Invalid format, expected: {NORMALIZED_FORMAT}")
+    return value == NORMALIZED_FORMAT
+
+
+def compile_fields(serializer, prefix=''):
+    """
+    Turn the fields of a DRF serializer into ``(name, column, convert,
+    nested)`` entries reading from ``values()`` rows, in output order.
+    """
+    plan = []
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+
+        column = prefix + field.source.replace('.', '__')
+
+        if isinstance(field, serializers.BaseSerializer):
+            # The foreign key column tells a missing relation apart from a
+            # related row whose columns are all NULL.
+            plan.append((name, column, None, compile_fields(field, column + '__')))
+        elif type(field) in PASSTHROUGH_FIELDS:
+            plan.append((name, column, None, None))
+        else:
+            plan.append((name, column, field.to_representation, None))
+
+    return plan
+
+
+def split_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def plan_columns(plan):
+    for _, column, _, nested in plan:
+        yield column
+        if nested:
+            yield from plan_columns(nested)
+
+
+class JoinedRows:
+    """
+    ``values()`` rows for Django's Paginator: pages are sliced from the
+    joined rows while the total is counted on the plain queryset, so the
+    COUNT does not pay for the joins of the related columns.
+    """
+
+    def __init__(self, queryset, rows):
+        self.queryset = queryset
+        self.rows = rows
+
+    @property
+    def ordered(self):
+        return self.rows.ordered
+
+    def count(self):
+        return self.queryset.count()
+
+    async def acount(self):
+        return await self.queryset.acount()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+
+class ValuesSerializer:
+    """
+    Read-only replacement for a ModelSerializer on list endpoints.
+
+    Rows are fetched with ``values()`` (related objects through joined
+    columns) and assembled into the exact JSON shape of
+    ``serializer_class``, using accessors compiled once from its fields
+    instead of building model instances and walking the field machinery
+    for every row.
+    """
+
+    def __init__(self, serializer_class, plan=None):
+        self.serializer_class = serializer_class
+        self._plan = plan
+
+    @property
+    def plan(self):
+        # Compiled lazily: serializer fields need the app registry.
+        if self._plan is None:
+            self._plan = compile_fields(self.serializer_class())
+        return self._plan
+
+    @property
+    def columns(self):
+        return list(dict.fromkeys(plan_columns(self.plan)))
+
+    def select(self, params):
+        """
+        Serializer restricted by the ``fields`` and ``expand`` query
+        parameters. Fields left out are not selected at all and relations
+        left out of ``expand`` are returned as their id, read from the
+        foreign key column without joining the related table.
+        """
+        fields = split_names(params[FIELDS_PARAM]) if params.get(FIELDS_PARAM) else None
+        expand = split_names(params[EXPAND_PARAM]) if EXPAND_PARAM in params else None
+
+        if fields is None and expand is None:
+            return self
+
+        names = [name for name, _, _, _ in self.plan]
+        relations = [name for name, _, _, nested in self.plan if nested]
+
+        for name in fields or []:
+            if name not in names:
+                raise InvalidFields(f"Invalid field: {name}")
+
+        for name in expand or []:
+            if name not in relations:
+                raise InvalidFields(f"Invalid expand: {name}")
+
+        plan = []
+        for name, column, convert, nested in self.plan:
+            if fields is not None and name not in fields:
+                continue
+
+            if nested and expand is not None and name not in expand:
+                plan.append((name, column, None, None))
+            else:
+                plan.append((name, column, convert, nested))
+
+        return ValuesSerializer(self.serializer_class, plan)
+
+    def values(self, queryset, *extra):
+        """
+        ``values()`` rows of ``queryset``; ``extra`` columns (such as the
+        keyset ordering) are read without being returned.
+        """
+        return queryset.values(*dict.fromkeys([*self.columns, *extra]))
+
+    def paged(self, queryset):
+        """Rows of ``queryset`` ready for PageNumberPagination."""
+        return JoinedRows(queryset, self.values(queryset))
+
+    def to_representation(self, rows):
+        plan = self.plan
+        return [self.build(plan, row) for row in rows]
+
+    def to_data(self, row):
+        return self.build(self.plan, row)
+
+    def to_normalized(self, rows):
+        """
+        ``(results, related)`` where results reference their expanded
+        relations by id and ``related`` maps each relation name to its
+        distinct objects by id. Every related object is built once, however
+        many rows repeat it.
+        """
+        plan = self.plan
+        flat = [(name, column, convert, None) for name, column, convert, _ in plan]
+        relations = [(name, column, nested) for name, column, _, nested in plan if nested]
+
+        results = []
+        related = {name: {} for name, _, _ in relations}
+
+        for row in rows:
+            results.append(self.build(flat, row))
+
+            for name, column, nested in relations:
+                key = row[column]
+                if key is not None and key not in related[name]:
+                    related[name][key] = self.build(nested, row)
+
+        return results, related
+
+    def build(self, plan, row):
+        data = {}
+
+        for name, column, convert, nested in plan:
+            value = row[column]
+
+            if value is None:
+                data[name] = None
+            elif nested:
+                data[name] = self.build(nested, row)
+            elif convert:
+                data[name] = convert(value)
+            else:
+                data[name] = value
+
+        return data
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent by set-based writes (bulk_create, queryset update/delete) that bypass
+# the per-instance model signals. ``sender`` is the model class; for controls
+# the ``vehicle_ids`` and ``driver_ids`` of every affected trip are passed
+# along so derived data can be refreshed for just those rows.
+bulk_changed = Signal()
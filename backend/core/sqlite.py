@@ -0,0 +1,87 @@
+import re
+import sqlite3
+from contextlib import closing
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.db import migrations
+
+# Pragmas that need write access and persist in the database file; they are
+# skipped on read-only connections, which inherit them from the file.
+WRITE_PRAGMAS = {'journal_mode'}
+
+
+def is_read_only(connection):
+    return 'mode=ro' in str(connection.settings_dict['NAME'])
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    Apply settings.SQLITE_PRAGMAS to every new SQLite connection, such as
+    WAL journaling, the busy timeout and the page cache and mmap sizes.
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    read_only = is_read_only(connection)
+
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            if read_only and name in WRITE_PRAGMAS:
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def database_path(settings_dict):
+    """Filesystem path of an SQLite alias whose NAME is a path or a file: URI."""
+    name = str(settings_dict['NAME'])
+    if not name.startswith('file:'):
+        return name
+
+    return unquote(urlsplit(name).path)
+
+
+def copy_database(source, target):
+    """
+    Copy the SQLite database at ``source`` into ``target`` with the online
+    backup API: the copy is consistent while ``source`` is being written,
+    and connections already open on ``target`` see the new contents.
+    """
+    with closing(sqlite3.connect(source)) as origin, closing(sqlite3.connect(target)) as copy:
+        origin.backup(copy)
+
+
+def preserve_triggers(*tables):
+    """
+    Pair of RunPython operations to put around schema changes that make
+    Django rebuild ``tables`` on SQLite (copy into a new table, drop the
+    old one, rename). The first drops the triggers defined on or referring
+    to the tables, which would be lost or break the rename, and the second
+    re-creates them.
+    """
+    saved = []
+
+    def save(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'trigger'")
+            triggers = cursor.fetchall()
+
+        mentions = re.compile('|'.join(rf'\b{re.escape(table)}\b' for table in tables))
+        for name, table, sql in triggers:
+            if table in tables or mentions.search(sql):
+                saved.append(sql)
+                schema_editor.execute(f'DROP TRIGGER {schema_editor.quote_name(name)}')
+
+    def restore(apps, schema_editor):
+        for sql in saved:
+            # No params: a % in the trigger is not a placeholder.
+            schema_editor.execute(sql, None)
+        saved.clear()
+
+    return (
+        migrations.RunPython(save, restore),
+        migrations.RunPython(restore, save),
+    )
@@ -0,0 +1,231 @@
+import base64
+import binascii
+import heapq
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from drf_yasg import openapi
+
+from .models import Tombstone
+
+CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 5000
+
+# Kinds of change, the second key of the sync order: at the same instant
+# rows come before deletions.
+ROW, DELETION = 0, 1
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(ValueError):
+    pass
+
+
+changes_parameters = [
+    openapi.Parameter(
+        name='since',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        description='Opaque next_token of the previous call; leave out to start from the beginning',
+        required=False
+    ),
+    openapi.Parameter(
+        name='limit',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_INTEGER,
+        description=f'Maximum number of changes (1 to {MAX_CHANGES_LIMIT}, default {CHANGES_LIMIT})',
+        required=False
+    ),
+]
+
+
+def changes_response(item_schema):
+    return {
+        200: openapi.Response(
+            description="Rows written and ids deleted since the token, oldest first",
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'success': openapi.Schema(
+                        type=openapi.TYPE_BOOLEAN,
+                        description='True if request is successful'
+                    ),
+                    'results': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=item_schema,
+                        description='Current state of the rows created or updated'
+                    ),
+                    'deleted': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                        description='Ids of the deleted rows, to apply before results'
+                    ),
+                    'next_token': openapi.Schema(
+                        type=openapi.TYPE_STRING,
+                        description='Token for the next call'
+                    ),
+                    'has_more': openapi.Schema(
+                        type=openapi.TYPE_BOOLEAN,
+                        description='True if more changes are ready, call again right away'
+                    ),
+                }
+            )
+        ),
+        400: 'Invalid token or limit',
+        410: 'Token older than the kept deletions, download the full list again',
+    }
+
+
+def changes_limit(params):
+    """Number of changes asked with ``limit``; raises ValueError when invalid."""
+    try:
+        limit = int(params.get('limit') or CHANGES_LIMIT)
+    except ValueError:
+        limit = 0
+
+    if not 1 <= limit <= MAX_CHANGES_LIMIT:
+        raise ValueError(f'Invalid limit, expected 1 to {MAX_CHANGES_LIMIT}')
+    return limit
+
+
+def encode_token(position):
+    moment, kind, pk = position
+    # isoformat keeps the microseconds, which DjangoJSONEncoder would cut.
+    data = json.dumps([moment.isoformat(), kind, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_token(token):
+    """The ``(moment, kind, pk)`` position in ``token``, or None when empty."""
+    if not token:
+        return None
+
+    try:
+        moment, kind, pk = json.loads(base64.urlsafe_b64decode(token.encode()))
+        moment = parse_datetime(moment)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidToken(token)
+
+    if moment is None or timezone.is_naive(moment) or kind not in (ROW, DELETION) or not isinstance(pk, int):
+        raise InvalidToken(token)
+
+    return moment, kind, pk
+
+
+def after(field, kind, position):
+    """Changes of ``kind`` stored in ``field`` strictly after ``position``."""
+    if position is None:
+        return Q()
+
+    moment, position_kind, pk = position
+    if kind < position_kind:
+        return Q(**{f'{field}__gt': moment})
+    if kind > position_kind:
+        return Q(**{f'{field}__gte': moment})
+    return Q(**{f'{field}__gte': moment}) & (Q(**{f'{field}__gt': moment}) | Q(pk__gt=pk))
+
+
+def read_changes(queryset, serializer, params):
+    """
+    Response data with the rows of ``queryset`` written and the ids deleted
+    after the ``since`` token, at most ``limit`` of them, oldest first.
+
+    Changes are ordered by ``(updated_at or deleted_at, kind, id)`` and the
+    token is the position of the last one returned, so each call reads a
+    range of the ``(updated_at, id)`` and tombstone indexes and costs
+    O(changes), not O(table). Timestamps are taken before commit, so the
+    last SYNC_SETTLE_SECONDS are left for the next call: a slow transaction
+    committing behind the token would otherwise be skipped for good. For
+    the same reason the result depends on the clock and not only on the
+    table versions, so it is neither cached nor conditional. A call without
+    changes moves the token up to the horizon, so that a client polling an
+    idle table does not see its token expire.
+
+    Raises InvalidToken, ExpiredToken, or ValueError for a bad ``limit``.
+    """
+    limit = changes_limit(params)
+    position = decode_token(params.get('since'))
+    table = queryset.model._meta.db_table
+
+    now = timezone.now()
+    kept = getattr(settings, 'SYNC_TOMBSTONE_DAYS', None)
+    if position is not None and kept is not None and position[0] < now - timedelta(days=kept):
+        raise ExpiredToken(params.get('since'))
+
+    horizon = now - timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 10))
+
+    rows = serializer.values(
+        queryset.filter(after('updated_at', ROW, position), updated_at__lte=horizon).order_by('updated_at', 'id'),
+        'updated_at', 'id',
+    )[:limit + 1]
+    deletions = Tombstone.objects.using(queryset.db).filter(
+        after('deleted_at', DELETION, position), table=table, deleted_at__lte=horizon,
+    ).order_by('deleted_at', 'id').values_list('deleted_at', 'id', 'object_id')[:limit + 1]
+
+    changes = heapq.merge(
+        ((row['updated_at'], ROW, row['id'], row) for row in rows),
+        ((deleted_at, DELETION, pk, object_id) for deleted_at, pk, object_id in deletions),
+        key=lambda change: change[:3],
+    )
+    changes = [change for change, _ in zip(changes, range(limit + 1))]
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    if changes:
+        position = changes[-1][:3]
+    elif position is None or position[0] < horizon:
+        # Everything up to the horizon is read: only rows written after it
+        # and deletions from it on are left.
+        position = (horizon, DELETION, 0)
+
+    return {
+        "success": True,
+        "results": serializer.to_representation([change[3] for change in changes if change[1] == ROW]),
+        "deleted": [change[3] for change in changes if change[1] == DELETION],
+        "next_token": encode_token(position),
+        "has_more": has_more,
+    }
+
+
+def record_deletions(queryset):
+    """
+    Store a tombstone for every row of ``queryset`` with one INSERT ...
+    SELECT; for deletes that skip the model signals, before running them.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    sql, params = queryset.order_by().values('pk').query.get_compiler(queryset.db).as_sql()
+    columns = ', '.join(quote(Tombstone._meta.get_field(name).column) for name in ('table', 'object_id', 'deleted_at'))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(Tombstone._meta.db_table)} ({columns}) '
+            f'SELECT %s, deleted.{quote(model._meta.pk.column)}, %s FROM ({sql}) deleted',
+            [model._meta.db_table, connection.ops.adapt_datetimefield_value(timezone.now()), *params],
+        )
+
+
+def track_deletions(model):
+    """Store a tombstone for every deleted ``model`` instance."""
+    table = model._meta.db_table
+
+    def deleted(sender, instance, **kwargs):
+        Tombstone.objects.create(table=table, object_id=instance.pk, deleted_at=timezone.now())
+
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=f'tombstone:{table}')
+
+
+def prune_tombstones(days):
+    """Delete the tombstones older than ``days``; returns how many."""
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
@@ -0,0 +1,313 @@
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from control.models import Control
+from driver.models import Driver
+from vehicle.models import Vehicle
+from .renderers import FastJSONRenderer, msgpack
+
+
+class RenderersTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        driver = Driver.objects.create(name='Matheus', phone='14 99655-5555', license_number='ABC123')
+        vehicle = Vehicle.objects.create(plate='ABC-1234', model='Fusca', brand='Volkswagen', oil_change_km=1000)
+        Control.objects.create(
+            vehicle=vehicle, driver=driver, departure_date='2023-08-11', departure_time='10:00',
+            departure_km=100, destination='São Paulo', return_date='2023-08-11', return_time='12:00', return_km=250,
+        )
+
+    def test_fast_json_matches_stock_renderer(self):
+        data = {
+            'date': date(2023, 8, 11), 'time': time(10, 0, 30, 1500),
+            'datetime': datetime(2023, 8, 11, 10, 0, tzinfo=timezone.utc), 'naive': datetime(2023, 8, 11, 10, 0),
+            'decimal': Decimal('10.50'), 'keys': {1: 'São Paulo', 2: None}, 'separator': 'a\u2028b\u2029c',
+            'float': 0.1, 'big': 2 ** 70, 'nested': [{'id': 1, 'ok': True}],
+        }
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_endpoints_render_with_fast_json(self):
+        for path in ['/api/control', '/api/control?format=normalized', '/api/vehicle/all']:
+            response = self.client.get(path)
+            self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_indent_falls_back_to_stock_renderer(self):
+        response = self.client.get('/api/control', HTTP_ACCEPT='application/json; indent=2')
+        self.assertEqual(response.content, JSONRenderer().render(response.data, 'application/json; indent=2'))
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_message_pack(self):
+        response = self.client.get('/api/control', HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content, strict_map_key=False),
+                         json.loads(JSONRenderer().render(response.data)))
+
+    @skipUnless(msgpack is None, 'msgpack is installed')
+    def test_message_pack_is_not_offered_without_msgpack(self):
+        self.assertEqual(self.client.get('/api/control', HTTP_ACCEPT='application/msgpack').status_code, 406)
+
+
+class SchemaTestCase(TestCase):
+
+    def test_schema_is_generated_once(self):
+        from core import schema
+
+        first = self.client.get('/swagger/', HTTP_ACCEPT='application/json')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(schema.pending_schemas, [])
+
+        spec = json.loads(first.content)
+        self.assertEqual(spec['paths']['/control']['get']['description'], 'Fetch all controls')
+        self.assertIn('cursor', [parameter['name'] for parameter in spec['paths']['/control']['get']['parameters']])
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/swagger/', HTTP_ACCEPT='application/json')
+        self.assertEqual(second.content, first.content)
+
+        self.assertEqual(self.client.get('/swagger/').status_code, 200)
+
+    @override_settings(ALLOWED_HOSTS=['api.example.com', 'other.example.com'])
+    def test_schema_does_not_depend_on_host(self):
+        first = self.client.get('/swagger/', HTTP_ACCEPT='application/json', HTTP_HOST='api.example.com')
+        second = self.client.get('/swagger/', HTTP_ACCEPT='application/json', HTTP_HOST='other.example.com')
+
+        self.assertEqual(second.content, first.content)
+        self.assertNotIn('host', json.loads(first.content))
+
+
+class SQLiteConfigurationTestCase(TestCase):
+
+    def test_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+    def test_read_only_connection(self):
+        import sqlite3
+        from pathlib import Path
+        from django.db import OperationalError
+        from django.db.utils import ConnectionHandler
+
+        directory = tempfile.mkdtemp()
+        path = Path(directory) / 'read.sqlite3'
+        with sqlite3.connect(path) as database:
+            database.execute('CREATE TABLE item (id integer)')
+
+        # A handler of its own, outside the test databases.
+        read = ConnectionHandler({
+            'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path.as_uri() + '?mode=ro'},
+        })['default']
+        try:
+            # journal_mode is left to the writers, the other pragmas apply.
+            with read.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'delete')
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], 5000)
+                with self.assertRaises(OperationalError):
+                    cursor.execute('INSERT INTO item VALUES (1)')
+        finally:
+            read.close()
+            os.remove(path)
+            os.rmdir(directory)
+
+    def test_preserve_triggers(self):
+        from core.sqlite import preserve_triggers
+
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id integer, name text)')
+            cursor.execute('CREATE TABLE item_log (id integer)')
+            cursor.execute('CREATE TABLE other (id integer)')
+            cursor.execute('CREATE TRIGGER item_insert AFTER INSERT ON item BEGIN INSERT INTO item_log VALUES (new.id); END')
+            cursor.execute('CREATE TRIGGER other_insert AFTER INSERT ON other BEGIN DELETE FROM item WHERE id = new.id; END')
+            cursor.execute('CREATE TRIGGER other_delete AFTER DELETE ON other BEGIN SELECT 1; END')
+
+        def triggers():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('item', 'other') "
+                    "ORDER BY name"
+                )
+                return [name for name, in cursor.fetchall()]
+
+        save, restore = preserve_triggers('item')
+        editor = connection.schema_editor()
+
+        # Triggers on the table and those referring to it are dropped...
+        save.code(None, editor)
+        self.assertEqual(triggers(), ['other_delete'])
+        with connection.cursor() as cursor:
+            cursor.execute('ALTER TABLE item RENAME TO old_item')
+            cursor.execute('CREATE TABLE item (id integer, name text, stamp text)')
+            cursor.execute('DROP TABLE old_item')
+
+        # ...and re-created on the rebuilt table.
+        restore.code(None, editor)
+        self.assertEqual(triggers(), ['item_insert', 'other_delete', 'other_insert'])
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO item (id) VALUES (7)')
+            cursor.execute('SELECT id FROM item_log')
+            self.assertEqual(cursor.fetchall(), [(7,)])
+
+
+class ReplicaRoutingTestCase(TestCase):
+    databases = {'default', 'read'}
+
+    def setUp(self):
+        from unittest import mock
+        from core.routers import ReadWriteRouter, replica_reads
+
+        self.router = ReadWriteRouter()
+
+        # Tests run inside a transaction, where reads always stay on default.
+        patcher = mock.patch.object(connection, 'in_atomic_block', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        token = replica_reads.set(True)
+        self.addCleanup(replica_reads.reset, token)
+
+    def test_writes_and_migrations_use_default(self):
+        self.assertEqual(self.router.db_for_write(Control), 'default')
+        self.assertFalse(self.router.allow_migrate('read', 'control'))
+        self.assertTrue(self.router.allow_migrate('default', 'control'))
+
+    def test_reads(self):
+        from core.routers import replica_reads
+
+        self.assertEqual(self.router.db_for_read(Control), 'read')
+
+        with override_settings(READ_DATABASES={}):
+            self.assertEqual(self.router.db_for_read(Control), 'default')
+
+        replica_reads.set(False)
+        self.assertEqual(self.router.db_for_read(Control), 'default')
+
+    def test_reads_in_transaction_use_default(self):
+        connection.in_atomic_block = True
+        self.assertEqual(self.router.db_for_read(Control), 'default')
+
+    @override_settings(READ_DATABASES={'default': 1, 'read': 3})
+    def test_weighted_round_robin(self):
+        aliases = [self.router.db_for_read(Control) for _ in range(8)]
+        self.assertEqual(aliases, ['default', 'read', 'read', 'read'] * 2)
+
+    def test_unavailable_replica_falls_back_to_default(self):
+        from unittest import mock
+        from django.db import OperationalError, connections
+
+        read = connections['read']
+        with mock.patch.object(read, 'ensure_connection', side_effect=OperationalError) as ensure_connection:
+            self.assertEqual(self.router.db_for_read(Control), 'default')
+            # Skipped without retrying until REPLICA_RETRY_SECONDS pass.
+            self.assertEqual(self.router.db_for_read(Control), 'default')
+            self.assertEqual(ensure_connection.call_count, 1)
+
+        # Long after the retry delay.
+        with mock.patch('core.routers.time.monotonic', return_value=float('inf')):
+            self.assertEqual(self.router.db_for_read(Control), 'read')
+
+
+class ReplicaMiddlewareTestCase(TestCase):
+
+    def get_response(self, status=200, streaming=False):
+        from django.http import HttpResponse, StreamingHttpResponse
+        from core.routers import replica_reads
+
+        def get_response(request):
+            self.seen = replica_reads.get()
+            if streaming:
+                return StreamingHttpResponse(str(replica_reads.get()) for _ in range(1))
+            return HttpResponse(status=status)
+
+        return get_response
+
+    def call(self, method, status=200, cookies=None, streaming=False):
+        from django.test import RequestFactory
+        from core.middleware import ReplicaMiddleware
+
+        factory = RequestFactory()
+        if cookies:
+            factory.cookies.load(cookies)
+        request = factory.generic(method, '/api/control')
+        return ReplicaMiddleware(self.get_response(status, streaming))(request)
+
+    def test_safe_methods_read_from_replicas(self):
+        from core.middleware import PIN_COOKIE
+
+        response = self.call('GET')
+        self.assertTrue(self.seen)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        self.call('POST')
+        self.assertFalse(self.seen)
+
+    def test_writes_pin_the_client_to_default(self):
+        from core.middleware import PIN_COOKIE
+
+        response = self.call('POST', status=201)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        self.call('GET', cookies={PIN_COOKIE: '1'})
+        self.assertFalse(self.seen)
+
+        self.assertNotIn(PIN_COOKIE, self.call('PUT', status=400).cookies)
+
+    def test_streamed_content_reads_from_replicas(self):
+        response = self.call('GET', streaming=True)
+        self.assertEqual(b''.join(response.streaming_content), b'True')
+
+
+class ReplicaSyncTestCase(TestCase):
+
+    def test_database_path(self):
+        from core.sqlite import database_path
+
+        self.assertEqual(database_path({'NAME': '/srv/db.sqlite3'}), '/srv/db.sqlite3')
+        self.assertEqual(database_path({'NAME': 'file:///srv/my%20db.sqlite3?mode=ro'}), '/srv/my db.sqlite3')
+
+    def test_copy_database(self):
+        import sqlite3
+        from contextlib import closing
+        from core.sqlite import copy_database
+
+        directory = tempfile.mkdtemp()
+        source = os.path.join(directory, 'db.sqlite3')
+        replica = os.path.join(directory, 'replica.sqlite3')
+
+        with closing(sqlite3.connect(source)) as database:
+            database.execute('CREATE TABLE item (id integer)')
+            database.execute('INSERT INTO item VALUES (1)')
+            database.commit()
+        copy_database(source, replica)
+
+        with closing(sqlite3.connect(f'file:{replica}?mode=ro', uri=True)) as reader:
+            self.assertEqual(reader.execute('SELECT id FROM item').fetchall(), [(1,)])
+
+            # Connections already open on the replica see the next copy.
+            with closing(sqlite3.connect(source)) as database:
+                database.execute('INSERT INTO item VALUES (2)')
+                database.commit()
+            copy_database(source, replica)
+            self.assertEqual(reader.execute('SELECT id FROM item').fetchall(), [(1,), (2,)])
+
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
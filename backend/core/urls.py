@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import CacheStats
+
+urlpatterns = [
+    path('cache/stats', CacheStats.as_view(), name='cache_stats'),
+]
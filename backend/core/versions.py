@@ -0,0 +1,48 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import TableVersion
+from .signals import bulk_changed
+
+
+def bump(table):
+    """Record a write to ``table``: one UPDATE on a single-row key."""
+    now = timezone.now()
+
+    updated = TableVersion.objects.filter(table=table).update(version=F('version') + 1, updated_at=now)
+    if not updated:
+        TableVersion.objects.get_or_create(table=table, defaults={'version': 1, 'updated_at': now})
+
+
+def versions(tables):
+    """Return ``{table: (version, updated_at)}``, with ``(0, None)`` for untouched tables."""
+    found = {
+        row.table: (row.version, row.updated_at)
+        for row in TableVersion.objects.filter(table__in=tables)
+    }
+    return {table: found.get(table, (0, None)) for table in tables}
+
+
+def version_token(state):
+    """
+    Compact representation of ``versions()``. The write time is included so
+    tokens never repeat, even if the counters start over after a reset.
+    """
+    return ';'.join(
+        f'{table}:{version}:{updated_at.timestamp() if updated_at else 0}'
+        for table, (version, updated_at) in sorted(state.items())
+    )
+
+
+def track(model):
+    """Bump the version of ``model``'s table on every save, delete and bulk write."""
+    table = model._meta.db_table
+
+    def changed(sender, raw=False, **kwargs):
+        if not raw:
+            bump(table)
+
+    post_save.connect(changed, sender=model, weak=False, dispatch_uid=f'version:{table}:save')
+    post_delete.connect(changed, sender=model, weak=False, dispatch_uid=f'version:{table}:delete')
+    bulk_changed.connect(changed, sender=model, weak=False, dispatch_uid=f'version:{table}:bulk')
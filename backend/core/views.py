@@ -0,0 +1,48 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_yasg import openapi
+
+from .cache import cache_stats, reset_cache_stats, response_cache
+from .schema import lazy_swagger_auto_schema
+
+
+class CacheStats(APIView):
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description="Hit and miss counters of the response cache, per view",
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'success': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Success'),
+                    'enabled': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Whether the cache is configured'),
+                    'views': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        additional_properties=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'hits': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'misses': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'hit_ratio': openapi.Schema(type=openapi.TYPE_NUMBER),
+                            }
+                        )
+                    ),
+                },
+            ),
+        }
+    ))
+    def get(self, request):
+        return Response({
+            "success": True,
+            "enabled": response_cache() is not None,
+            "views": cache_stats(),
+        }, status=200)
+
+    @lazy_swagger_auto_schema(lambda: dict(operation_description="Reset the response cache counters"))
+    def delete(self, request):
+        reset_cache_stats()
+
+        return Response({
+            "success": True,
+            "message": "Cache counters reset",
+        }, status=200)
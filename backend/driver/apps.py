@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class DriverConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'driver'
+
+    def ready(self):
+        from core.sync import track_deletions
+        from core.versions import track
+        from .models import Driver
+
+        track(Driver)
+        track_deletions(Driver)
@@ -0,0 +1,22 @@
+from core.search import match_query, uses_index
+
+
+def filter_drivers(drivers, params):
+    search_query = params.get('search', None)
+
+    if search_query:
+        query = match_query(search_query)
+
+        if query and uses_index(drivers):
+            # Words prefixing the name, phone or license number, best first.
+            return drivers.filter(search__document__match=query).order_by('search__rank', 'id')
+
+        drivers = drivers.filter(
+            name__icontains=search_query
+        ) | drivers.filter(
+            phone__icontains=search_query
+        ) | drivers.filter(
+            license_number__icontains=search_query
+        )
+
+    return drivers
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-18 13:31
+
+import core.search
+from core.search import create_external_index_sql, drop_index_sql, run_if_fts5
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverSearch',
+            fields=[
+                ('driver', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='driver.driver')),
+                ('document', core.search.SearchField(db_column='driver_search')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'driver_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(
+            run_if_fts5(create_external_index_sql('driver_search', 'driver', ['name', 'phone', 'license_number'])),
+            run_if_fts5(drop_index_sql('driver_search', ['driver_search_insert', 'driver_search_delete', 'driver_search_update'])),
+        ),
+    ]
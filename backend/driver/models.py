@@ -1,10 +1,33 @@
 from django.db import models
 
+from core.search import SearchField
+
 
 class Driver(models.Model):
     name = models.CharField(max_length=200)
     phone = models.CharField(max_length=16)
     license_number = models.CharField(max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'driver'
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='driver_updated_idx'),
+        ]
+
+
+class DriverSearch(models.Model):
+    """
+    FTS5 index of the driver name, phone and license number, kept in sync by
+    triggers on the driver table. Created on SQLite only (migration 0002).
+    """
+    driver = models.OneToOneField(
+        Driver, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search',
+    )
+    document = SearchField(db_column='driver_search')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'driver_search'
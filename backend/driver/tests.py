@@ -1,6 +1,15 @@
-from django.test import TestCase
+import warnings
+
+from django.core.paginator import UnorderedObjectListWarning
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
+from control.models import Control
+from vehicle.models import Vehicle
+from .models import Driver
+from .serializers import DriverSerializer
+
 
 class DriverTestCase(TestCase):
     def setUp(self):
@@ -49,3 +58,209 @@ class DriverTestCase(TestCase):
         response = self.client.delete('/api/driver/999/delete', format='json')
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.data['error'], 'Driver not found')
+
+    def test_fetch_drivers_with_cursor_pagination(self):
+        for index in range(3):
+            self.client.post('/api/driver/create', {**self.data, 'license_number': f'ABC{index}'}, format='json')
+
+        first = self.client.get('/api/driver?pagination=cursor&page_size=2')
+        second = self.client.get(f'/api/driver?cursor={first.data["next_cursor"]}&page_size=2')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([driver['license_number'] for driver in first.data['results']], ['ABC0', 'ABC1'])
+        self.assertEqual([driver['license_number'] for driver in second.data['results']], ['ABC2'])
+        self.assertIsNone(second.data['next_cursor'])
+        self.assertIsNotNone(second.data['previous_cursor'])
+
+    def test_fetch_drivers_in_id_order(self):
+        for index in range(3):
+            self.client.post('/api/driver/create', {**self.data, 'license_number': f'ABC{index}'}, format='json')
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            pages = [
+                self.client.get(f'{path}?page=2&page_size=2')
+                for path in ('/api/driver', '/api/async/driver')
+            ]
+
+        for page in pages:
+            self.assertEqual(page.status_code, 200)
+            self.assertEqual([driver['license_number'] for driver in page.json()['results']], ['ABC2'])
+
+    def test_bulk_update_drivers(self):
+        for index in range(3):
+            self.client.post('/api/driver/create', {**self.data, 'license_number': f'ABC{index}'}, format='json')
+
+        response = self.client.patch(
+            '/api/driver/bulk',
+            {"filters": {"search": "ABC"}, "data": {"phone": "14 99999-0000"}},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(Driver.objects.filter(phone='14 99999-0000').count(), 3)
+
+    def test_bulk_update_drivers_with_invalid_data(self):
+        response = self.client.patch('/api/driver/bulk', {"ids": [1], "data": {"name": ""}}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid name')
+
+    def test_bulk_delete_drivers_with_controls(self):
+        created = [
+            self.client.post('/api/driver/create', {**self.data, 'license_number': f'ABC{index}'}, format='json')
+            for index in range(3)
+        ]
+        ids = [response.data['driver']['id'] for response in created]
+        vehicle = Vehicle.objects.create(plate='ABC-1234', model='Fusca', brand='Volkswagen', oil_change_km=1000)
+        for driver_id in ids:
+            Control.objects.create(
+                vehicle=vehicle, driver_id=driver_id, departure_date='2023-08-11', departure_time='10:30',
+                departure_km=0, destination='São Paulo', return_km=10,
+            )
+
+        response = self.client.delete('/api/driver/bulk', {"ids": ids[:2]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(list(Driver.objects.values_list('id', flat=True)), ids[2:])
+        self.assertEqual(Control.objects.count(), 1)
+        vehicle.refresh_from_db()
+        self.assertEqual(vehicle.mileage.total_km, 10)
+
+    def test_conditional_get(self):
+        created = self.client.post('/api/driver/create', self.data, format='json')
+
+        etags = {}
+        for url in ['/api/driver', '/api/driver/all']:
+            etags[url] = self.client.get(url)['ETag']
+
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 304)
+
+        self.client.put(f'/api/driver/{created.data["driver"]["id"]}/update', {'name': 'João'}, format='json')
+
+        response = self.client.get('/api/driver/all', HTTP_IF_NONE_MATCH=etags['/api/driver/all'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['name'], 'João')
+
+    def test_list_cache_follows_bulk_updates(self):
+        created = self.client.post('/api/driver/create', self.data, format='json')
+        self.client.get('/api/driver')
+
+        with self.assertNumQueries(1):
+            self.client.get('/api/driver')
+
+        self.client.patch(
+            '/api/driver/bulk', {"ids": [created.data['driver']['id']], "data": {"name": 'João'}}, format='json'
+        )
+        self.assertEqual(self.client.get('/api/driver').data['results'][0]['name'], 'João')
+
+    def test_list_output_matches_model_serializer(self):
+        Driver.objects.create(name='Matheus', phone='14 99655-5555', license_number='ABC123')
+        self.client.post('/api/driver/create', self.data, format='json')
+        expected = JSONRenderer().render(DriverSerializer(Driver.objects.order_by('id'), many=True).data)
+
+        response = self.client.get('/api/driver/all')
+        self.assertEqual(JSONRenderer().render(response.data['results']), expected)
+
+        response = self.client.get('/api/driver?page_size=10')
+        self.assertEqual(JSONRenderer().render(response.data['results']), expected)
+
+    def test_sparse_fields(self):
+        record = Driver.objects.create(name='Matheus', phone='14 99655-5555', license_number='ABC123')
+
+        response = self.client.get('/api/driver?fields=id,name')
+        self.assertEqual(response.data['results'], [{'id': record.id, 'name': 'Matheus'}])
+
+        response = self.client.get('/api/driver/all?fields=name')
+        self.assertEqual(response.data['results'], [{'name': 'Matheus'}])
+
+        response = self.client.get('/api/driver?pagination=cursor&fields=name')
+        self.assertEqual(response.data['results'], [{'name': 'Matheus'}])
+
+        self.assertEqual(self.client.get('/api/driver?fields=unknown').status_code, 400)
+        self.assertEqual(self.client.get('/api/driver/all?expand=vehicle').status_code, 400)
+
+    # Set-based writes below skip the version bump the response cache keys on.
+    @override_settings(RESPONSE_CACHE_ALIAS=None)
+    def test_search(self):
+        matheus = Driver.objects.create(name='Matheus Silva', phone='14 99655-5555', license_number='ABC123')
+        mateus = Driver.objects.create(name='Mateus', phone='11 98888-1234', license_number='XYZ789')
+        joao = Driver.objects.create(name='João Souza', phone='14 97777-0000', license_number='DEF456')
+
+        def search(query):
+            response = self.client.get(f'/api/driver?search={query}')
+            self.assertEqual(response.status_code, 200)
+            return [driver['id'] for driver in response.data['results']]
+
+        self.assertEqual(set(search('mat')), {matheus.id, mateus.id})
+        self.assertEqual(search('silva mat'), [matheus.id])
+        self.assertEqual(search('joao'), [joao.id])
+        self.assertEqual(search('98888'), [mateus.id])
+        self.assertEqual(search('xyz'), [mateus.id])
+        self.assertEqual(search('"OR'), [])
+
+        # The index follows updates and deletes, including set-based ones.
+        Driver.objects.filter(id=joao.id).update(name='Joana Souza')
+        self.assertEqual(search('joao'), [])
+        self.assertEqual(search('joana'), [joao.id])
+        Driver.objects.filter(id=mateus.id).delete()
+        self.assertEqual(search('mat'), [matheus.id])
+
+        with override_settings(FULL_TEXT_SEARCH=False):
+            self.assertEqual(search('ilva'), [matheus.id])
+
+    def test_suggest(self):
+        matheus = Driver.objects.create(name='Matheus Silva', phone='14 99655-5555', license_number='ABC123')
+        mateus = Driver.objects.create(name='Mateus', phone='11 98888-1234', license_number='XYZ789')
+        Driver.objects.create(name='João Souza', phone='14 97777-0000', license_number='DEF456')
+
+        response = self.client.get('/api/driver/suggest?q=mat sil')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [{'id': matheus.id, 'label': 'Matheus Silva - ABC123'}])
+
+        response = self.client.get('/api/driver/suggest?q=ma&limit=1')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIn(response.data['results'][0]['id'], {matheus.id, mateus.id})
+
+        response = self.client.get('/api/driver/suggest?limit=2')
+        self.assertEqual([driver['id'] for driver in response.data['results']], [matheus.id, mateus.id])
+
+        # Repeated queries are answered from the response cache.
+        with self.assertNumQueries(1):
+            self.client.get('/api/driver/suggest?q=mat sil')
+
+        with override_settings(FULL_TEXT_SEARCH=False, RESPONSE_CACHE_ALIAS=None):
+            response = self.client.get('/api/driver/suggest?q=ilva')
+            self.assertEqual(response.data['results'], [{'id': matheus.id, 'label': 'Matheus Silva - ABC123'}])
+
+        for limit in ['0', '51', 'ten']:
+            response = self.client.get(f'/api/driver/suggest?q=mat&limit={limit}')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['error'], 'Invalid limit, expected 1 to 50')
+
+    @override_settings(SYNC_SETTLE_SECONDS=0)
+    def test_changes(self):
+        created = [
+            self.client.post('/api/driver/create', {**self.data, 'license_number': f'ABC{index}'}, format='json')
+            for index in range(3)
+        ]
+        ids = [response.data['driver']['id'] for response in created]
+
+        response = self.client.get('/api/driver/changes?fields=id,license_number')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'id': driver_id, 'license_number': f'ABC{index}'} for index, driver_id in enumerate(ids)
+        ])
+        token = response.data['next_token']
+
+        self.client.patch('/api/driver/bulk', {"ids": [ids[0]], "data": {"name": "Mateus"}}, format='json')
+        self.client.delete('/api/driver/bulk', {"ids": [ids[1]]}, format='json')
+
+        response = self.client.get('/api/driver/changes', {'since': token})
+        self.assertEqual([(row['id'], row['name']) for row in response.data['results']], [(ids[0], 'Mateus')])
+        self.assertEqual(response.data['deleted'], [ids[1]])
+        self.assertFalse(response.data['has_more'])
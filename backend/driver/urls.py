@@ -1,11 +1,17 @@
 from django.urls import path
 
-from .views import FetchData, CreateDriver, UpdateDriver, DeleteDriver, FetchAllDrivers
+from .views import FetchData, CreateDriver, UpdateDriver, DeleteDriver, FetchAllDrivers, BulkDriver
+from .views import SuggestDrivers, DriverChanges
+from .views import AsyncFetchData
 
 urlpatterns = [
     path('driver', FetchData.as_view(), name='fetch_data'),
     path('driver/create', CreateDriver.as_view(), name='create_driver'),
+    path('driver/bulk', BulkDriver.as_view(), name='bulk_driver'),
     path('driver/<int:driver_id>/update', UpdateDriver.as_view(), name='update_driver'),
     path('driver/<int:driver_id>/delete', DeleteDriver.as_view(), name='delete_driver'),
     path('driver/all', FetchAllDrivers.as_view(), name='fetch_all_drivers'),
+    path('driver/suggest', SuggestDrivers.as_view(), name='suggest_drivers'),
+    path('driver/changes', DriverChanges.as_view(), name='driver_changes'),
+    path('async/driver', AsyncFetchData.as_view(), name='async_fetch_data'),
 ]
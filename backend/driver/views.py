@@ -1,19 +1,36 @@
+from django.core.paginator import InvalidPage
+from django.db import transaction
+from django.utils import timezone
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import filters
-from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from .models import Driver
+from control.bulk import delete_controls
+from control.models import Control
+from core.bulk import BulkError, select_targets, clean_update, bulk_request_body, bulk_response
+from core.async_views import AsyncReadView, error, invalid_page, page_data, paginate, render
+from core.cache import cached_response
+from core.conditional import conditional_on
+from core.schema import lazy_swagger_auto_schema
+from core.search import MAX_SUGGEST_LIMIT, SUGGEST_LIMIT, suggest, suggest_limit
+from core.pagination import KeysetPagination, InvalidCursor, cursor_parameters, wants_cursor_pagination
+from core.serializers import ValuesSerializer, InvalidFields, fields_parameter
+from core.signals import bulk_changed
+from core.sync import ExpiredToken, InvalidToken, changes_parameters, changes_response, read_changes
+
+from .filters import filter_drivers
+from .models import Driver, DriverSearch
 from .serializers import DriverSerializer
 
 
 class FetchData(APIView):
+    list_serializer = ValuesSerializer(DriverSerializer)
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'phone', 'license_number']
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Get list of drivers",
         manual_parameters=[
             openapi.Parameter(
@@ -30,6 +47,8 @@ class FetchData(APIView):
                 description='Number of items per page',
                 required=False
             ),
+            *cursor_parameters,
+            fields_parameter,
         ],
         responses={
             200: openapi.Response(
@@ -74,6 +93,16 @@ class FetchData(APIView):
                                         type=openapi.TYPE_STRING,
                                         description='Driver license number'
                                     ),
+                                    'created_at': openapi.Schema(
+                                        type=openapi.TYPE_STRING,
+                                        format=openapi.FORMAT_DATETIME,
+                                        description='Creation time'
+                                    ),
+                                    'updated_at': openapi.Schema(
+                                        type=openapi.TYPE_STRING,
+                                        format=openapi.FORMAT_DATETIME,
+                                        description='Last write time'
+                                    ),
                                 }
                             )
                         )
@@ -81,38 +110,48 @@ class FetchData(APIView):
                 )
             )
         }
-    )
+    ))
+    @conditional_on(Driver)
+    @cached_response(Driver, defaults={'page': '1', 'page_size': '10'})
     def get(self, request):
         paginator = PageNumberPagination()
         drivers = Driver.objects.all()
 
         paginator.page_size = request.GET.get('page_size', 10)
-        search_query = request.GET.get('search', None)
-
-        if search_query:
-            drivers = drivers.filter(
-                name__icontains=search_query
-            ) | drivers.filter(
-                phone__icontains=search_query
-            ) | drivers.filter(
-                license_number__icontains=search_query
-            )
+        drivers = filter_drivers(drivers, request.GET)
+
+        try:
+            serializer = self.list_serializer.select(request.GET)
+        except InvalidFields as error:
+            return Response({"error": str(error)}, status=400)
 
-        result_page = paginator.paginate_queryset(drivers, request)
-        serializer = DriverSerializer(result_page, many=True)
+        if wants_cursor_pagination(request):
+            paginator = KeysetPagination(ordering=['id'])
+            try:
+                result_page = paginator.paginate_queryset(serializer.values(drivers, *paginator.columns), request)
+            except InvalidCursor:
+                return Response({"error": "Invalid cursor"}, status=400)
+
+            return paginator.get_paginated_response(serializer.to_representation(result_page))
+
+        if not drivers.ordered:
+            # Search results keep their ranking; pages are stable either way.
+            drivers = drivers.order_by('id')
+
+        result_page = paginator.paginate_queryset(serializer.paged(drivers), request)
 
         return Response({
             "success": True,
             "total_items": paginator.page.paginator.count,
             "total_pages": paginator.page.paginator.num_pages,
             "current_page": paginator.page.number,
-            "results": serializer.data,
+            "results": serializer.to_representation(result_page),
         }, status=200)
 
 
 class CreateDriver(APIView):
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Create a new driver",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -156,6 +195,16 @@ class CreateDriver(APIView):
                                     type=openapi.TYPE_STRING,
                                     description='Driver license number'
                                 ),
+                                'created_at': openapi.Schema(
+                                    type=openapi.TYPE_STRING,
+                                    format=openapi.FORMAT_DATETIME,
+                                    description='Creation time'
+                                ),
+                                'updated_at': openapi.Schema(
+                                    type=openapi.TYPE_STRING,
+                                    format=openapi.FORMAT_DATETIME,
+                                    description='Last write time'
+                                ),
                             }
                         )
                     }
@@ -174,7 +223,7 @@ class CreateDriver(APIView):
                 )
             )
         }
-    )
+    ))
     def post(self, request):
         required_fields = ['name', 'phone', 'license_number']
 
@@ -193,7 +242,7 @@ class CreateDriver(APIView):
 
 class UpdateDriver(APIView):
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Update driver details",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -254,7 +303,7 @@ class UpdateDriver(APIView):
                 )
             )
         }
-    )
+    ))
     def put(self, request, driver_id):
         driver = Driver.objects.filter(id=driver_id).first()
 
@@ -274,7 +323,7 @@ class UpdateDriver(APIView):
 
 class DeleteDriver(APIView):
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Delete a driver",
         responses={
             200: openapi.Response(
@@ -306,7 +355,7 @@ class DeleteDriver(APIView):
                 )
             )
         }
-    )
+    ))
     def delete(self, request, driver_id):
         driver = Driver.objects.filter(id=driver_id).first()
 
@@ -322,9 +371,11 @@ class DeleteDriver(APIView):
 
 
 class FetchAllDrivers(APIView):
+    list_serializer = ValuesSerializer(DriverSerializer)
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Get list of all drivers",
+        manual_parameters=[fields_parameter],
         responses={
             200: openapi.Response(
                 description="List of drivers",
@@ -356,6 +407,16 @@ class FetchAllDrivers(APIView):
                                         type=openapi.TYPE_STRING,
                                         description='Driver license number'
                                     ),
+                                    'created_at': openapi.Schema(
+                                        type=openapi.TYPE_STRING,
+                                        format=openapi.FORMAT_DATETIME,
+                                        description='Creation time'
+                                    ),
+                                    'updated_at': openapi.Schema(
+                                        type=openapi.TYPE_STRING,
+                                        format=openapi.FORMAT_DATETIME,
+                                        description='Last write time'
+                                    ),
                                 }
                             )
                         )
@@ -363,12 +424,210 @@ class FetchAllDrivers(APIView):
                 )
             )
         }
-    )
+    ))
+    @conditional_on(Driver)
     def get(self, request):
-        drivers = Driver.objects.all()
-        serializer = DriverSerializer(drivers, many=True)
+        try:
+            serializer = self.list_serializer.select(request.GET)
+        except InvalidFields as error:
+            return Response({"error": str(error)}, status=400)
+
+        drivers = serializer.values(Driver.objects.all())
+
+        return Response({
+            "success": True,
+            "results": serializer.to_representation(drivers),
+        }, status=200)
+
+
+class SuggestDrivers(APIView):
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description="Suggest drivers for a typeahead selector",
+        manual_parameters=[
+            openapi.Parameter(
+                name='q',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description='Typed text, matched against the start of the words of the name, phone or license number',
+                required=False
+            ),
+            openapi.Parameter(
+                name='limit',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description=f'Number of suggestions (1 to {MAX_SUGGEST_LIMIT}, default {SUGGEST_LIMIT})',
+                required=False
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Best matching drivers",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'success': openapi.Schema(
+                            type=openapi.TYPE_BOOLEAN,
+                            description='True if request is successful'
+                        ),
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'id': openapi.Schema(
+                                        type=openapi.TYPE_INTEGER,
+                                        description='Driver ID'
+                                    ),
+                                    'label': openapi.Schema(
+                                        type=openapi.TYPE_STRING,
+                                        description='Text to display, e.g. "Matheus - ABC123"'
+                                    ),
+                                }
+                            )
+                        )
+                    }
+                )
+            ),
+            400: 'Invalid limit',
+        }
+    ))
+    @conditional_on(Driver)
+    @cached_response(Driver, defaults={'limit': str(SUGGEST_LIMIT)})
+    def get(self, request):
+        try:
+            limit = suggest_limit(request.GET)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=400)
+
+        drivers = suggest(
+            Driver.objects.values('id', 'name', 'license_number'), DriverSearch, request.GET.get('q', ''), limit,
+            fields=['name', 'phone', 'license_number'],
+        )
 
         return Response({
             "success": True,
-            "results": serializer.data,
+            "results": [{"id": row['id'], "label": f"{row['name']} - {row['license_number']}"} for row in drivers],
         }, status=200)
+
+
+class DriverChanges(APIView):
+    list_serializer = FetchData.list_serializer
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description=(
+            "Drivers created, updated or deleted since the token, oldest first. "
+            "Start without since, then pass the next_token of each response."
+        ),
+        manual_parameters=[*changes_parameters, fields_parameter],
+        responses=changes_response(openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'id': openapi.Schema(type=openapi.TYPE_INTEGER, description='Driver ID'),
+                'name': openapi.Schema(type=openapi.TYPE_STRING, description='Driver name'),
+                'phone': openapi.Schema(type=openapi.TYPE_STRING, description='Driver phone number'),
+                'license_number': openapi.Schema(type=openapi.TYPE_STRING, description='Driver license number'),
+                'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                             format=openapi.FORMAT_DATETIME, description='Creation time'),
+                'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                             format=openapi.FORMAT_DATETIME, description='Last write time'),
+            }
+        ))
+    ))
+    def get(self, request):
+        try:
+            serializer = self.list_serializer.select(request.GET)
+            data = read_changes(Driver.objects.all(), serializer, request.GET)
+        except ExpiredToken:
+            return Response({"error": "Token expired, download the full list again"}, status=410)
+        except InvalidToken:
+            return Response({"error": "Invalid since token"}, status=400)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=400)
+
+        return Response(data, status=200)
+
+
+class BulkDriver(APIView):
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description="Update every driver selected by ids or filters in a single statement",
+        request_body=bulk_request_body({
+            'name': openapi.Schema(type=openapi.TYPE_STRING, description='Driver name'),
+            'phone': openapi.Schema(type=openapi.TYPE_STRING, description='Driver phone number'),
+            'license_number': openapi.Schema(type=openapi.TYPE_STRING, description='Driver license number'),
+        }),
+        responses=bulk_response('updated')
+    ))
+    def patch(self, request):
+        try:
+            drivers = select_targets(Driver.objects.all(), request.data, filter_drivers)
+            values = clean_update(Driver, request.data.get("data"), ['name', 'phone', 'license_number'])
+        except BulkError as error:
+            return Response({"error": str(error)}, status=400)
+
+        with transaction.atomic():
+            updated = drivers.update(updated_at=timezone.now(), **values)
+            bulk_changed.send(sender=Driver)
+
+        return Response({
+            "success": True,
+            "updated": updated,
+        }, status=200)
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description=(
+            "Delete every driver selected by ids or filters, together with their controls. "
+            'Body: {"ids": [1, 2]} or {"filters": {"search": "Matheus"}}'
+        ),
+        responses=bulk_response('deleted')
+    ))
+    def delete(self, request):
+        try:
+            drivers = select_targets(Driver.objects.all(), request.data, filter_drivers)
+        except BulkError as error:
+            return Response({"error": str(error)}, status=400)
+
+        with transaction.atomic():
+            # Remove the trips in one statement first so the cascade below
+            # does not load and delete them one by one.
+            delete_controls(Control.objects.filter(driver__in=drivers))
+            _, deleted = drivers.delete()
+            bulk_changed.send(sender=Driver)
+
+        return Response({
+            "success": True,
+            "deleted": deleted.get(Driver._meta.label, 0),
+        }, status=200)
+
+
+class AsyncFetchData(AsyncReadView):
+    """Async variant of FetchData, without conditional GET and response cache."""
+    list_serializer = FetchData.list_serializer
+
+    async def get(self, request):
+        drivers = filter_drivers(Driver.objects.all(), request.GET)
+
+        try:
+            serializer = self.list_serializer.select(request.GET)
+        except InvalidFields as exception:
+            return error(str(exception))
+
+        if wants_cursor_pagination(request):
+            paginator = KeysetPagination(ordering=['id'])
+            try:
+                rows = await paginator.apaginate_queryset(serializer.values(drivers, *paginator.columns), request)
+            except InvalidCursor:
+                return error("Invalid cursor")
+
+            return render(paginator.get_paginated_data(serializer.to_representation(rows)))
+
+        if not drivers.ordered:
+            drivers = drivers.order_by('id')
+
+        try:
+            page, rows = await paginate(serializer.paged(drivers), request, request.GET.get('page_size', 10))
+        except InvalidPage:
+            return invalid_page()
+
+        return render(page_data(page, serializer.to_representation(rows)))
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class VehicleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vehicle'
+
+    def ready(self):
+        from core.sync import track_deletions
+        from core.versions import track
+        from .models import Vehicle
+
+        track(Vehicle)
+        track_deletions(Vehicle)
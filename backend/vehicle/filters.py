@@ -0,0 +1,22 @@
+from core.search import match_query, uses_index
+
+
+def filter_vehicles(vehicles, params):
+    search_query = params.get('search', None)
+
+    if search_query:
+        query = match_query(search_query)
+
+        if query and uses_index(vehicles):
+            # Words prefixing the plate, brand or model, best first.
+            return vehicles.filter(search__document__match=query).order_by('search__rank', 'id')
+
+        vehicles = vehicles.filter(
+            plate__icontains=search_query
+        ) | vehicles.filter(
+            brand__icontains=search_query
+        ) | vehicles.filter(
+            model__icontains=search_query
+        )
+
+    return vehicles
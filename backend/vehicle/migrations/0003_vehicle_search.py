@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-18 13:31
+
+import core.search
+from core.search import create_external_index_sql, drop_index_sql, run_if_fts5
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0002_alter_vehicle_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleSearch',
+            fields=[
+                ('vehicle', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='vehicle.vehicle')),
+                ('document', core.search.SearchField(db_column='vehicle_search')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'vehicle_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(
+            run_if_fts5(create_external_index_sql('vehicle_search', 'vehicle', ['plate', 'brand', 'model'])),
+            run_if_fts5(drop_index_sql('vehicle_search', ['vehicle_search_insert', 'vehicle_search_delete', 'vehicle_search_update'])),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.4 on 2026-10-18 13:52
+
+from core.sqlite import preserve_triggers
+from django.db import migrations, models
+import django.utils.timezone
+
+# SQLite adds NOT NULL columns by rebuilding the table, which drops the
+# triggers keeping the search indexes in sync.
+save_triggers, restore_triggers = preserve_triggers('vehicle')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0003_vehicle_search'),
+    ]
+
+    operations = [
+        save_triggers,
+        migrations.AddField(
+            model_name='vehicle',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['updated_at', 'id'], name='vehicle_updated_idx'),
+        ),
+        restore_triggers,
+    ]
@@ -1,11 +1,34 @@
 from django.db import models
 
+from core.search import SearchField
+
 
 class Vehicle(models.Model):
     plate = models.CharField(max_length=10)
     brand = models.CharField(max_length=100)
     model = models.CharField(max_length=100)
     oil_change_km = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'vehicle'
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='vehicle_updated_idx'),
+        ]
+
+
+class VehicleSearch(models.Model):
+    """
+    FTS5 index of the vehicle plate, brand and model, kept in sync by
+    triggers on the vehicle table. Created on SQLite only (migration 0003).
+    """
+    vehicle = models.OneToOneField(
+        Vehicle, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search',
+    )
+    document = SearchField(db_column='vehicle_search')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'vehicle_search'
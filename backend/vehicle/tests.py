@@ -1,6 +1,12 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
+from control.models import Control
+from driver.models import Driver
+from .models import Vehicle
+from .serializers import VehicleSerializer
+
 
 class VehicleTestCase(TestCase):
     def setUp(self):
@@ -50,3 +56,163 @@ class VehicleTestCase(TestCase):
         response = self.client.delete('/api/vehicle/1/delete', format='json')
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.data['error'], 'Vehicle not found')
+
+    def test_bulk_update_vehicles(self):
+        ids = [
+            self.client.post('/api/vehicle/create', {**self.data, 'plate': f'ABC-{index}'}, format='json')
+            .data['vehicle']['id']
+            for index in range(3)
+        ]
+
+        response = self.client.patch('/api/vehicle/bulk', {"ids": ids[1:], "data": {"oil_change_km": 5000}}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(list(Vehicle.objects.filter(oil_change_km=5000).values_list('id', flat=True)), ids[1:])
+
+    def test_bulk_update_vehicles_with_invalid_data(self):
+        response = self.client.patch('/api/vehicle/bulk', {"ids": [1], "data": {"oil_change_km": "many"}}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid oil_change_km')
+
+    def test_bulk_delete_vehicles(self):
+        for index in range(3):
+            self.client.post('/api/vehicle/create', {**self.data, 'brand': 'Fiat' if index else 'Toyota'}, format='json')
+
+        response = self.client.delete('/api/vehicle/bulk', {"filters": {"search": "Fiat"}}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(list(Vehicle.objects.values_list('brand', flat=True)), ['Toyota'])
+
+    def test_maintenance_status(self):
+        driver = Driver.objects.create(name='Matheus', phone='14 99655-5555', license_number='ABC123')
+        vehicles = [
+            Vehicle.objects.create(plate=f'ABC-{index}', brand='Fiat', model='Uno', oil_change_km=1000)
+            for index in range(3)
+        ]
+        for vehicle, distance in zip(vehicles, [200, 1500]):
+            Control.objects.create(
+                vehicle=vehicle, driver=driver, departure_date='2023-08-11', departure_time='10:30',
+                departure_km=0, destination='São Paulo', return_km=distance,
+            )
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/vehicle/maintenance-status')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_items'], 3)
+        self.assertEqual(
+            [(vehicle['id'], vehicle['total_km'], vehicle['km_left'], vehicle['exceeded'])
+             for vehicle in response.data['results']],
+            [(vehicles[1].id, 1500, -500, True), (vehicles[0].id, 200, 800, False), (vehicles[2].id, 0, 1000, False)]
+        )
+
+        response = self.client.get('/api/vehicle/maintenance-status?order_by=-km_left&exceeded=false')
+        self.assertEqual([vehicle['id'] for vehicle in response.data['results']], [vehicles[2].id, vehicles[0].id])
+
+    def test_maintenance_status_invalid_order(self):
+        response = self.client.get('/api/vehicle/maintenance-status?order_by=plate')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_conditional_get(self):
+        created = self.client.post('/api/vehicle/create', self.data, format='json')
+
+        etags = {}
+        for url in ['/api/vehicle', '/api/vehicle/all', '/api/vehicle/maintenance-status']:
+            etags[url] = self.client.get(url)['ETag']
+
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 304)
+
+        self.client.put(f'/api/vehicle/{created.data["vehicle"]["id"]}/update', {'model': 'Gol'}, format='json')
+
+        response = self.client.get('/api/vehicle/all', HTTP_IF_NONE_MATCH=etags['/api/vehicle/all'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['model'], 'Gol')
+
+    def test_list_output_matches_model_serializer(self):
+        Vehicle.objects.create(plate='ABC-1234', model='Fusca', brand='Volkswagen', oil_change_km=1000)
+        self.client.post('/api/vehicle/create', self.data, format='json')
+        expected = JSONRenderer().render(VehicleSerializer(Vehicle.objects.order_by('id'), many=True).data)
+
+        response = self.client.get('/api/vehicle/all')
+        self.assertEqual(JSONRenderer().render(response.data['results']), expected)
+
+        response = self.client.get('/api/vehicle?page_size=10')
+        self.assertEqual(JSONRenderer().render(response.data['results']), expected)
+
+    def test_sparse_fields(self):
+        record = Vehicle.objects.create(plate='ABC-1234', model='Fusca', brand='Volkswagen', oil_change_km=1000)
+
+        response = self.client.get('/api/vehicle?fields=id,plate')
+        self.assertEqual(response.data['results'], [{'id': record.id, 'plate': 'ABC-1234'}])
+
+        response = self.client.get('/api/vehicle/all?fields=plate')
+        self.assertEqual(response.data['results'], [{'plate': 'ABC-1234'}])
+
+        response = self.client.get('/api/vehicle?pagination=cursor&fields=plate')
+        self.assertEqual(response.data['results'], [{'plate': 'ABC-1234'}])
+
+        self.assertEqual(self.client.get('/api/vehicle?fields=unknown').status_code, 400)
+        self.assertEqual(self.client.get('/api/vehicle/all?expand=vehicle').status_code, 400)
+
+    # Set-based writes below skip the version bump the response cache keys on.
+    @override_settings(RESPONSE_CACHE_ALIAS=None)
+    def test_search(self):
+        fusca = Vehicle.objects.create(plate='ABC-1234', brand='Volkswagen', model='Fusca', oil_change_km=1000)
+        gol = Vehicle.objects.create(plate='ABD-9876', brand='Volkswagen', model='Gol', oil_change_km=1000)
+        uno = Vehicle.objects.create(plate='XYZ-1234', brand='Fiat', model='Uno', oil_change_km=1000)
+
+        def search(query):
+            response = self.client.get(f'/api/vehicle?search={query}')
+            self.assertEqual(response.status_code, 200)
+            return [vehicle['id'] for vehicle in response.data['results']]
+
+        self.assertEqual(search('abc-12'), [fusca.id])
+        self.assertEqual(set(search('volks')), {fusca.id, gol.id})
+        self.assertEqual(search('volks gol'), [gol.id])
+        self.assertEqual(set(search('1234')), {fusca.id, uno.id})
+
+        Vehicle.objects.filter(id=uno.id).update(plate='QWE-5555')
+        self.assertEqual(search('qwe'), [uno.id])
+
+        with override_settings(FULL_TEXT_SEARCH=False):
+            self.assertEqual(search('olkswag'), [fusca.id, gol.id])
+
+    def test_suggest(self):
+        fusca = Vehicle.objects.create(plate='ABC-1234', brand='Volkswagen', model='Fusca', oil_change_km=1000)
+        gol = Vehicle.objects.create(plate='ABD-9876', brand='Volkswagen', model='Gol', oil_change_km=1000)
+
+        response = self.client.get('/api/vehicle/suggest?q=abc')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [{'id': fusca.id, 'label': 'Fusca - ABC-1234'}])
+
+        response = self.client.get('/api/vehicle/suggest?q=volks')
+        self.assertEqual({vehicle['id'] for vehicle in response.data['results']}, {fusca.id, gol.id})
+
+        self.assertEqual(self.client.get('/api/vehicle/suggest?q=fiat').data['results'], [])
+        self.assertEqual(self.client.get('/api/vehicle/suggest?limit=100').status_code, 400)
+
+    @override_settings(SYNC_SETTLE_SECONDS=0)
+    def test_changes(self):
+        fusca = Vehicle.objects.create(plate='ABC-1234', brand='Volkswagen', model='Fusca', oil_change_km=1000)
+        gol = Vehicle.objects.create(plate='ABD-9876', brand='Volkswagen', model='Gol', oil_change_km=1000)
+
+        response = self.client.get('/api/vehicle/changes?limit=1')
+        self.assertEqual([vehicle['id'] for vehicle in response.data['results']], [fusca.id])
+        self.assertTrue(response.data['has_more'])
+
+        response = self.client.get('/api/vehicle/changes', {'since': response.data['next_token']})
+        self.assertEqual([vehicle['id'] for vehicle in response.data['results']], [gol.id])
+        token = response.data['next_token']
+
+        self.client.patch('/api/vehicle/bulk', {"filters": {"search": "Fusca"}, "data": {"oil_change_km": 5000}}, format='json')
+        self.client.delete(f'/api/vehicle/{gol.id}/delete')
+
+        response = self.client.get('/api/vehicle/changes', {'since': token})
+        self.assertEqual([(row['id'], row['oil_change_km']) for row in response.data['results']], [(fusca.id, 5000)])
+        self.assertEqual(response.data['deleted'], [gol.id])
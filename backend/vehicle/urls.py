@@ -1,11 +1,18 @@
 from django.urls import path
 
-from .views import FetchData, CreateVehicle, UpdateVehicle, DeleteVehicle, FetchAllVehicles
+from .views import FetchData, CreateVehicle, UpdateVehicle, DeleteVehicle, FetchAllVehicles, BulkVehicle, MaintenanceStatus
+from .views import SuggestVehicles, VehicleChanges
+from .views import AsyncFetchData
 
 urlpatterns = [
     path('vehicle', FetchData.as_view(), name='fetch_data'),
     path('vehicle/create', CreateVehicle.as_view(), name='create_vehicle'),
+    path('vehicle/bulk', BulkVehicle.as_view(), name='bulk_vehicle'),
     path('vehicle/<int:vehicle_id>/update', UpdateVehicle.as_view(), name='update_vehicle'),
     path('vehicle/<int:vehicle_id>/delete', DeleteVehicle.as_view(), name='delete_vehicle'),
     path('vehicle/all', FetchAllVehicles.as_view(), name='fetch_all_vehicles'),
+    path('vehicle/suggest', SuggestVehicles.as_view(), name='suggest_vehicles'),
+    path('vehicle/changes', VehicleChanges.as_view(), name='vehicle_changes'),
+    path('vehicle/maintenance-status', MaintenanceStatus.as_view(), name='maintenance_status'),
+    path('async/vehicle', AsyncFetchData.as_view(), name='async_fetch_data'),
 ]
@@ -1,20 +1,40 @@
+from django.core.paginator import InvalidPage
+from django.db import transaction
+from django.db.models import BigIntegerField, BooleanField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import filters
-from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from .models import Vehicle
+from control.bulk import delete_controls
+from control.models import Control
+from core.bulk import BulkError, select_targets, clean_update, bulk_request_body, bulk_response
+from core.async_views import AsyncReadView, error, invalid_page, page_data, paginate, render
+from core.cache import cached_response
+from core.conditional import conditional_on
+from core.schema import lazy_swagger_auto_schema
+from core.search import MAX_SUGGEST_LIMIT, SUGGEST_LIMIT, suggest, suggest_limit
+from core.pagination import KeysetPagination, InvalidCursor, cursor_parameters, wants_cursor_pagination
+from core.serializers import ValuesSerializer, InvalidFields, fields_parameter
+from core.signals import bulk_changed
+from core.sync import ExpiredToken, InvalidToken, changes_parameters, changes_response, read_changes
+
+from .filters import filter_vehicles
+from .models import Vehicle, VehicleSearch
 from .serializers import VehicleSerializer
 
 
 class FetchData(APIView):
+    list_serializer = ValuesSerializer(VehicleSerializer)
     filter_backends = [filters.SearchFilter]
     search_fields = ['plate', 'brand', 'model']
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Fetch all vehicles",
+        manual_parameters=[*cursor_parameters, fields_parameter],
         responses={
             200: openapi.Response(
                 description="Success",
@@ -35,8 +55,10 @@ class FetchData(APIView):
                                     'brand': openapi.Schema(type=openapi.TYPE_STRING),
                                     'model': openapi.Schema(type=openapi.TYPE_STRING),
                                     'oil_change_km': openapi.Schema(type=openapi.TYPE_INTEGER),
-                                    'created_at': openapi.Schema(type=openapi.TYPE_STRING),
-                                    'updated_at': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME),
+                                    'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME),
                                 }
                             )
                         )
@@ -44,38 +66,48 @@ class FetchData(APIView):
                 )
             )
         }
-    )
+    ))
+    @conditional_on(Vehicle)
+    @cached_response(Vehicle, defaults={'page': '1', 'page_size': '10'})
     def get(self, request):
         paginator = PageNumberPagination()
         vehicles = Vehicle.objects.all()
 
         paginator.page_size = request.GET.get('page_size', 10)
-        search_query = request.GET.get('search', None)
-
-        if search_query:
-            vehicles = vehicles.filter(
-                plate__icontains=search_query
-            ) | vehicles.filter(
-                brand__icontains=search_query
-            ) | vehicles.filter(
-                model__icontains=search_query
-            )
+        vehicles = filter_vehicles(vehicles, request.GET)
 
-        result_page = paginator.paginate_queryset(vehicles, request)
-        serializer = VehicleSerializer(result_page, many=True)
+        try:
+            serializer = self.list_serializer.select(request.GET)
+        except InvalidFields as error:
+            return Response({"error": str(error)}, status=400)
+
+        if wants_cursor_pagination(request):
+            paginator = KeysetPagination(ordering=['id'])
+            try:
+                result_page = paginator.paginate_queryset(serializer.values(vehicles, *paginator.columns), request)
+            except InvalidCursor:
+                return Response({"error": "Invalid cursor"}, status=400)
+
+            return paginator.get_paginated_response(serializer.to_representation(result_page))
+
+        if not vehicles.ordered:
+            # Search results keep their ranking; pages are stable either way.
+            vehicles = vehicles.order_by('id')
+
+        result_page = paginator.paginate_queryset(serializer.paged(vehicles), request)
 
         return Response({
             "success": True,
             "total_items": paginator.page.paginator.count,
             "total_pages": paginator.page.paginator.num_pages,
             "current_page": paginator.page.number,
-            "results": serializer.data,
+            "results": serializer.to_representation(result_page),
         }, status=200)
 
 
 class CreateVehicle(APIView):
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Create a new vehicle",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -101,8 +133,8 @@ class CreateVehicle(APIView):
                                 'brand': openapi.Schema(type=openapi.TYPE_STRING),
                                 'model': openapi.Schema(type=openapi.TYPE_STRING),
                                 'oil_change_km': openapi.Schema(type=openapi.TYPE_INTEGER),
-                                'created_at': openapi.Schema(type=openapi.TYPE_STRING),
-                                'updated_at': openapi.Schema(type=openapi.TYPE_STRING),
+                                'created_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                                'updated_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
                             }
                         )
                     }
@@ -118,7 +150,7 @@ class CreateVehicle(APIView):
                 )
             )
         }
-    )
+    ))
     def post(self, request):
         required_fields = ['plate', 'brand', 'model', 'oil_change_km']
 
@@ -138,7 +170,7 @@ class CreateVehicle(APIView):
 
 class UpdateVehicle(APIView):
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Update a vehicle",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -170,7 +202,7 @@ class UpdateVehicle(APIView):
                 )
             )
         }
-    )
+    ))
     def put(self, request, vehicle_id):
         try:
             vehicle = Vehicle.objects.get(pk=vehicle_id)
@@ -193,7 +225,7 @@ class UpdateVehicle(APIView):
 
 class DeleteVehicle(APIView):
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Delete a vehicle",
         responses={
             200: openapi.Response(
@@ -216,7 +248,7 @@ class DeleteVehicle(APIView):
                 )
             )
         }
-    )
+    ))
     def delete(self, request, vehicle_id):
         try:
             vehicle = Vehicle.objects.get(pk=vehicle_id)
@@ -232,9 +264,11 @@ class DeleteVehicle(APIView):
 
 
 class FetchAllVehicles(APIView):
+    list_serializer = ValuesSerializer(VehicleSerializer)
 
-    @swagger_auto_schema(
+    @lazy_swagger_auto_schema(lambda: dict(
         operation_description="Fetch all vehicles",
+        manual_parameters=[fields_parameter],
         responses={
             200: openapi.Response(
                 description="Success",
@@ -252,6 +286,10 @@ class FetchAllVehicles(APIView):
                                     'brand': openapi.Schema(type=openapi.TYPE_STRING),
                                     'model': openapi.Schema(type=openapi.TYPE_STRING),
                                     'oil_change_km': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME),
+                                    'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 format=openapi.FORMAT_DATETIME),
                                 }
                             )
                         )
@@ -259,12 +297,320 @@ class FetchAllVehicles(APIView):
                 )
             )
         }
-    )
+    ))
+    @conditional_on(Vehicle)
     def get(self, request):
-        vehicles = Vehicle.objects.all()
-        serializer = VehicleSerializer(vehicles, many=True)
+        try:
+            serializer = self.list_serializer.select(request.GET)
+        except InvalidFields as error:
+            return Response({"error": str(error)}, status=400)
+
+        vehicles = serializer.values(Vehicle.objects.all())
+
+        return Response({
+            "success": True,
+            "results": serializer.to_representation(vehicles),
+        }, status=200)
+
+
+class SuggestVehicles(APIView):
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description="Suggest vehicles for a typeahead selector",
+        manual_parameters=[
+            openapi.Parameter(
+                name='q',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description='Typed text, matched against the start of the words of the plate, brand or model',
+                required=False
+            ),
+            openapi.Parameter(
+                name='limit',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description=f'Number of suggestions (1 to {MAX_SUGGEST_LIMIT}, default {SUGGEST_LIMIT})',
+                required=False
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Best matching vehicles",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'success': openapi.Schema(
+                            type=openapi.TYPE_BOOLEAN,
+                            description='True if request is successful'
+                        ),
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'id': openapi.Schema(
+                                        type=openapi.TYPE_INTEGER,
+                                        description='Vehicle ID'
+                                    ),
+                                    'label': openapi.Schema(
+                                        type=openapi.TYPE_STRING,
+                                        description='Text to display, e.g. "Fusca - ABC-1234"'
+                                    ),
+                                }
+                            )
+                        )
+                    }
+                )
+            ),
+            400: 'Invalid limit',
+        }
+    ))
+    @conditional_on(Vehicle)
+    @cached_response(Vehicle, defaults={'limit': str(SUGGEST_LIMIT)})
+    def get(self, request):
+        try:
+            limit = suggest_limit(request.GET)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=400)
+
+        vehicles = suggest(
+            Vehicle.objects.values('id', 'model', 'plate'), VehicleSearch, request.GET.get('q', ''), limit,
+            fields=['plate', 'brand', 'model'],
+        )
+
+        return Response({
+            "success": True,
+            "results": [{"id": row['id'], "label": f"{row['model']} - {row['plate']}"} for row in vehicles],
+        }, status=200)
+
+
+class VehicleChanges(APIView):
+    list_serializer = FetchData.list_serializer
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description=(
+            "Vehicles created, updated or deleted since the token, oldest first. "
+            "Start without since, then pass the next_token of each response."
+        ),
+        manual_parameters=[*changes_parameters, fields_parameter],
+        responses=changes_response(openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'id': openapi.Schema(type=openapi.TYPE_INTEGER, description='Vehicle ID'),
+                'plate': openapi.Schema(type=openapi.TYPE_STRING, description='Vehicle plate'),
+                'brand': openapi.Schema(type=openapi.TYPE_STRING, description='Vehicle brand'),
+                'model': openapi.Schema(type=openapi.TYPE_STRING, description='Vehicle model'),
+                'oil_change_km': openapi.Schema(type=openapi.TYPE_INTEGER, description='Km between oil changes'),
+                'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                             format=openapi.FORMAT_DATETIME, description='Creation time'),
+                'updated_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                             format=openapi.FORMAT_DATETIME, description='Last write time'),
+            }
+        ))
+    ))
+    def get(self, request):
+        try:
+            serializer = self.list_serializer.select(request.GET)
+            data = read_changes(Vehicle.objects.all(), serializer, request.GET)
+        except ExpiredToken:
+            return Response({"error": "Token expired, download the full list again"}, status=410)
+        except InvalidToken:
+            return Response({"error": "Invalid since token"}, status=400)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=400)
+
+        return Response(data, status=200)
+
+
+class BulkVehicle(APIView):
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description="Update every vehicle selected by ids or filters in a single statement",
+        request_body=bulk_request_body({
+            'plate': openapi.Schema(type=openapi.TYPE_STRING),
+            'brand': openapi.Schema(type=openapi.TYPE_STRING),
+            'model': openapi.Schema(type=openapi.TYPE_STRING),
+            'oil_change_km': openapi.Schema(type=openapi.TYPE_INTEGER),
+        }),
+        responses=bulk_response('updated')
+    ))
+    def patch(self, request):
+        try:
+            vehicles = select_targets(Vehicle.objects.all(), request.data, filter_vehicles)
+            values = clean_update(Vehicle, request.data.get("data"), ['plate', 'brand', 'model', 'oil_change_km'])
+        except BulkError as error:
+            return Response({"error": str(error)}, status=400)
+
+        with transaction.atomic():
+            updated = vehicles.update(updated_at=timezone.now(), **values)
+            bulk_changed.send(sender=Vehicle)
+
+        return Response({
+            "success": True,
+            "updated": updated,
+        }, status=200)
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description=(
+            "Delete every vehicle selected by ids or filters, together with their controls. "
+            'Body: {"ids": [1, 2]} or {"filters": {"search": "Fiat"}}'
+        ),
+        responses=bulk_response('deleted')
+    ))
+    def delete(self, request):
+        try:
+            vehicles = select_targets(Vehicle.objects.all(), request.data, filter_vehicles)
+        except BulkError as error:
+            return Response({"error": str(error)}, status=400)
+
+        with transaction.atomic():
+            # Remove the trips in one statement first so the cascade below
+            # does not load and delete them one by one.
+            delete_controls(Control.objects.filter(vehicle__in=vehicles))
+            _, deleted = vehicles.delete()
+            bulk_changed.send(sender=Vehicle)
 
         return Response({
             "success": True,
-            "results": serializer.data,
+            "deleted": deleted.get(Vehicle._meta.label, 0),
         }, status=200)
+
+
+class MaintenanceStatus(APIView):
+    ordering_fields = ['km_left', 'total_km', 'oil_change_km', 'id']
+
+    @lazy_swagger_auto_schema(lambda: dict(
+        operation_description="Oil change status of every vehicle, computed in a single query",
+        manual_parameters=[
+            openapi.Parameter(
+                name='order_by',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description='km_left (default), total_km, oil_change_km or id; prefix with - for descending',
+                required=False
+            ),
+            openapi.Parameter(
+                name='exceeded',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                description='Only vehicles that exceeded (true) or are within (false) the km limit',
+                required=False
+            ),
+            openapi.Parameter(
+                name='page_size',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description='Number of items per page',
+                required=False
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Success",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'success': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        'total_items': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'total_pages': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'current_page': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'plate': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'brand': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'model': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'oil_change_km': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'total_km': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'km_left': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'exceeded': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                                }
+                            )
+                        )
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Invalid parameters",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'error': openapi.Schema(type=openapi.TYPE_STRING),
+                    }
+                )
+            ),
+        }
+    ))
+    @conditional_on(Vehicle, Control)
+    def get(self, request):
+        paginator = PageNumberPagination()
+        paginator.page_size = request.GET.get('page_size', 10)
+
+        # total_km comes from the mileage ledger maintained by the control
+        # app, joined in the same query instead of summing every trip.
+        vehicles = Vehicle.objects.annotate(
+            total_km=Coalesce(F('mileage__total_km'), Value(0), output_field=BigIntegerField()),
+        ).annotate(
+            km_left=ExpressionWrapper(F('oil_change_km') - F('total_km'), output_field=BigIntegerField()),
+            exceeded=ExpressionWrapper(Q(total_km__gte=F('oil_change_km')), output_field=BooleanField()),
+        ).values('id', 'plate', 'brand', 'model', 'oil_change_km', 'total_km', 'km_left', 'exceeded')
+
+        exceeded = request.GET.get('exceeded', None)
+        if exceeded in ('true', 'false'):
+            vehicles = vehicles.filter(exceeded=exceeded == 'true')
+        elif exceeded:
+            return Response({"error": "Invalid exceeded, expected true or false"}, status=400)
+
+        order_by = request.GET.get('order_by', 'km_left')
+        if order_by.lstrip('-') not in self.ordering_fields:
+            return Response({"error": f"Invalid order_by, expected one of: {', '.join(self.ordering_fields)}"},
+                            status=400)
+        vehicles = vehicles.order_by(order_by, 'id')
+
+        result_page = paginator.paginate_queryset(vehicles, request)
+
+        return Response({
+            "success": True,
+            "total_items": paginator.page.paginator.count,
+            "total_pages": paginator.page.paginator.num_pages,
+            "current_page": paginator.page.number,
+            "results": [
+                {**vehicle, "exceeded": bool(vehicle["exceeded"])}
+                for vehicle in result_page
+            ],
+        }, status=200)
+
+
+class AsyncFetchData(AsyncReadView):
+    """Async variant of FetchData, without conditional GET and response cache."""
+    list_serializer = FetchData.list_serializer
+
+    async def get(self, request):
+        vehicles = filter_vehicles(Vehicle.objects.all(), request.GET)
+
+        try:
+            serializer = self.list_serializer.select(request.GET)
+        except InvalidFields as exception:
+            return error(str(exception))
+
+        if wants_cursor_pagination(request):
+            paginator = KeysetPagination(ordering=['id'])
+            try:
+                rows = await paginator.apaginate_queryset(serializer.values(vehicles, *paginator.columns), request)
+            except InvalidCursor:
+                return error("Invalid cursor")
+
+            return render(paginator.get_paginated_data(serializer.to_representation(rows)))
+
+        if not vehicles.ordered:
+            vehicles = vehicles.order_by('id')
+
+        try:
+            page, rows = await paginate(serializer.paged(vehicles), request, request.GET.get('page_size', 10))
+        except InvalidPage:
+            return invalid_page()
+
+        return render(page_data(page, serializer.to_representation(rows)))